@@ -1,34 +1,43 @@
 # activity_logger.py
-import json
 import os
+import threading
 from datetime import datetime
 
-ACTIVITY_LOG_FILE = "activity_logs.json"
+from dataset_store import get_dataset_store
+from log_store import JsonLinesLogStore, SQLiteLogStore, migrate_json_log
+
+ACTIVITY_LOG_FILE = "activity_logs.json"  # legacy format, migrated on first use
+ACTIVITY_LOG_JSONL = "activity_logs.jsonl"
+ACTIVITY_LOG_DB = "activity_logs.db"
 DATASETS_DIR = "user_datasets"
 
+# "jsonl" (default) or "sqlite"
+LOG_BACKEND = os.environ.get("ACTIVITY_LOG_BACKEND", "jsonl")
+
+_store = None
+_store_lock = threading.Lock()
+
 def ensure_directories():
     """Create necessary directories if they don't exist"""
     if not os.path.exists(DATASETS_DIR):
         os.makedirs(DATASETS_DIR)
 
-def load_activity_logs():
-    """Load activity logs from JSON file"""
-    if os.path.exists(ACTIVITY_LOG_FILE):
-        try:
-            with open(ACTIVITY_LOG_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, UnicodeDecodeError):
-            # If file is corrupted, return empty list and recreate
-            return []
-    return []
+def get_log_store():
+    """Return the append-only activity log store, migrating the old JSON log once"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if LOG_BACKEND == "sqlite":
+                store = SQLiteLogStore(ACTIVITY_LOG_DB)
+            else:
+                store = JsonLinesLogStore(ACTIVITY_LOG_JSONL)
+            migrate_json_log(store, ACTIVITY_LOG_FILE)
+            _store = store
+        return _store
 
-def save_activity_logs(logs):
-    """Save activity logs to JSON file"""
-    try:
-        with open(ACTIVITY_LOG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(logs, f, indent=4, ensure_ascii=False)
-    except Exception as e:
-        print(f"Error saving activity logs: {e}")
+def load_activity_logs():
+    """Load all activity logs, most recent first"""
+    return get_log_store().all()
 
 def log_user_activity(username, sensor_type, input_filename, output_filename, input_data, output_data):
     """
@@ -39,28 +48,21 @@ def log_user_activity(username, sensor_type, input_filename, output_filename, in
         sensor_type: The sensor type used
         input_filename: Original uploaded file name
         output_filename: Predicted CSV filename
-        input_data: DataFrame of input data
-        output_data: DataFrame of output predictions
+        input_data: Raw uploaded bytes, DataFrame or CSV path of the input
+        output_data: DataFrame or CSV path of the output predictions
     """
-    ensure_directories()
-    
     # Generate timestamp
     timestamp = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
     date_only = datetime.now().strftime("%d-%m-%Y")
     
-    # Create filenames without timestamp
+    # Download names shown in the admin panel
     saved_input_filename = f"{username}_{sensor_type.replace(' ', '')}_input.csv"
     saved_output_filename = f"{username}_{sensor_type.replace(' ', '')}_output.csv"
     
-    # Save datasets to user_datasets folder
-    input_path = os.path.join(DATASETS_DIR, saved_input_filename)
-    output_path = os.path.join(DATASETS_DIR, saved_output_filename)
-    
-    input_data.to_csv(input_path, index=False)
-    output_data.to_csv(output_path, index=False)
-    
-    # Load existing logs
-    logs = load_activity_logs()
+    # Content-addressed and written in the background; IDs never change
+    store = get_dataset_store()
+    input_id = store.put(input_data)
+    output_id = store.put(output_data)
     
     # Create new log entry
     log_entry = {
@@ -70,22 +72,37 @@ def log_user_activity(username, sensor_type, input_filename, output_filename, in
         "sensor_type": sensor_type,
         "input_dataset": saved_input_filename,
         "output_dataset": saved_output_filename,
-        "input_path": input_path,
-        "output_path": output_path
+        "input_dataset_id": input_id,
+        "output_dataset_id": output_id
     }
     
-    # Add to beginning of list (most recent first)
-    logs.insert(0, log_entry)
-    
-    # Save updated logs
-    save_activity_logs(logs)
+    # Append only; readers return the most recent entries first
+    get_log_store().append(log_entry)
     
     return True
 
+def read_logged_dataset(log, kind):
+    """
+    CSV bytes of the input or output dataset of a log entry, or None.
+
+    Args:
+        log: Activity log entry
+        kind: "input" or "output"
+    """
+    dataset_id = log.get(f"{kind}_dataset_id")
+    if dataset_id:
+        return get_dataset_store().read_bytes(dataset_id)
+
+    # Entries written before the dataset store point at plain CSV files
+    path = log.get(f"{kind}_path", "")
+    if path and os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+    return None
+
 def get_latest_logs(limit=5):
     """Get the latest N activity logs"""
-    logs = load_activity_logs()
-    return logs[:limit]
+    return get_log_store().latest(limit)
 
 def get_dataset_path(filename):
     """Get full path to a dataset file"""
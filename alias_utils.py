@@ -1,12 +1,21 @@
 # alias_utils.py
 import re
 from difflib import get_close_matches
+from functools import lru_cache
+
+from instrumentation import timed
+
+_NON_ALNUM_RE = re.compile(r'[^0-9a-z]')
+_SENSOR_INDEX_RE = re.compile(r"sensor(\d+)$")
+
+# Max number of distinct (columns, expected, cutoff) resolutions kept in memory
+ALIAS_CACHE_SIZE = 1024
 
 def normalize_col(col):
     if col is None:
         return ""
     s = str(col).lower().strip()
-    s = re.sub(r'[^0-9a-z]', '', s)  # remove punctuation
+    s = _NON_ALNUM_RE.sub('', s)  # remove punctuation
     return s
 
 # IMPORTANT FIX:
@@ -65,16 +74,21 @@ def fuzzy_match(candidate, list_vals, cutoff=0.78):
 def build_normalized_map(cols):
     return {c: normalize_col(c) for c in cols}
 
-def map_columns_with_aliases(df_cols, expected_cols, synonyms=SYNONYMS, fuzzy_cutoff=0.78):
-    norm_map = build_normalized_map(df_cols)
+def _build_expected_index(expected_cols):
     inv_expected = {normalize_col(c): c for c in expected_cols}
+    return inv_expected, list(inv_expected.keys()), frozenset(expected_cols)
+
+# Lookup tables built once at import time
+_SYN_KEYS = list(SYNONYMS.keys())
+_EXPECTED_INDEX = {tuple(cols): _build_expected_index(cols) for cols in EXPECTED_FEATURES.values()}
+
+def _resolve_columns(df_cols, expected_cols, synonyms, fuzzy_cutoff, syn_keys, expected_index):
+    norm_map = build_normalized_map(df_cols)
+    inv_expected, expected_norms, expected_set = expected_index
 
     rename_map = {}
     notes = []
 
-    expected_norms = list(inv_expected.keys())
-    syn_keys = list(synonyms.keys())
-
     for orig, norm in norm_map.items():
 
         # Exact synonym
@@ -92,10 +106,10 @@ def map_columns_with_aliases(df_cols, expected_cols, synonyms=SYNONYMS, fuzzy_cu
             continue
 
         # sensor1 → sensor_1
-        m = re.match(r"sensor(\d+)$", norm)
+        m = _SENSOR_INDEX_RE.match(norm)
         if m:
             canonical = f"sensor_{int(m.group(1))}"
-            if canonical in expected_cols:
+            if canonical in expected_set:
                 rename_map[orig] = canonical
                 notes.append(f"sensor_index:{orig}->{canonical}")
                 continue
@@ -119,3 +133,36 @@ def map_columns_with_aliases(df_cols, expected_cols, synonyms=SYNONYMS, fuzzy_cu
         notes.append(f"no_map:{orig}")
 
     return rename_map, notes
+
+@lru_cache(maxsize=ALIAS_CACHE_SIZE)
+def _cached_resolve(df_cols, expected_cols, fuzzy_cutoff):
+    expected_index = _EXPECTED_INDEX.get(expected_cols) or _build_expected_index(expected_cols)
+    rename_map, notes = _resolve_columns(
+        df_cols, expected_cols, SYNONYMS, fuzzy_cutoff, _SYN_KEYS, expected_index
+    )
+    return tuple(rename_map.items()), tuple(notes)
+
+@timed("alias.map_columns_with_aliases", rows=False)
+def map_columns_with_aliases(df_cols, expected_cols, synonyms=SYNONYMS, fuzzy_cutoff=0.78):
+    df_cols = tuple(df_cols)
+    expected_cols = tuple(expected_cols)
+
+    if synonyms is not SYNONYMS:
+        # Custom synonym tables are resolved without the cache
+        return _resolve_columns(
+            df_cols, expected_cols, synonyms, fuzzy_cutoff,
+            list(synonyms.keys()), _build_expected_index(expected_cols)
+        )
+
+    # Callers extend the notes, so hand out fresh copies of the cached result
+    rename_items, notes = _cached_resolve(df_cols, expected_cols, fuzzy_cutoff)
+    return dict(rename_items), list(notes)
+
+def alias_cache_info():
+    """Hit/miss counters of the column-resolution cache"""
+    info = _cached_resolve.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
+
+def clear_alias_cache():
+    """Drop cached resolutions (e.g. after editing SYNONYMS at runtime)"""
+    _cached_resolve.cache_clear()
@@ -1,81 +1,91 @@
 # all_in_one_router.py
 
-import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
 import numpy as np
 
-from model_utils import load_model
-from alias_utils import map_columns_with_aliases, EXPECTED_FEATURES, normalize_col
+from model_registry import get_registry
+from alias_utils import map_columns_with_aliases, EXPECTED_FEATURES
+from custom_transformers import SoilRollingFeatures
+from sensor_schema import classify_columns, header_signatures, row_signatures
+from instrumentation import timed
+from numpy_inference import compile_model
+from typed_loader import model_columns, read_sensor_csv
+from columnar_store import ColumnarOutput, open_columnar
+
+# Rows per task when scoring in parallel
+PARALLEL_CHUNK_ROWS = 50000
 
 
 class AllInOneRouter:
-    def __init__(self, model_dir="models", fuzzy_cutoff=0.78):
+    def __init__(self, model_dir="models", fuzzy_cutoff=0.78, registry=None, detection="header",
+                 engine="native"):
+        """
+        Args:
+            detection: "header" detects one sensor from the file header;
+                "rows" detects per row from which columns are non-null, for
+                files that stack several sensors under one union header
+            engine: "numpy" predicts small batches of the tree-ensemble
+                models with numpy_inference (same predictions, lower
+                per-call latency); "native" always uses the loaded models
+        """
+        if detection not in ("header", "rows"):
+            raise ValueError(f"Unknown detection mode: {detection}")
+        if engine not in ("native", "numpy"):
+            raise ValueError(f"Unknown inference engine: {engine}")
         self.model_dir = model_dir
         self.fuzzy_cutoff = fuzzy_cutoff
-        self.pipelines = {}
-        self._load_all_models()
-
-    def _expected_files(self):
-        return {
-            "wafer": "wafer_pipeline.joblib",
-            "soil": "soil_moisture_pipeline.joblib",
-            "gas": "gas_pipeline.joblib",
-            "temperature": "temperature_pipeline.joblib",
-            "light": "ldr_pipeline.joblib",
-        }
-
-    def _load_all_models(self):
-        for key, fname in self._expected_files().items():
-            path = os.path.join(self.model_dir, fname)
-            if os.path.exists(path):
-                try:
-                    self.pipelines[key] = load_model(path)
-                    print(f"[OK] Loaded {key}")
-                except Exception as e:
-                    print(f"[ERROR] loading {path}: {e}")
+        self.registry = registry or get_registry(model_dir)
+        self.detection = detection
+        self.engine = engine
+        # sensor -> (loaded model, compiled predictor or the model itself)
+        self._engines = {}
+        self._pool = None
+        self._pool_workers = 0
+        # sensor -> {"rows", "seconds"} spent in prepare + predict
+        self.timings = {}
+
+    def _get_model(self, sensor):
+        model = self.registry.get(sensor)
+        if self.engine == "native" or model is None:
+            return model
+        cached = self._engines.get(sensor)
+        if cached is None or cached[0] is not model:
+            # Recompiled whenever the registry hands out a reloaded model
+            cached = (model, compile_model(model) or model)
+            self._engines[sensor] = cached
+        return cached[1]
+
+    def _record_timing(self, sensor, rows, seconds):
+        t = self.timings.setdefault(sensor, {"rows": 0, "seconds": 0.0})
+        t["rows"] += rows
+        t["seconds"] += seconds
 
     # ==========================================================
     # SENSOR DETECTION (FINAL FIXED VERSION)
     # ==========================================================
-    def _detect_sensor(self, row_df):
-        raw_cols = [str(c).strip().lower() for c in row_df.columns]
-        norm_cols = [normalize_col(c) for c in row_df.columns]
-
-        has_sensor_value = ("sensorvalue" in norm_cols)
-
-        # Soil → must have EXACT timestamp_ms
-        if "timestamp_ms" in raw_cols and has_sensor_value:
-            return "soil"
-
-        # Temperature → must have EXACT timestamp(ms)
-        if "timestamp(ms)" in row_df.columns and has_sensor_value:
-            return "temperature"
-
-        # Temperature fallback: normalized "timestampms" but NOT soil
-        if "timestampms" in norm_cols and "timestamp_ms" not in raw_cols and has_sensor_value:
-            return "temperature"
-
-        # Gas
-        if "mq2value" in norm_cols or ("temperature" in raw_cols and "humidity" in raw_cols):
-            return "gas"
-
-        # Light
-        if "ldrvalue" in norm_cols or "ambientlight" in norm_cols:
-            return "light"
-
-        # Wafer
-        if "waferid" in norm_cols:
-            return "wafer"
-
-        if any(n.startswith("sensor") for n in norm_cols) and not has_sensor_value:
-            return "wafer"
-
-        return "unknown"
+    def _detect_signature(self, columns):
+        """Detect the sensor for a column signature, memoized per signature"""
+        return classify_columns(tuple(columns))
+
+    def _column_signatures(self, df):
+        """Split df into (columns, row positions) groups sharing one column signature"""
+        if self.detection == "rows":
+            return row_signatures(df)
+        return header_signatures(df)
+
+    def _block(self, df, columns, positions):
+        block = df.iloc[positions]
+        if len(columns) != df.shape[1]:
+            block = block[list(columns)]
+        return block
 
     # ==========================================================
     # PREPARE FEATURES
     # ==========================================================
-    def _apply_aliases(self, row_df, sensor):
+    def _apply_aliases(self, row_df, sensor, soil_rolling=None):
         expected = EXPECTED_FEATURES.get(sensor, [])
         rename_map, notes = map_columns_with_aliases(
             row_df.columns, expected, fuzzy_cutoff=self.fuzzy_cutoff
@@ -83,6 +93,9 @@ class AllInOneRouter:
 
         df = row_df.rename(columns=rename_map)
 
+        if sensor == "soil" and soil_rolling is not None:
+            df = self._add_soil_rolling(df, soil_rolling, notes)
+
         for col in expected:
             if col not in df.columns:
                 df[col] = 0
@@ -95,41 +108,458 @@ class AllInOneRouter:
 
         return prepared, notes
 
+    def _add_soil_rolling(self, df, soil_rolling, notes):
+        """Compute rolling_mean/rolling_std from sensor_value when the upload lacks them"""
+        if "sensor_value" not in df.columns:
+            return df
+        if "rolling_mean" in df.columns and "rolling_std" in df.columns:
+            return df
+
+        values = pd.to_numeric(df["sensor_value"], errors="coerce").fillna(0)
+        mean, std = soil_rolling.transform(values.to_numpy())
+        notes.append("rolling_features:sensor_value")
+        return df.assign(rolling_mean=mean, rolling_std=std)
+
     # ==========================================================
     # PREDICTOR
     # ==========================================================
-    def route_and_predict(self, df):
+    @timed("router.route_and_predict")
+    def route_and_predict(self, df, row_by_row=False, soil_rolling=None,
+                          workers=None, chunk_rows=PARALLEL_CHUNK_ROWS):
+        """
+        Detect the sensor type of each row and attach its prediction.
+
+        Args:
+            df: DataFrame of sensor readings
+            row_by_row: Use the original one-row-at-a-time path instead of
+                the batch engine (kept for comparison)
+            soil_rolling: SoilRollingFeatures carrying the soil window over
+                from a previous chunk; a fresh one is used when omitted
+            workers: Score sensor groups and row chunks in this many
+                processes (results keep the original row order)
+            chunk_rows: Rows per task in parallel mode
+        """
+        if row_by_row:
+            return self._route_and_predict_rows(df)
+        if soil_rolling is None:
+            soil_rolling = SoilRollingFeatures()
+
+        n = len(df)
+        sensors = np.empty(n, dtype=object)
+        preds = np.empty(n, dtype=object)
+        notes = np.empty(n, dtype=object)
+
+        groups = {}
+        for columns, positions in self._column_signatures(df):
+            sensor = self._detect_signature(columns)
+            groups.setdefault(sensor, []).append((columns, positions))
+
+        # Soil windows run in file order even when soil rows fall into
+        # several signatures
+        soil_plan = self._plan_soil_rolling(df, groups.get("soil", []), soil_rolling)
+
+        if workers and workers > 1:
+            self._predict_parallel(df, groups, soil_plan, workers, chunk_rows,
+                                   sensors, preds, notes)
+        else:
+            for sensor, parts in groups.items():
+                for i, (columns, positions) in enumerate(parts):
+                    start = time.perf_counter()
+                    block = self._block(df, columns, positions)
+                    rolling = soil_plan[i] if sensor == "soil" else None
+                    sensors[positions] = sensor
+                    preds[positions], notes[positions] = self._predict_block(block, sensor, rolling)
+                    self._record_timing(sensor, len(positions), time.perf_counter() - start)
+
+        out = df.reset_index(drop=True)
+        out["sensor_type"] = list(sensors)
+        out["prediction"] = list(preds)
+        out["note"] = list(notes)
+        return out
+
+    # ==========================================================
+    # PARALLEL PREDICTOR
+    # ==========================================================
+    def _get_pool(self, workers):
+        if self._pool is None or self._pool_workers != workers:
+            self.close()
+            # Workers build their own router, so models are loaded once per
+            # worker (or inherited on fork) and never pickled per task.
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_parallel_worker,
+                initargs=(self.model_dir, self.fuzzy_cutoff, self.engine)
+            )
+            self._pool_workers = workers
+        return self._pool
+
+    def close(self):
+        """Shut down the worker pool used by parallel scoring"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self._pool_workers = 0
+
+    def _soil_values(self, block):
+        """Numeric sensor_value of a soil block if the router will compute rolling features"""
+        rename_map, _ = map_columns_with_aliases(
+            block.columns, EXPECTED_FEATURES["soil"], fuzzy_cutoff=self.fuzzy_cutoff
+        )
+        targets = list(rename_map.values())
+        if targets.count("sensor_value") != 1 or ("rolling_mean" in targets and "rolling_std" in targets):
+            return None
+        src = next(c for c, v in rename_map.items() if v == "sensor_value")
+        return pd.to_numeric(block[src], errors="coerce").fillna(0).to_numpy()
+
+    def _plan_soil_rolling(self, df, parts, soil_rolling):
+        """
+        Rolling features for every soil part, computed over all soil rows in
+        file order and advancing soil_rolling; None where none are needed.
+        """
+        values = []
+        for columns, positions in parts:
+            values.append(self._soil_values(self._block(df, columns, positions)))
+
+        rolled = [(p, v) for (_, p), v in zip(parts, values) if v is not None]
+        if not rolled:
+            return [None] * len(parts)
+
+        positions = np.concatenate([p for p, _ in rolled])
+        order = np.argsort(positions, kind="stable")
+        mean_sorted, std_sorted = soil_rolling.transform(np.concatenate([v for _, v in rolled])[order])
+        mean = np.empty_like(mean_sorted)
+        std = np.empty_like(std_sorted)
+        mean[order] = mean_sorted
+        std[order] = std_sorted
+
+        plan = []
+        offset = 0
+        for v in values:
+            if v is None:
+                plan.append(None)
+                continue
+            plan.append(_PrecomputedRolling(mean[offset:offset + len(v)], std[offset:offset + len(v)]))
+            offset += len(v)
+        return plan
+
+    def _predict_parallel(self, df, groups, soil_plan, workers, chunk_rows,
+                          sensors, preds, notes):
+        pool = self._get_pool(workers)
+        futures = []
+
+        for sensor, parts in groups.items():
+            for i, (columns, positions) in enumerate(parts):
+                sensors[positions] = sensor
+                block = self._block(df, columns, positions)
+                rolling = soil_plan[i] if sensor == "soil" else None
+
+                for lo in range(0, len(positions), chunk_rows):
+                    hi = min(lo + chunk_rows, len(positions))
+                    chunk_rolling = rolling.slice(lo, hi) if rolling is not None else None
+                    fut = pool.submit(_predict_chunk, block.iloc[lo:hi], sensor, chunk_rolling)
+                    futures.append((fut, sensor, positions[lo:hi]))
+
+        for fut, sensor, pos in futures:
+            chunk_preds, chunk_notes, seconds = fut.result()
+            preds[pos] = chunk_preds
+            notes[pos] = chunk_notes
+            self._record_timing(sensor, len(pos), seconds)
+
+    def _predict_block(self, block, sensor, soil_rolling=None):
+        """Predict every row of a block that shares one sensor and column signature"""
+        n = len(block)
+        model = self._get_model(sensor)
+        notes = [f"detected:{sensor}"]
+
+        if model is None:
+            notes.append("no_model_for_sensor")
+            return [None] * n, [";".join(notes)] * n
+
+        try:
+            prepared, alias_notes = self._apply_aliases(block, sensor, soil_rolling)
+        except Exception as e:
+            # Columns that cannot be prepared fail every row the same way
+            print(f"[WARN] {sensor}: preparing {n} rows failed: {type(e).__name__}: {e}")
+            notes.append(f"predict_error:{type(e).__name__}:{e}")
+            return [None] * n, [";".join(notes)] * n
+        notes.extend(alias_notes)
+        if n == 0:
+            return [], []
+
+        preds = np.empty(n, dtype=object)
+        errors = {}
+        self._predict_bisect(model, prepared, sensor, 0, n, preds, errors)
+
+        ok_note = ";".join(notes + ["predict_ok"])
+        if not errors:
+            return list(preds), [ok_note] * n
+
+        first = errors[min(errors)]
+        print(f"[WARN] {sensor}: {len(errors)} of {n} rows failed to predict ({first}); "
+              "the rest were scored in batches")
+        return list(preds), [";".join(notes + [errors[i]]) if i in errors else ok_note for i in range(n)]
+
+    def _predict_bisect(self, model, prepared, sensor, lo, hi, preds, errors):
+        """Predict rows lo:hi, halving a failing range until only the failing rows are left"""
+        if hi <= lo:
+            return
+        block = prepared if (lo, hi) == (0, len(prepared)) else prepared.iloc[lo:hi]
+        try:
+            preds[lo:hi] = self._predict_prepared(model, block, sensor)
+            return
+        except Exception as e:
+            if hi - lo == 1:
+                errors[lo] = f"predict_error:{type(e).__name__}:{e}"
+                return
+        mid = (lo + hi) // 2
+        self._predict_bisect(model, prepared, sensor, lo, mid, preds, errors)
+        self._predict_bisect(model, prepared, sensor, mid, hi, preds, errors)
+
+    def _predict_prepared(self, model, prepared, sensor):
+        n = len(prepared)
+        if sensor == "wafer":
+            # The row path aggregates each reading as its own wafer group.
+            prepared["wafer_id"] = np.arange(n)
+
+        pred = np.asarray(model.predict(prepared))
+        if len(pred) != n:
+            raise ValueError(f"expected {n} predictions, got {len(pred)}")
+        return pred
+
+    def _predict_row(self, row_df, sensor):
+        model = self._get_model(sensor)
+
+        notes = [f"detected:{sensor}"]
+        pred_val = None
+
+        if model is None:
+            notes.append("no_model_for_sensor")
+        else:
+            try:
+                prepared, alias_notes = self._apply_aliases(row_df, sensor)
+                notes.extend(alias_notes)
+
+                pred = model.predict(prepared)
+                pred_val = pred[0]
+
+                notes.append("predict_ok")
+
+            except Exception as e:
+                notes.append(f"predict_error:{type(e).__name__}:{e}")
+
+        return pred_val, ";".join(notes)
+
+    def _route_and_predict_rows(self, df):
         rows = []
 
         for _, row in df.iterrows():
             row_df = row.to_frame().T
 
-            sensor = self._detect_sensor(row_df)
-            model = self.pipelines.get(sensor)
-
-            notes = [f"detected:{sensor}"]
-            pred_val = None
-
-            if model is None:
-                notes.append("no_model_for_sensor")
-            else:
-                try:
-                    prepared, alias_notes = self._apply_aliases(row_df, sensor)
-                    notes.extend(alias_notes)
-
-                    pred = model.predict(prepared)
-                    pred_val = pred[0]
-
-                    notes.append("predict_ok")
-
-                except Exception as e:
-                    notes.append(f"predict_error:{type(e).__name__}:{e}")
+            sensor = self._detect_signature(row_df.columns)
+            pred_val, note = self._predict_row(row_df, sensor)
 
             out = row.to_dict()
             out["sensor_type"] = sensor
             out["prediction"] = pred_val
-            out["note"] = ";".join(notes)
+            out["note"] = note
 
             rows.append(out)
 
         return pd.DataFrame(rows)
+
+    # ==========================================================
+    # SINGLE SENSOR PREDICTOR
+    # ==========================================================
+    @timed("router.predict_single_sensor")
+    def predict_single_sensor(self, df, sensor_key, label=None, soil_rolling=None):
+        """
+        Predict a whole frame with one sensor's pipeline, skipping detection.
+
+        Args:
+            df: DataFrame of sensor readings
+            sensor_key: Key in EXPECTED_FEATURES (e.g. "soil")
+            label: Value written to sensor_type/note (defaults to sensor_key)
+            soil_rolling: SoilRollingFeatures carried over from a previous chunk
+        """
+        label = label or sensor_key
+        model = self._get_model(sensor_key)
+        if model is None:
+            raise ValueError(f"Model not found for sensor: {sensor_key}")
+
+        if soil_rolling is None:
+            soil_rolling = SoilRollingFeatures()
+
+        start = time.perf_counter()
+        prepared, _ = self._apply_aliases(df, sensor_key, soil_rolling)
+        pred = self._predict_prepared(model, prepared, sensor_key) if len(prepared) else []
+        self._record_timing(sensor_key, len(df), time.perf_counter() - start)
+
+        out = df.reset_index(drop=True)
+        out["sensor_type"] = label
+        out["prediction"] = list(pred)
+        out["note"] = f"single_model:{label}"
+        return out
+
+    # ==========================================================
+    # STREAMING CSV PREDICTOR
+    # ==========================================================
+    def route_and_predict_csv(self, source, output_path, chunksize=50000,
+                              sensor_key=None, label=None, on_chunk=None,
+                              compact=False, model_columns_only=False):
+        """
+        Score a CSV chunk by chunk, appending predictions to output_path.
+
+        Only one chunk of input and output is held in memory at a time.
+
+        Args:
+            source: Path or file-like object of the input CSV
+            output_path: CSV file the predictions are written to
+            chunksize: Rows read per chunk
+            sensor_key: Score every row with this sensor (skips detection)
+            label: sensor_type/note label for single-sensor scoring
+            on_chunk: Optional callback(chunks_done, rows_done) after each chunk
+            compact: Read with typed_loader's compact types (float32
+                readings, Int64 epochs, categorical wafer ids)
+            model_columns_only: With sensor_key, read only the columns its
+                model uses; the output then echoes just those columns
+
+        Returns:
+            dict with total rows, chunk count and a preview of the first rows
+        """
+        rows = 0
+        chunks = 0
+        preview = None
+
+        with open(output_path, "w", newline="", encoding="utf-8") as out:
+            for pred in self.iter_predict_csv(source, chunksize, sensor_key, label,
+                                              compact=compact, model_columns_only=model_columns_only):
+                pred.to_csv(out, index=False, header=(chunks == 0))
+
+                if preview is None:
+                    preview = pred.head()
+                rows += len(pred)
+                chunks += 1
+                if on_chunk:
+                    on_chunk(chunks, rows)
+
+        return {"rows": rows, "chunks": chunks, "preview": preview}
+
+    def iter_predict_csv(self, source, chunksize=50000, sensor_key=None, label=None, workers=None,
+                         compact=False, model_columns_only=False):
+        """Yield prediction frames (sensor_type/prediction first) per CSV chunk"""
+        # Soil rolling windows continue across chunk boundaries
+        soil_rolling = SoilRollingFeatures()
+
+        if compact or model_columns_only:
+            chunks = read_sensor_csv(source, sensor_key, chunksize=chunksize, compact=compact,
+                                     model_columns_only=model_columns_only, fuzzy_cutoff=self.fuzzy_cutoff)
+        else:
+            chunks = pd.read_csv(source, chunksize=chunksize)
+
+        for chunk in chunks:
+            if sensor_key:
+                pred = self.predict_single_sensor(chunk, sensor_key, label=label,
+                                                  soil_rolling=soil_rolling)
+            else:
+                pred = self.route_and_predict(chunk, soil_rolling=soil_rolling, workers=workers)
+            yield predictions_first(pred)
+
+    # ==========================================================
+    # OUT-OF-CORE COLUMNAR PREDICTOR
+    # ==========================================================
+    def predict_columnar(self, source, output_dir, chunk_rows=PARALLEL_CHUNK_ROWS,
+                         sensor_key=None, label=None, on_chunk=None):
+        """
+        Score a memory-mapped columnar input slice by slice.
+
+        Only chunk_rows rows are read from the mapped buffers at a time. With
+        header detection (or sensor_key) the sensor is detected once from the
+        full column list and a slice holds only the columns its model reads;
+        rows detection reads every column of a slice. sensor_type and
+        prediction are written to memory-mapped columns in output_dir.
+
+        Args:
+            source: columnar_store directory or uncompressed Arrow/Feather file
+            output_dir: Store directory the predictions are written to
+                (prediction is NaN where no model applied)
+            chunk_rows: Rows per slice
+            sensor_key: Score every row with this sensor (skips detection)
+            label: sensor_type label for single-sensor scoring
+            on_chunk: Optional callback(chunks_done, rows_done) after each slice
+
+        Returns:
+            dict with total rows and slice count
+        """
+        frame = open_columnar(source)
+        n = len(frame)
+        soil_rolling = SoilRollingFeatures()
+
+        sensor = sensor_key
+        if sensor is None and self.detection == "header":
+            sensor = self._detect_signature(frame.columns)
+        if sensor_key and self._get_model(sensor_key) is None:
+            raise ValueError(f"Model not found for sensor: {sensor_key}")
+        columns = model_columns(frame.columns, sensor, self.fuzzy_cutoff) if sensor else None
+
+        out = ColumnarOutput(output_dir, n)
+        chunks = 0
+        try:
+            for lo in range(0, n, chunk_rows):
+                hi = min(lo + chunk_rows, n)
+                if sensor is None:
+                    pred = self.route_and_predict(frame.frame(lo, hi), soil_rolling=soil_rolling)
+                    out.write(lo, sensor_type=pred["sensor_type"].tolist(),
+                              prediction=pred["prediction"].tolist())
+                else:
+                    start = time.perf_counter()
+                    preds, _ = self._predict_block(frame.frame(lo, hi, columns), sensor, soil_rolling)
+                    self._record_timing(sensor, hi - lo, time.perf_counter() - start)
+                    out.write(lo, sensor_type=[label or sensor] * (hi - lo), prediction=list(preds))
+                chunks += 1
+                if on_chunk:
+                    on_chunk(chunks, hi)
+        finally:
+            out.close()
+
+        return {"rows": n, "chunks": chunks}
+
+
+class _PrecomputedRolling:
+    """Soil rolling features already computed in file order for one block"""
+
+    def __init__(self, mean, std):
+        self.mean = mean
+        self.std = std
+
+    def transform(self, values):
+        if len(values) != len(self.mean):
+            raise ValueError(f"expected {len(self.mean)} soil readings, got {len(values)}")
+        return self.mean, self.std
+
+    def slice(self, lo, hi):
+        return _PrecomputedRolling(self.mean[lo:hi], self.std[lo:hi])
+
+
+_worker_router = None
+
+
+def _init_parallel_worker(model_dir, fuzzy_cutoff, engine="native"):
+    global _worker_router
+    _worker_router = AllInOneRouter(model_dir=model_dir, fuzzy_cutoff=fuzzy_cutoff, engine=engine)
+
+
+def _predict_chunk(block, sensor, soil_rolling):
+    start = time.perf_counter()
+    preds, notes = _worker_router._predict_block(block, sensor, soil_rolling)
+    return list(preds), list(notes), time.perf_counter() - start
+
+
+def predictions_first(pred_df):
+    """Reorder columns to show sensor_type and prediction first"""
+    cols = ['sensor_type', 'prediction'] + [col for col in pred_df.columns if col not in ['sensor_type', 'prediction']]
+    return pred_df[cols]
+
+
+def predict_single_sensor(df, sensor_key, model_dir="models", label=None):
+    """Predict df with the pipeline for sensor_key; usable outside Streamlit"""
+    router = AllInOneRouter(model_dir=model_dir)
+    return router.predict_single_sensor(df, sensor_key, label=label)
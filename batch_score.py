@@ -0,0 +1,282 @@
+# batch_score.py
+# Headless batch scoring: python batch_score.py data/*.csv --workers 4 --format parquet
+#
+# Runs without Streamlit. Each input file is scored chunk by chunk in a worker
+# process that keeps its models loaded for every file it handles.
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# The router, models and pyarrow load in _init_worker, so --help and input
+# errors return without importing them
+import instrumentation
+
+_router = None
+
+
+def expand_inputs(patterns):
+    """Resolve files, directories (their *.csv) and glob patterns to CSV paths"""
+    paths = []
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(glob.glob(os.path.join(pattern, "*.csv")))
+        else:
+            matches = sorted(glob.glob(pattern, recursive=True)) or [pattern]
+        for path in matches:
+            if os.path.abspath(path) not in seen:
+                seen.add(os.path.abspath(path))
+                paths.append(path)
+    return paths
+
+
+def output_path_for(input_path, output_dir, fmt, base_dir=None):
+    """Output file of an input; base_dir keeps its directory relative to base_dir"""
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    subdir = ""
+    if base_dir is not None:
+        subdir = os.path.relpath(os.path.dirname(os.path.abspath(input_path)), base_dir)
+    return os.path.normpath(os.path.join(output_dir, subdir, f"{stem}_predictions.{fmt}"))
+
+
+def output_paths(inputs, output_dir, fmt):
+    """
+    Output file per input. Inputs from several directories keep their path
+    relative to the directory they share, so a/x.csv and b/x.csv do not
+    overwrite each other.
+    """
+    dirs = {os.path.dirname(os.path.abspath(p)) for p in inputs}
+    base_dir = os.path.commonpath(list(dirs)) if len(dirs) > 1 else None
+    return [output_path_for(p, output_dir, fmt, base_dir) for p in inputs]
+
+
+def _init_worker(model_dir, detection="header", instrument=False, engine="native"):
+    global _router
+    if instrument:
+        instrumentation.enable()
+    # These imports are required so joblib can unpickle the custom classes
+    from custom_transformers import WaferAggregator, FeatureEngineer, SoilSensorPipeline
+    from all_in_one_router import AllInOneRouter
+    _router = AllInOneRouter(model_dir=model_dir, detection=detection, engine=engine)
+
+
+def _get_router(model_dir, detection="header", engine="native"):
+    if _router is None or _router.detection != detection or _router.engine != engine:
+        _init_worker(model_dir, detection, engine=engine)
+    return _router
+
+
+def score_file(input_path, output_path, fmt="csv", chunksize=100000,
+               sensor_key=None, model_dir="models", chunk_workers=None, detection="header",
+               engine="native", compact=False, model_columns_only=False):
+    """Score one CSV into output_path; returns rows, seconds and per-sensor timings"""
+    router = _get_router(model_dir, detection, engine)
+    router.timings = {}
+    start = time.perf_counter()
+    rows = 0
+
+    try:
+        chunks = router.iter_predict_csv(input_path, chunksize=chunksize, sensor_key=sensor_key,
+                                         workers=chunk_workers, compact=compact,
+                                         model_columns_only=model_columns_only)
+        if fmt == "parquet":
+            rows = _write_parquet(chunks, output_path)
+        else:
+            with open(output_path, "w", newline="", encoding="utf-8") as out:
+                for i, pred in enumerate(chunks):
+                    pred.to_csv(out, index=False, header=(i == 0))
+                    rows += len(pred)
+    finally:
+        # Shut down the --chunk-workers pool; the next file starts a new one
+        router.close()
+
+    return {
+        "input": input_path,
+        "output": output_path,
+        "rows": rows,
+        "seconds": time.perf_counter() - start,
+        "timings": router.timings,
+        # Cumulative per process; the latest snapshot of each pid is kept
+        "instrumentation": (os.getpid(), instrumentation.snapshot()) if instrumentation.is_enabled() else None,
+    }
+
+
+def _write_parquet(chunks, output_path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet output needs pyarrow: pip install pyarrow")
+
+    rows = 0
+    writer = None
+    try:
+        for pred in chunks:
+            table = pa.Table.from_pandas(pred, preserve_index=False)
+            if writer is None:
+                # A column without values in the first chunk is typed as text,
+                # which any later values can be cast to
+                schema = pa.schema([pa.field(f.name, pa.string()) if table.column(i).null_count == len(table)
+                                    else f.remove_metadata() for i, f in enumerate(table.schema)])
+                writer = pq.ParquetWriter(output_path, schema)
+            writer.write_table(_conform(table, writer.schema))
+            rows += len(pred)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+def _conform(table, schema):
+    """Cast a chunk's columns to the file schema fixed by the first chunk"""
+    import pyarrow as pa
+
+    columns = []
+    for field in schema:
+        column = table.column(field.name)
+        if not column.type.equals(field.type):
+            try:
+                column = column.cast(field.type)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                raise ValueError(f"column {field.name}: {column.type} values do not fit the "
+                                 f"{field.type} type of the first chunk; use --format csv ({e})")
+        columns.append(column)
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def merge_instrumentation(results):
+    """Sum the latest instrumentation snapshot of every worker process"""
+    latest = {}
+    for r in results:
+        if r.get("instrumentation"):
+            pid, snap = r["instrumentation"]
+            latest[pid] = snap
+    merged = {}
+    for snap in latest.values():
+        for name, s in snap.items():
+            m = merged.setdefault(name, {"calls": 0, "errors": 0, "wall_s": 0.0, "cpu_s": 0.0, "rows": 0})
+            for key in m:
+                m[key] += s[key]
+    for m in merged.values():
+        m["rows_per_s"] = m["rows"] / m["wall_s"] if m["rows"] and m["wall_s"] else None
+    return merged
+
+
+def print_report(results, wall, failed=0):
+    total_rows = sum(r["rows"] for r in results)
+    print()
+    print(f"{'file':<40} {'rows':>10} {'seconds':>9} {'rows/s':>12}")
+    for r in results:
+        rate = r["rows"] / r["seconds"] if r["seconds"] else 0
+        print(f"{os.path.basename(r['input']):<40} {r['rows']:>10} {r['seconds']:>9.2f} {rate:>12,.0f}")
+
+    sensors = {}
+    for r in results:
+        for sensor, t in r["timings"].items():
+            agg = sensors.setdefault(sensor, {"rows": 0, "seconds": 0.0})
+            agg["rows"] += t["rows"]
+            agg["seconds"] += t["seconds"]
+
+    if sensors:
+        print()
+        print(f"{'sensor':<14} {'rows':>10} {'seconds':>9} {'rows/s':>12}")
+        for sensor, t in sorted(sensors.items()):
+            rate = t["rows"] / t["seconds"] if t["seconds"] else 0
+            print(f"{sensor:<14} {t['rows']:>10} {t['seconds']:>9.2f} {rate:>12,.0f}")
+
+    print()
+    rate = total_rows / wall if wall else 0
+    summary = f"Scored {total_rows} rows from {len(results)} files in {wall:.2f}s ({rate:,.0f} rows/s)"
+    if failed:
+        print(f"[ERROR] {summary}; {failed} of {len(results) + failed} files failed")
+    else:
+        print(f"[OK] {summary}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score sensor CSV files without the Streamlit UI")
+    parser.add_argument("inputs", nargs="+", help="CSV files, directories or glob patterns")
+    parser.add_argument("-o", "--output-dir", default="predictions", help="Where prediction files are written")
+    parser.add_argument("-f", "--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Worker processes (files are scored in parallel)")
+    parser.add_argument("--chunksize", type=int, default=100000, help="Rows read per chunk")
+    parser.add_argument("--chunk-workers", type=int, default=None,
+                        help="Score each chunk's sensor groups in this many processes (use with --workers 1)")
+    parser.add_argument("--sensor", choices=["wafer", "soil", "gas", "temperature", "light"],
+                        help="Score every file with this sensor instead of auto-detecting")
+    parser.add_argument("--detection", choices=["header", "rows"], default="header",
+                        help="'rows' detects the sensor per row, for files mixing several sensors")
+    parser.add_argument("--engine", choices=["native", "numpy"], default="native",
+                        help="'numpy' scores small batches of tree models with numpy_inference")
+    parser.add_argument("--compact", action="store_true",
+                        help="Read float32 readings, Int64 epochs and categorical wafer ids")
+    parser.add_argument("--model-columns-only", action="store_true",
+                        help="With --sensor, read (and echo) only the columns its model uses")
+    parser.add_argument("--model-dir", default="models")
+    parser.add_argument("--stats-json", help="Record per-function timings and write them to this JSON file")
+    parser.add_argument("--profile", help="Write sampled stacks (collapsed, flame-graph ready) of this process here")
+    args = parser.parse_args(argv)
+    if args.model_columns_only and not args.sensor:
+        parser.error("--model-columns-only needs --sensor")
+
+    inputs = expand_inputs(args.inputs)
+    missing = [p for p in inputs if not os.path.isfile(p)]
+    if missing:
+        print(f"[ERROR] Input not found: {', '.join(missing)}")
+        return 1
+    jobs = list(zip(inputs, output_paths(inputs, args.output_dir, args.format)))
+    for _, out in jobs:
+        os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    options = dict(fmt=args.format, chunksize=args.chunksize, sensor_key=args.sensor,
+                   model_dir=args.model_dir, chunk_workers=args.chunk_workers,
+                   detection=args.detection, engine=args.engine, compact=args.compact,
+                   model_columns_only=args.model_columns_only)
+
+    if args.stats_json:
+        instrumentation.enable()
+    profiler = instrumentation.SamplingProfiler(args.profile).start() if args.profile else None
+
+    start = time.perf_counter()
+    results = []
+    failed = 0
+    if args.workers <= 1:
+        for inp, out in jobs:
+            try:
+                results.append(score_file(inp, out, **options))
+                print(f"[OK] {inp} -> {out}")
+            except Exception as e:
+                failed += 1
+                print(f"[ERROR] {inp}: {e}")
+    else:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                 initargs=(args.model_dir, args.detection, bool(args.stats_json), args.engine)) as pool:
+            futures = {pool.submit(score_file, inp, out, **options): inp for inp, out in jobs}
+            for fut in as_completed(futures):
+                inp = futures[fut]
+                try:
+                    result = fut.result()
+                    results.append(result)
+                    print(f"[OK] {inp} -> {result['output']}")
+                except Exception as e:
+                    failed += 1
+                    print(f"[ERROR] {inp}: {e}")
+
+    wall = time.perf_counter() - start
+    if profiler is not None:
+        profiler.stop()
+    print_report(results, wall, failed)
+
+    if args.stats_json:
+        with open(args.stats_json, "w", encoding="utf-8") as f:
+            json.dump({"functions": merge_instrumentation(results)}, f, indent=2)
+        print(f"[OK] Function timings written to {args.stats_json}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
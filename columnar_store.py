@@ -0,0 +1,403 @@
+# columnar_store.py
+# Memory-mapped columnar files for scoring dumps larger than RAM.
+#
+# A store is a directory of .npy files and a columns.json manifest (row
+# count, column names, kinds):
+#   - numeric columns are one float64 file, NaN for missing
+#   - text columns are UTF-8 bytes, int64 offsets into them and a validity
+#     mask, so any number of distinct values is kept
+#   - category columns (prediction outputs) are int32 codes into a list kept
+#     in the manifest, -1 for missing
+# Uncompressed Arrow IPC / Feather v2 files are memory-mapped the same way
+# (needs pyarrow). AllInOneRouter.predict_columnar() reads either slice by
+# slice and writes sensor_type and prediction into a store of this format.
+#
+#   python columnar_store.py convert dump.csv dump.cols --chunksize 200000
+#   python columnar_store.py score dump.cols predictions.cols --sensor wafer
+
+import argparse
+import io
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+MANIFEST = "columns.json"
+# Rows re-encoded at a time when a numeric column turns out to hold text
+BLOCK_ROWS = 1 << 20
+
+
+def _npy_header(dtype, rows):
+    """.npy header of a 1-D array; numpy pads it, so its length does not depend on rows"""
+    buf = io.BytesIO()
+    np.lib.format.write_array_header_1_0(buf, {
+        "descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+        "fortran_order": False,
+        "shape": (rows,),
+    })
+    return buf.getvalue()
+
+
+def _write_manifest(path, rows, specs):
+    tmp = os.path.join(path, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"rows": rows, "columns": specs}, f)
+    os.replace(tmp, os.path.join(path, MANIFEST))
+
+
+def _number_text(values):
+    """Text of float values as a CSV would hold them; None where missing"""
+    return [None if v != v else (str(int(v)) if float(v).is_integer() else repr(float(v)))
+            for v in values]
+
+
+def is_columnar(path):
+    """True for a store directory or an Arrow/Feather file"""
+    if os.path.isdir(path):
+        return os.path.isfile(os.path.join(path, MANIFEST))
+    return os.path.splitext(path)[1].lower() in (".arrow", ".feather", ".ipc")
+
+
+# ==========================================================
+# READERS
+# ==========================================================
+class NpyColumns:
+    """Store directory with every column memory-mapped on first use"""
+
+    def __init__(self, path):
+        with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.path = path
+        self.rows = manifest["rows"]
+        self.columns = [c["name"] for c in manifest["columns"]]
+        self._specs = {c["name"]: c for c in manifest["columns"]}
+        self._arrays = {}
+        self._categories = {}
+
+    def __len__(self):
+        return self.rows
+
+    def _load(self, file):
+        arr = self._arrays.get(file)
+        if arr is None:
+            arr = self._arrays[file] = np.load(os.path.join(self.path, file), mmap_mode="r")
+        return arr
+
+    def _decode(self, name, codes):
+        categories = self._categories.get(name)
+        if categories is None:
+            # Trailing NaN so code -1 decodes to missing
+            categories = np.array(self._specs[name]["categories"] + [np.nan], dtype=object)
+            self._categories[name] = categories
+        return categories[codes]
+
+    def _text(self, spec, lo, hi):
+        offsets = self._load(spec["files"]["offsets"])[lo:hi + 1]
+        valid = self._load(spec["files"]["valid"])[lo:hi]
+        data = self._load(spec["files"]["data"])[offsets[0]:offsets[-1]].tobytes()
+        starts = (offsets - offsets[0]).tolist()
+        values = np.full(len(valid), np.nan, dtype=object)
+        for i in np.flatnonzero(valid).tolist():
+            values[i] = data[starts[i]:starts[i + 1]].decode("utf-8")
+        return values
+
+    def frame(self, lo, hi, columns=None):
+        """DataFrame of rows lo:hi; only that slice is read into memory"""
+        data = {}
+        for name in self.columns if columns is None else columns:
+            spec = self._specs[name]
+            if spec["kind"] == "text":
+                data[name] = self._text(spec, lo, hi)
+            elif spec["kind"] == "category":
+                data[name] = self._decode(name, self._load(spec["file"])[lo:hi])
+            else:
+                data[name] = np.array(self._load(spec["file"])[lo:hi])
+        return pd.DataFrame(data, index=pd.RangeIndex(lo, hi))
+
+
+class ArrowColumns:
+    """Uncompressed Arrow IPC / Feather v2 file read through a memory map"""
+
+    def __init__(self, path):
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise RuntimeError("Arrow/Feather input needs pyarrow: pip install pyarrow")
+        # read_all() on a memory map references the file's buffers without
+        # copying them; compressed files would be decompressed into memory.
+        self.table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        self.path = path
+        self.columns = list(self.table.column_names)
+
+    def __len__(self):
+        return self.table.num_rows
+
+    def frame(self, lo, hi, columns=None):
+        """DataFrame of rows lo:hi; only that slice is converted"""
+        table = self.table.slice(lo, hi - lo)
+        if columns is not None:
+            table = table.select(list(columns))
+        df = table.to_pandas()
+        df.index = pd.RangeIndex(lo, hi)
+        return df
+
+
+def open_columnar(path):
+    """NpyColumns for a store directory, ArrowColumns for an Arrow/Feather file"""
+    if isinstance(path, (NpyColumns, ArrowColumns)):
+        return path
+    if os.path.isdir(path):
+        return NpyColumns(path)
+    return ArrowColumns(path)
+
+
+# ==========================================================
+# WRITERS
+# ==========================================================
+class _AppendFile:
+    """
+    A 1-D .npy file appended to in pieces. The header is written for zero
+    entries and rewritten with the final length on close.
+    """
+
+    def __init__(self, path, dtype):
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.length = 0
+        self._f = open(path, "wb")
+        self._f.write(_npy_header(self.dtype, 0))
+
+    def write(self, values):
+        values = np.ascontiguousarray(values, dtype=self.dtype)
+        self._f.write(values.tobytes())
+        self.length += len(values)
+
+    def close(self):
+        header = _npy_header(self.dtype, self.length)
+        if len(header) != len(_npy_header(self.dtype, 0)):
+            raise RuntimeError(f"{self.path}: .npy header grew with the length")
+        self._f.seek(0)
+        self._f.write(header)
+        self._f.close()
+
+
+class _AppendColumn:
+    """
+    One column appended chunk by chunk. The kind is decided by the first
+    chunk with a value (leading all-missing chunks are held back as a
+    count), and a numeric column is re-encoded as text when a later chunk
+    holds values that are not numbers, so nothing is coerced away.
+    """
+
+    def __init__(self, path, prefix, name):
+        self.path = path
+        self.prefix = prefix
+        self.name = name
+        self.kind = None
+        self.rows = 0
+        self._files = {}
+        self._text_bytes = 0
+
+    def _open(self, part, dtype):
+        self._files[part] = _AppendFile(os.path.join(self.path, f"{self.prefix}{part}.npy"), dtype)
+
+    def _start(self, kind):
+        """Open the files of kind and write the rows held back as missing"""
+        self.kind = kind
+        if kind == "numeric":
+            self._open("", np.float64)
+        else:
+            self._open(".offsets", np.int64)
+            self._open(".data", np.uint8)
+            self._open(".valid", np.bool_)
+            self._files[".offsets"].write([0])
+        for lo in range(0, self.rows, BLOCK_ROWS):
+            n = min(BLOCK_ROWS, self.rows - lo)
+            if kind == "numeric":
+                self._files[""].write(np.full(n, np.nan))
+            else:
+                self._append_text([None] * n)
+
+    def append(self, series):
+        present = series.notna().to_numpy()
+        if self.kind is None:
+            if not present.any():
+                self.rows += len(series)
+                return
+            self._start("numeric" if pd.api.types.is_numeric_dtype(series.dtype) else "text")
+
+        if self.kind == "numeric":
+            if not pd.api.types.is_numeric_dtype(series.dtype):
+                numbers = pd.to_numeric(series, errors="coerce")
+                if (numbers.notna().to_numpy() == present).all():
+                    series = numbers
+                else:
+                    self._promote()
+        if self.kind == "numeric":
+            self._files[""].write(series.to_numpy(dtype=np.float64, na_value=np.nan))
+        elif pd.api.types.is_numeric_dtype(series.dtype):
+            self._append_text(_number_text(series.to_numpy(dtype=np.float64, na_value=np.nan)))
+        else:
+            self._append_text([str(v) if ok else None
+                               for v, ok in zip(series.to_numpy(dtype=object), present)])
+        self.rows += len(series)
+
+    def _append_text(self, values):
+        encoded = [b"" if v is None else v.encode("utf-8") for v in values]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        self._files[".offsets"].write(self._text_bytes + np.cumsum(lengths))
+        self._files[".data"].write(np.frombuffer(b"".join(encoded), dtype=np.uint8))
+        self._files[".valid"].write([v is not None for v in values])
+        self._text_bytes += int(lengths.sum())
+
+    def _promote(self):
+        """Re-encode the numeric rows written so far as text"""
+        numeric = self._files.pop("")
+        numeric.close()
+        numbers = np.load(numeric.path, mmap_mode="r")
+        rows, self.rows = self.rows, 0
+        self._start("text")
+        for lo in range(0, rows, BLOCK_ROWS):
+            self._append_text(_number_text(numbers[lo:lo + BLOCK_ROWS]))
+        self.rows = rows
+        del numbers
+        os.remove(numeric.path)
+
+    def finish(self):
+        """Manifest entry of the column; an all-missing column is numeric"""
+        if self.kind is None:
+            self._start("numeric")
+        for f in self._files.values():
+            f.close()
+        spec = {"name": self.name, "kind": self.kind}
+        if self.kind == "numeric":
+            spec["file"] = os.path.basename(self._files[""].path)
+        else:
+            spec["files"] = {part[1:]: os.path.basename(f.path) for part, f in self._files.items()}
+        return spec
+
+
+def convert_csv(source, output_dir, chunksize=200000):
+    """
+    Convert a CSV into a store directory, one chunk at a time.
+
+    Returns the row count.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    writers = None
+    rows = 0
+
+    for chunk in pd.read_csv(source, chunksize=chunksize):
+        if writers is None:
+            writers = [_AppendColumn(output_dir, f"c{i:05d}", name)
+                       for i, name in enumerate(chunk.columns)]
+        for writer, name in zip(writers, chunk.columns):
+            writer.append(chunk[name])
+        rows += len(chunk)
+
+    _write_manifest(output_dir, rows, [w.finish() for w in writers or []])
+    return rows
+
+
+class ColumnarOutput:
+    """
+    Output columns of a known row count, written slice by slice into
+    memory-mapped .npy files. A column is numeric (float64, NaN where
+    nothing was written) or, when it receives text, category codes.
+    """
+
+    def __init__(self, path, rows):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.rows = rows
+        self._columns = {}
+
+    def write(self, lo, **values):
+        """Write each column's values (None = missing) to rows lo:lo+len(values)"""
+        for name, vals in values.items():
+            column = self._columns.get(name)
+            if column is None:
+                column = self._columns[name] = {"kind": None, "array": None, "categories": {},
+                                                "file": f"c{len(self._columns):05d}.npy"}
+            present = [v for v in vals if v is not None]
+            if not present:
+                continue
+            if column["array"] is None:
+                numeric = np.asarray(present).dtype.kind in "biuf"
+                self._open(column, "numeric" if numeric else "category")
+
+            hi = lo + len(vals)
+            if column["kind"] == "numeric":
+                column["array"][lo:hi] = np.array([np.nan if v is None else v for v in vals], dtype=np.float64)
+            else:
+                categories = column["categories"]
+                column["array"][lo:hi] = [-1 if v is None else categories.setdefault(str(v), len(categories))
+                                          for v in vals]
+
+    def _open(self, column, kind):
+        dtype = np.float64 if kind == "numeric" else np.int32
+        array = np.lib.format.open_memmap(os.path.join(self.path, column["file"]), mode="w+",
+                                          dtype=dtype, shape=(self.rows,))
+        array[:] = np.nan if kind == "numeric" else -1
+        column.update(kind=kind, array=array)
+
+    def close(self):
+        specs = []
+        for name, column in self._columns.items():
+            if column["array"] is None:
+                self._open(column, "numeric")
+            column["array"].flush()
+            spec = {"name": name, "file": column["file"], "kind": column["kind"]}
+            if column["kind"] == "category":
+                spec["categories"] = list(column["categories"])
+            specs.append(spec)
+            column["array"] = None
+        _write_manifest(self.path, self.rows, specs)
+
+
+# ==========================================================
+# CLI
+# ==========================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert CSVs to memory-mapped columns and score them out of core")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    convert = sub.add_parser("convert", help="CSV -> store directory")
+    convert.add_argument("input")
+    convert.add_argument("output")
+    convert.add_argument("--chunksize", type=int, default=200000, help="CSV rows read per chunk")
+
+    score = sub.add_parser("score", help="Store directory or Arrow/Feather file -> prediction store")
+    score.add_argument("input")
+    score.add_argument("output")
+    score.add_argument("--chunksize", type=int, default=50000, help="Rows scored per slice")
+    score.add_argument("--sensor", choices=["wafer", "soil", "gas", "temperature", "light"],
+                       help="Score every row with this sensor instead of auto-detecting")
+    score.add_argument("--detection", choices=["header", "rows"], default="header")
+    score.add_argument("--model-dir", default="models")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        print(f"[ERROR] Input not found: {args.input}")
+        return 1
+
+    if args.command == "convert":
+        rows = convert_csv(args.input, args.output, chunksize=args.chunksize)
+        print(f"[OK] {args.input} -> {args.output} ({rows} rows)")
+        return 0
+
+    # These imports are required so joblib can unpickle the custom classes
+    from custom_transformers import WaferAggregator, FeatureEngineer, SoilSensorPipeline
+    from all_in_one_router import AllInOneRouter
+
+    router = AllInOneRouter(model_dir=args.model_dir, detection=args.detection)
+    summary = router.predict_columnar(args.input, args.output, chunk_rows=args.chunksize,
+                                      sensor_key=args.sensor)
+    print(f"[OK] {args.input} -> {args.output} ({summary['rows']} rows, {summary['chunks']} slices)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+# compiled_models.py
+# Compact model artifacts that load without unpickling the full object graph.
+#
+# One .compiled.npz per pipeline, next to its .joblib copy:
+#   - XGBoost models as the booster's native UBJSON bytes
+#   - StandardScaler / LabelEncoder parameters as plain arrays
+#   - our own transformers as their (JSON) attributes
+# Pipelines with any other step (RandomForest, KNNImputer, SVC) are not
+# exported; they stay .joblib only.
+#
+# Written by scripts/export_compiled_models.py. Each artifact records the
+# sha256 of the .joblib it was compiled from; ModelRegistry uses it only when
+# compiled models are enabled and that fingerprint matches.
+#
+# sklearn, xgboost and custom_transformers are imported on export/load only.
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+COMPILED_SUFFIX = ".compiled.npz"
+FORMAT_VERSION = 2
+
+_SCALER_ARRAYS = ("mean_", "var_", "scale_", "feature_names_in_")
+_SCALER_ATTRS = ("with_mean", "with_std", "copy", "n_features_in_", "n_samples_seen_")
+
+
+def compiled_path(path):
+    """models/x_pipeline.joblib -> models/x_pipeline.compiled.npz"""
+    root, _ = os.path.splitext(str(path))
+    return root + COMPILED_SUFFIX
+
+
+def is_compiled(path):
+    return str(path).endswith(COMPILED_SUFFIX)
+
+
+class NotCompilable(ValueError):
+    """The model has a step without a compact form"""
+
+
+def source_fingerprint(path):
+    """sha256 of a model file, recorded in the artifact compiled from it"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def compiled_source(path):
+    """Fingerprint of the file an artifact was compiled from (None if not recorded)"""
+    with np.load(path) as data:
+        return json.loads(str(data["__spec__"])).get("source")
+
+
+def _json_safe(value):
+    try:
+        json.dumps(value)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def _plain(value):
+    """NumPy scalars -> Python scalars so they can go into the JSON spec"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+# ==========================================================
+# EXPORT
+# ==========================================================
+class _Writer:
+    def __init__(self):
+        self.arrays = {}
+
+    def array(self, key, value):
+        value = np.asarray(value)
+        spec = {"key": key, "object": value.dtype == object}
+        # Object arrays (feature names, string classes) are stored as unicode
+        # so the artifact never needs allow_pickle
+        self.arrays[key] = value.astype(str) if spec["object"] else value
+        return spec
+
+    def step(self, obj, key):
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import StandardScaler, LabelEncoder
+        import custom_transformers
+        from custom_transformers import SoilSensorPipeline
+
+        if isinstance(obj, Pipeline):
+            return {
+                "kind": "pipeline",
+                "steps": [[name, self.step(s, f"{key}.{name}")] for name, s in obj.steps],
+            }
+
+        if isinstance(obj, SoilSensorPipeline):
+            return {
+                "kind": "soil_pipeline",
+                "parts": {name: self.step(getattr(obj, name), f"{key}.{name}")
+                          for name in ("scaler", "encoder", "model")},
+            }
+
+        if type(obj) is StandardScaler:
+            return {
+                "kind": "standard_scaler",
+                "attrs": {a: _plain(getattr(obj, a)) for a in _SCALER_ATTRS if hasattr(obj, a)},
+                "arrays": {a: self.array(f"{key}.{a}", getattr(obj, a))
+                           for a in _SCALER_ARRAYS if getattr(obj, a, None) is not None},
+            }
+
+        if type(obj) is LabelEncoder:
+            return {"kind": "label_encoder", "classes_": self.array(f"{key}.classes_", obj.classes_)}
+
+        if type(obj).__module__ == "xgboost.sklearn":
+            params = {k: v for k, v in obj.get_params().items() if _json_safe(v)}
+            raw = obj.get_booster().save_raw(raw_format="ubj")
+            return {
+                "kind": "xgboost",
+                "class": type(obj).__name__,
+                "params": params,
+                "booster": self.array(f"{key}.booster", np.frombuffer(bytes(raw), dtype=np.uint8)),
+            }
+
+        cls = type(obj)
+        if getattr(custom_transformers, cls.__name__, None) is cls and _json_safe(vars(obj)):
+            return {"kind": "state", "class": cls.__name__, "state": vars(obj)}
+
+        raise NotCompilable(f"no compact form for {cls.__module__}.{cls.__name__}")
+
+
+def export_compiled(model, path, source=None):
+    """
+    Write model as a compact artifact at path (atomically); returns its spec.
+
+    source is the model file it was loaded from, fingerprinted into the spec.
+    Raises NotCompilable (and writes nothing) for unsupported steps.
+    """
+    writer = _Writer()
+    spec = {"format": FORMAT_VERSION, "root": writer.step(model, "m"),
+            "source": source_fingerprint(source) if source else None}
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, __spec__=np.asarray(json.dumps(spec)), **writer.arrays)
+    os.replace(tmp, path)
+    return spec
+
+
+# ==========================================================
+# LOAD
+# ==========================================================
+class _Reader:
+    def __init__(self, data):
+        self.data = data
+
+    def array(self, spec):
+        value = self.data[spec["key"]]
+        return value.astype(object) if spec["object"] else value
+
+    def step(self, spec):
+        from sklearn.pipeline import Pipeline
+        from sklearn.preprocessing import StandardScaler, LabelEncoder
+        import custom_transformers
+        from custom_transformers import SoilSensorPipeline
+
+        kind = spec["kind"]
+
+        if kind == "pipeline":
+            return Pipeline([(name, self.step(s)) for name, s in spec["steps"]])
+
+        if kind == "soil_pipeline":
+            obj = SoilSensorPipeline.__new__(SoilSensorPipeline)
+            for name, part in spec["parts"].items():
+                setattr(obj, name, self.step(part))
+            return obj
+
+        if kind == "standard_scaler":
+            obj = StandardScaler()
+            for name, value in spec["attrs"].items():
+                setattr(obj, name, value)
+            for name, a in spec["arrays"].items():
+                setattr(obj, name, self.array(a))
+            for name in ("mean_", "var_"):
+                if not hasattr(obj, name):
+                    setattr(obj, name, None)
+            return obj
+
+        if kind == "label_encoder":
+            obj = LabelEncoder()
+            obj.classes_ = self.array(spec["classes_"])
+            return obj
+
+        if kind == "xgboost":
+            import xgboost
+            obj = getattr(xgboost, spec["class"])(**spec["params"])
+            obj.load_model(bytearray(self.array(spec["booster"])))
+            return obj
+
+        if kind == "state":
+            cls = getattr(custom_transformers, spec["class"])
+            obj = cls.__new__(cls)
+            obj.__dict__.update(spec["state"])
+            return obj
+
+        raise ValueError(f"Unknown step kind in compiled model: {kind}")
+
+
+def load_compiled(path):
+    """Rebuild a predict-equivalent model from a compiled artifact"""
+    with np.load(path) as data:
+        spec = json.loads(str(data["__spec__"]))
+        if spec.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported compiled model format {spec.get('format')} in {path}")
+        return _Reader(data).step(spec["root"])
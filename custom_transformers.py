@@ -2,9 +2,116 @@
 from sklearn.base import BaseEstimator, TransformerMixin
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from xgboost import XGBClassifier
 
+from instrumentation import timed
+
+try:
+    import pyarrow as pa
+except ImportError:  # string timestamps then always go through pd.to_datetime
+    pa = None
+
+def group_segments(keys):
+    """(starts, run_groups, n_groups) of runs of equal keys in sorted key order; None if a key has several runs"""
+    codes, uniques = pd.factorize(keys, sort=True)
+    n_groups = len(uniques)
+    if len(codes) == 0:
+        return np.empty(0, dtype=np.intp), codes, 0
+
+    starts = np.concatenate([[0], np.flatnonzero(codes[1:] != codes[:-1]) + 1])
+    run_groups = codes[starts]
+    if np.count_nonzero(run_groups >= 0) != n_groups:
+        return None
+    return starts, run_groups, n_groups
+
+
+def segment_moments(values, starts):
+    """Per-segment count, mean, M2, min and max of values[starts[i]:starts[i + 1]], skipping NaN"""
+    # Private float64 copy; it is reused as scratch space below
+    values = np.array(values, dtype=np.float64)
+    lengths = np.diff(np.append(starts, len(values)))
+
+    vmin = np.fmin.reduceat(values, starts)
+    vmax = np.fmax.reduceat(values, starts)
+
+    missing = np.isnan(values)
+    has_nan = missing.any()
+    if has_nan:
+        count = lengths - np.add.reduceat(missing, starts, dtype=np.int64)
+        values[missing] = 0.0
+    else:
+        count = lengths
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.add.reduceat(values, starts) / count
+        # values becomes the deviations from the segment mean
+        values -= np.repeat(mean, lengths)
+        if has_nan:
+            values[missing] = 0.0
+        # Second pass: corrected mean and M2 from deviations (numerically stable)
+        mean += np.add.reduceat(values, starts) / count
+        values *= values
+        m2 = np.add.reduceat(values, starts)
+
+    return count, mean, m2, vmin, vmax
+
+
+def moments_to_std(count, m2):
+    """Sample std (ddof=1) from count and M2; NaN for fewer than two values"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 1, np.sqrt(m2 / (count - 1)), np.nan)
+
+
+# ==========================================================
+# COLUMN PROJECTION
+# ==========================================================
+def _numpy_dtype(dtype):
+    """NumPy dtype a numeric feature contributes to the block, or None"""
+    if isinstance(dtype, np.dtype):
+        return dtype if dtype.kind in "biuf" else None
+    # Nullable Int64/Float32/boolean columns; pd.NA becomes NaN
+    if pd.api.types.is_numeric_dtype(dtype) and hasattr(dtype, "numpy_dtype"):
+        return dtype.numpy_dtype
+    return None
+
+
+def project_columns(X, columns, values=None, fill=0, fillna=None):
+    """
+    DataFrame of exactly columns: values[c] if given, else X[c], else fill.
+
+    Numeric features go into one new float block, so the rest of X is never
+    copied; non-numeric ones fall back to a plain frame.
+    """
+    values = values or {}
+    sources = [values[c] if c in values else X[c] if c in X.columns else fill for c in columns]
+    dtypes = [_numpy_dtype(s.dtype if hasattr(s, "dtype") else np.asarray(s).dtype) for s in sources]
+
+    if any(d is None for d in dtypes) or any(np.ndim(s) > 1 for s in sources):
+        df = pd.DataFrame(dict(zip(columns, sources)), index=X.index)
+        return df if fillna is None else df.fillna(fillna)
+
+    dtype = np.result_type(*dtypes) if dtypes else np.dtype(np.float64)
+    if dtype.kind != "f":
+        dtype = np.dtype(np.float64)
+    # One row per feature, so each column is filled with a contiguous write
+    block = np.empty((len(columns), len(X)), dtype=dtype)
+    for row, src in zip(block, sources):
+        if isinstance(src, pd.Series) and not isinstance(src.dtype, np.dtype):
+            src = src.to_numpy(dtype=dtype, na_value=np.nan)
+        elif isinstance(src, pd.Series):
+            src = src.to_numpy()
+        row[...] = src
+    if fillna is not None:
+        np.copyto(block, fillna, where=np.isnan(block))
+    return pd.DataFrame(block.T, index=X.index, columns=columns, copy=False)
+
+
+# Leading rows checked for wafer grouping before the NumPy path is tried
+GROUPED_CHECK_ROWS = 100000
+
+
 class WaferAggregator(BaseEstimator, TransformerMixin):
     def __init__(self, target="faulty"):
         self.wafer_col = None
@@ -17,24 +124,29 @@ class WaferAggregator(BaseEstimator, TransformerMixin):
                 break
         return self
 
+    @timed("WaferAggregator.transform")
     def transform(self, df):
-        df = df.copy()
-
         if self.wafer_col is None:
             for c in df.columns:
                 if 'wafer' in c.lower():
                     self.wafer_col = c
                     break
 
-        for c in list(df.columns):
-            if 'time' in c.lower():
-                df.drop(columns=[c], inplace=True, errors='ignore')
-
-        feature_cols = [c for c in df.columns if c not in [self.wafer_col, self.target]]
+        # The aggregations read only the wafer, target and feature columns,
+        # so df is neither copied nor trimmed
+        time_cols = [c for c in df.columns if 'time' in c.lower()]
+        feature_cols = [c for c in df.columns if c not in [self.wafer_col, self.target] and c not in time_cols]
 
         if not feature_cols:
-            return df.reset_index(drop=True)
+            return df.drop(columns=time_cols).reset_index(drop=True)
+
+        df_agg = self._aggregate_numpy(df, feature_cols)
+        if df_agg is None:
+            df_agg = self._aggregate_pandas(df, feature_cols)
+
+        return df_agg
 
+    def _aggregate_pandas(self, df, feature_cols):
         df_agg = df.groupby(self.wafer_col)[feature_cols].agg(['mean', 'std', 'min', 'max'])
         df_agg.columns = ['_'.join(col).strip() for col in df_agg.columns.values]
 
@@ -43,6 +155,236 @@ class WaferAggregator(BaseEstimator, TransformerMixin):
 
         return df_agg.reset_index(drop=True)
 
+    def _aggregate_numpy(self, df, feature_cols):
+        """_aggregate_pandas from segment reductions when each wafer's rows are contiguous, else None"""
+        if self.wafer_col not in df.columns or isinstance(df[self.wafer_col].dtype, pd.CategoricalDtype):
+            return None
+        if not all(isinstance(c, str) for c in feature_cols) or len(set(feature_cols)) != len(feature_cols):
+            return None
+        dtypes = df.dtypes[feature_cols]
+        if not all(isinstance(t, np.dtype) and t.kind in "fiu" for t in dtypes):
+            return None
+
+        keys = df[self.wafer_col]
+        # Cheap check on the first rows before factorizing every key
+        head = keys.iloc[:GROUPED_CHECK_ROWS]
+        prev = head.shift()
+        new_run = (head.ne(prev) & ~(head.isna() & prev.isna())).to_numpy()
+        if len(new_run) and int(new_run[1:].sum()) + 1 != head.nunique(dropna=False):
+            return None
+
+        try:
+            segments = group_segments(keys)
+        except TypeError:
+            return None
+        if segments is None or segments[2] == 0:
+            return None
+        starts, run_groups, n_groups = segments
+
+        # Runs are in file order; pick them out in sorted wafer order
+        keep = np.flatnonzero(run_groups >= 0)
+        pick = np.empty(n_groups, dtype=np.intp)
+        pick[run_groups[keep]] = keep
+        one_row_each = len(starts) == len(df)
+
+        out = {}
+        for c in feature_cols:
+            raw = df[c].to_numpy()
+            dtype = dtypes[c]
+
+            if one_row_each:
+                # A single reading is its own mean, min and max
+                values = raw[pick]
+                mean = values.astype(np.float64) if dtype.kind != "f" else values
+                std = np.full(n_groups, np.nan, dtype=mean.dtype)
+                vmin = vmax = values
+            else:
+                count, mean, m2, vmin, vmax = segment_moments(raw, starts)
+                std = moments_to_std(count, m2)[pick]
+                mean, vmin, vmax = mean[pick], vmin[pick], vmax[pick]
+                if dtype.kind != "f":
+                    # Integer min/max stay integers; reduce the raw values so
+                    # large ints are not rounded through float64
+                    vmin = np.minimum.reduceat(raw, starts)[pick]
+                    vmax = np.maximum.reduceat(raw, starts)[pick]
+
+            if dtype.kind == "f":
+                # pandas keeps float32 statistics in float32
+                mean, std = mean.astype(dtype, copy=False), std.astype(dtype, copy=False)
+                vmin, vmax = vmin.astype(dtype, copy=False), vmax.astype(dtype, copy=False)
+            out[f"{c}_mean"] = mean
+            out[f"{c}_std"] = std
+            out[f"{c}_min"] = vmin
+            out[f"{c}_max"] = vmax
+
+        df_agg = pd.DataFrame(out)
+
+        if self.target in df.columns:
+            df_agg[self.target] = df.groupby(self.wafer_col)[self.target].max().reset_index(drop=True)
+
+        return df_agg
+
+
+# ==========================================================
+# TIMESTAMP FEATURES
+# ==========================================================
+EPOCH_UNITS_PER_HOUR = {"s": 3600, "ms": 3_600_000, "us": 3_600_000_000, "ns": 3_600_000_000_000}
+_NAT = np.iinfo(np.int64).min
+
+# Digit positions of "YYYY-MM-DD HH:MM:SS" per accepted string width
+_ISO_FIELDS = {
+    10: {"year": (0, 4), "month": (5, 7), "day": (8, 10)},
+    16: {"year": (0, 4), "month": (5, 7), "day": (8, 10), "hour": (11, 13), "minute": (14, 16)},
+    19: {"year": (0, 4), "month": (5, 7), "day": (8, 10), "hour": (11, 13), "minute": (14, 16),
+         "second": (17, 19)},
+}
+_ISO_SEPARATORS = {4: b"-", 7: b"-", 10: b" T", 13: b":", 16: b":"}
+
+
+def _epoch_values(col):
+    """int64 epoch values and a valid mask for a numeric column, or None"""
+    dtype = col.dtype
+    if pd.api.types.is_integer_dtype(dtype):
+        if dtype == np.uint64 and len(col) and col.max() > np.iinfo(np.int64).max:
+            return None
+        # Nullable Int64 columns (typed CSV loads) carry a mask instead of NaN
+        values = col.to_numpy(dtype=np.int64, na_value=_NAT)
+        return values, values != _NAT
+    if pd.api.types.is_float_dtype(dtype):
+        values = col.to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(values)
+        finite = values[valid]
+        # Fractional or out-of-range epochs keep pandas' rounding rules
+        if not np.all((finite == np.floor(finite)) & (np.abs(finite) < 2.0 ** 63)):
+            return None
+        return np.where(valid, values, 0).astype(np.int64), valid
+    return None
+
+
+def _civil_days(year, month, day):
+    """Days since 1970-01-01 of proleptic Gregorian dates (year >= 1)"""
+    y = year - (month <= 2)
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+def _string_bytes(col):
+    """(chars, valid): uint8 (n_valid, width) bytes of an Arrow string column of one width, else None"""
+    if pa is None or getattr(col.dtype, "storage", None) != "pyarrow":
+        return None
+    arr = pa.array(col)
+    if isinstance(arr, pa.ChunkedArray):
+        arr = arr.combine_chunks()
+    if not pa.types.is_string(arr.type) and not pa.types.is_large_string(arr.type):
+        return None
+
+    valid = ~col.isna().to_numpy()
+    _, offsets_buf, data_buf = arr.buffers()
+    offset_type = np.int64 if pa.types.is_large_string(arr.type) else np.int32
+    offsets = np.frombuffer(offsets_buf, dtype=offset_type)[arr.offset:arr.offset + len(arr) + 1]
+    starts = offsets[:-1][valid].astype(np.int64)
+    if not len(starts):
+        return np.empty((0, 0), dtype=np.uint8), valid
+
+    lengths = np.diff(offsets)[valid]
+    width = int(lengths[0])
+    if width == 0 or not np.all(lengths == width):
+        return None
+    data = np.frombuffer(data_buf, dtype=np.uint8)
+    if np.all(np.diff(starts) == width):
+        chars = data[starts[0]:starts[0] + len(starts) * width].reshape(len(starts), width)
+    else:
+        chars = data[starts[:, None] + np.arange(width)]
+    return chars, valid
+
+
+def _iso_hours(col):
+    """(hours since epoch, valid) of uniform "YYYY-MM-DD[ HH:MM[:SS]]" strings, else None"""
+    parsed = _string_bytes(col)
+    if parsed is None:
+        return None
+    chars, valid = parsed
+    hours = np.zeros(len(col), dtype=np.int64)
+    if not len(chars):
+        return hours, valid
+
+    width = chars.shape[1]
+    fields = _ISO_FIELDS.get(width)
+    if fields is None:
+        return None
+    # One row per character position, so each field is a contiguous read
+    chars = np.ascontiguousarray(chars.T)
+    for pos, allowed in _ISO_SEPARATORS.items():
+        if pos < width:
+            column = chars[pos]
+            ok = column == allowed[0]
+            for c in allowed[1:]:
+                ok |= column == c
+            if not ok.all():
+                return None
+
+    positions = [i for lo, hi in fields.values() for i in range(lo, hi)]
+    digits = chars[positions] - np.uint8(ord("0"))
+    if (digits > 9).any():  # bytes below "0" wrap past 9 as well
+        return None
+
+    values = {}
+    col = 0
+    for name, (lo, hi) in fields.items():
+        value = digits[col].astype(np.int32)
+        for i in range(col + 1, col + hi - lo):
+            value = value * 10 + digits[i]
+        values[name] = value
+        col += hi - lo
+
+    year, month, day = values["year"], values["month"], values["day"]
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    month_days = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])[np.clip(month - 1, 0, 11)]
+    month_days = month_days + ((month == 2) & leap)
+    hour = values.get("hour", 0)
+    if ((year < 1) | (month < 1) | (month > 12) | (day < 1) | (day > month_days)).any():
+        return None
+    if (np.any(hour > 23) or np.any(values.get("minute", 0) > 59)
+            or np.any(values.get("second", 0) > 59)):
+        return None
+
+    hours[valid] = _civil_days(year, month, day).astype(np.int64) * 24 + hour
+    return hours, valid
+
+
+def timestamp_hour_dayofweek(col, unit="ms"):
+    """
+    hour and dayofweek (int64, 0 where missing) of integer epochs in unit or
+    uniform ISO strings; None for columns that need pd.to_datetime.
+    """
+    if pd.api.types.is_numeric_dtype(col.dtype) and not pd.api.types.is_bool_dtype(col.dtype):
+        parsed = _epoch_values(col)
+        if parsed is None:
+            return None
+        values, valid = parsed
+        hours = values // EPOCH_UNITS_PER_HOUR[unit]
+    elif pd.api.types.is_string_dtype(col.dtype):
+        parsed = _iso_hours(col)
+        if parsed is None:
+            return None
+        hours, valid = parsed
+    else:
+        return None
+
+    hour = np.where(valid, hours % 24, 0)
+    # 1970-01-01 was a Thursday (dayofweek 3)
+    dayofweek = np.where(valid, (hours // 24 + 3) % 7, 0)
+    return hour, dayofweek
+
+
+def _datetime_hour_dayofweek(dt):
+    """hour/dayofweek of a parsed datetime Series as int64, 0 for NaT"""
+    return (dt.dt.hour.fillna(0).to_numpy(dtype=np.int64),
+            dt.dt.dayofweek.fillna(0).to_numpy(dtype=np.int64))
+
 
 class FeatureEngineer(BaseEstimator, TransformerMixin):
     def __init__(self):
@@ -64,29 +406,22 @@ class FeatureEngineer(BaseEstimator, TransformerMixin):
                 return col
         return None
 
+    @timed("FeatureEngineer.transform")
     def transform(self, X):
-        X = X.copy()
-
         ts = self.detect_timestamp(X)
         if ts:
-            try:
-                X["datetime"] = pd.to_datetime(X[ts], unit="ms", origin="unix", errors="coerce")
-            except Exception:
-                X["datetime"] = pd.to_datetime(X[ts], errors="coerce")
-            X["hour"] = X["datetime"].dt.hour.fillna(0)
-            X["dayofweek"] = X["datetime"].dt.dayofweek.fillna(0)
+            parts = timestamp_hour_dayofweek(X[ts], unit="ms")
+            if parts is None:
+                try:
+                    dt = pd.to_datetime(X[ts], unit="ms", origin="unix", errors="coerce")
+                except Exception:
+                    dt = pd.to_datetime(X[ts], errors="coerce")
+                parts = _datetime_hour_dayofweek(dt)
         else:
-            X["hour"] = 0
-            X["dayofweek"] = 0
-
-        X = X.drop(columns=["datetime"], errors="ignore")
+            parts = (0, 0)
 
         required_cols = ["mq2_value", "temperature", "humidity", "hour", "dayofweek"]
-        for col in required_cols:
-            if col not in X.columns:
-                X[col] = 0
-
-        return X[required_cols]
+        return project_columns(X, required_cols, values=dict(zip(["hour", "dayofweek"], parts)))
 
 
 class LDRFeatureEngineer(BaseEstimator, TransformerMixin):
@@ -99,23 +434,9 @@ class LDRFeatureEngineer(BaseEstimator, TransformerMixin):
         self.feature_names_ = None
 
     def fit(self, X, y=None):
-        # Store the feature names during fit
-        X_copy = X.copy()
-        ts_col = self.detect_timestamp_col(X_copy)
-        if ts_col:
-            X_copy["_dt"] = pd.to_datetime(X_copy[ts_col], errors="coerce")
-            X_copy["hour"] = X_copy["_dt"].dt.hour.fillna(0).astype(int)
-            X_copy["dayofweek"] = X_copy["_dt"].dt.dayofweek.fillna(0).astype(int)
-            X_copy.drop(columns=["_dt"], errors="ignore", inplace=True)
-        else:
-            X_copy["hour"] = 0
-            X_copy["dayofweek"] = 0
-        
-        # Auto-detect LDR features
+        # Store the feature names during fit; hour/dayofweek are always produced
         ldr_features = ["ldr_value", "voltage", "resistance", "ambient_light"]
-        available_features = [col for col in ldr_features if col in X_copy.columns]
-        
-        # Store the feature columns to use
+        available_features = [col for col in ldr_features if col in X.columns]
         self.feature_names_ = available_features + ["hour", "dayofweek"]
         return self
 
@@ -125,33 +446,80 @@ class LDRFeatureEngineer(BaseEstimator, TransformerMixin):
                 return col
         return None
     
+    @timed("LDRFeatureEngineer.transform")
     def transform(self, X):
-        X = X.copy()
-        ts_col = self.detect_timestamp_col(X)
-        if ts_col:
-            # LDR timestamps appear as ISO strings, parse directly.
-            X["_dt"] = pd.to_datetime(X[ts_col], errors="coerce")
-            X["hour"] = X["_dt"].dt.hour.fillna(0).astype(int)
-            X["dayofweek"] = X["_dt"].dt.dayofweek.fillna(0).astype(int)
-            X.drop(columns=["_dt"], errors="ignore", inplace=True)
-        else:
-            X["hour"] = 0
-            X["dayofweek"] = 0
-
         # Use the feature names stored during fit
         if self.feature_names_ is None:
             # Fallback to LDR features if fit wasn't called
             required = ["ldr_value", "voltage", "resistance", "ambient_light", "hour", "dayofweek"]
         else:
             required = self.feature_names_
-        
-        for col in required:
-            if col not in X.columns:
-                X[col] = 0
+
+        ts_col = self.detect_timestamp_col(X)
+        # LDR timestamps appear as ISO strings; numbers parse as ns epochs,
+        # as pd.to_datetime reads them without a unit
+        parts = timestamp_hour_dayofweek(X[ts_col], unit="ns") if ts_col else (0, 0)
+        if parts is None:
+            parts = _datetime_hour_dayofweek(pd.to_datetime(X[ts_col], errors="coerce"))
 
         # Basic missing handling (resistance has NaNs). Keep logic simple: fill remaining NaNs with 0.
-        X[required] = X[required].fillna(0)
-        return X[required]
+        return project_columns(X, required, values=dict(zip(["hour", "dayofweek"], parts)), fillna=0)
+
+
+def rolling_mean_std(values, window=3, history=None):
+    """
+    Rolling mean/std (min_periods=1, ddof=1, std of one value -> 0) over values.
+
+    history holds the values that precede this batch, so a series split into
+    batches gives the same result as the whole series. NaNs are skipped,
+    like pandas rolling.
+
+    Each window is summed directly, so results are not bit-identical to
+    pandas rolling().mean()/std(), whose running add/remove sums drift with
+    the series length. For readings of magnitude M the two agree within
+    1e-10 * M over 200k rows (tests/test_soil_rolling.py).
+    """
+    values = np.asarray(values, dtype=float)
+    if history is None:
+        history = np.full(window - 1, np.nan)
+    if len(values) == 0:
+        return np.empty(0), np.empty(0)
+
+    windows = sliding_window_view(np.concatenate([history, values]), window)
+    valid = ~np.isnan(windows)
+    count = valid.sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(valid, windows, 0).sum(axis=1) / count
+        dev = np.where(valid, windows - mean[:, None], 0)
+        var = (dev * dev).sum(axis=1) / (count - 1)
+
+    std = np.where(count > 1, np.sqrt(var), 0.0)
+    return mean, std
+
+
+class SoilRollingFeatures:
+    """Streaming rolling_mean/rolling_std for soil sensor_value across batches"""
+    def __init__(self, window=3, history=None):
+        self.window = window
+        self.reset()
+        if history is not None:
+            self.advance(history)
+
+    def reset(self):
+        self.tail = np.full(self.window - 1, np.nan)
+
+    def advance(self, values):
+        """Carry the last window-1 readings into the next batch"""
+        values = np.asarray(values, dtype=float)
+        self.tail = np.concatenate([self.tail, values])[len(values):]
+
+    @timed("SoilRollingFeatures.transform")
+    def transform(self, values):
+        values = np.asarray(values, dtype=float)
+        mean, std = rolling_mean_std(values, self.window, self.tail)
+        self.advance(values)
+        return mean, std
 
 
 class SoilSensorPipeline:
@@ -169,15 +537,14 @@ class SoilSensorPipeline:
             eval_metric="logloss"
         )
 
+    @timed("SoilSensorPipeline._prepare_features")
     def _prepare_features(self, X):
-        X = X.copy()
+        if "sensor_value" not in X.columns:
+            raise ValueError("Missing 'sensor_value' column to generate features.")
+        rolling = {}
         if "rolling_mean" not in X.columns or "rolling_std" not in X.columns:
-            if "sensor_value" in X.columns:
-                X["rolling_mean"] = X["sensor_value"].rolling(window=3, min_periods=1).mean()
-                X["rolling_std"] = X["sensor_value"].rolling(window=3, min_periods=1).std().fillna(0)
-            else:
-                raise ValueError("Missing 'sensor_value' column to generate features.")
-        return X[["sensor_value", "rolling_mean", "rolling_std"]]
+            rolling["rolling_mean"], rolling["rolling_std"] = rolling_mean_std(X["sensor_value"], window=3)
+        return project_columns(X, ["sensor_value", "rolling_mean", "rolling_std"], values=rolling)
 
     def predict(self, X):
         X_prepared = self._prepare_features(X)
@@ -0,0 +1,156 @@
+# dataset_store.py
+import gzip
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+STORE_DIR = os.path.join("user_datasets", "objects")
+HASH_BLOCK_SIZE = 1024 * 1024
+COMPRESS_LEVEL = 6
+
+
+class DatasetStore:
+    """
+    Content-addressed store for uploaded and predicted datasets.
+
+    Each dataset is saved once as gzip-compressed CSV under the SHA-256 of
+    its content, so identical uploads share one file and IDs never change.
+    put() returns the ID right away; compression and the disk write happen
+    on a background thread.
+    """
+
+    def __init__(self, root=STORE_DIR, max_workers=1):
+        self.root = root
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dataset-store")
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    # ----------------------------------------------------------
+    # IDs and paths
+    # ----------------------------------------------------------
+    def path_for(self, dataset_id):
+        return os.path.join(self.root, dataset_id[:2], f"{dataset_id}.csv.gz")
+
+    def exists(self, dataset_id):
+        return os.path.exists(self.path_for(dataset_id))
+
+    @staticmethod
+    def hash_bytes(data):
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def hash_file(path):
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    @staticmethod
+    def hash_frame(df):
+        # Vectorized row hashes plus the header; no CSV serialization needed
+        h = hashlib.sha256()
+        h.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode("utf-8"))
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+        return h.hexdigest()
+
+    # ----------------------------------------------------------
+    # Writes
+    # ----------------------------------------------------------
+    def put(self, data):
+        """
+        Store a DataFrame, raw CSV bytes or a CSV file path; returns its dataset ID.
+
+        A DataFrame must not be modified after it is handed over.
+        """
+        if isinstance(data, (bytes, bytearray)):
+            dataset_id = self.hash_bytes(data)
+            source = bytes(data)
+        elif isinstance(data, (str, os.PathLike)):
+            dataset_id = self.hash_file(data)
+            source = None
+        else:
+            dataset_id = self.hash_frame(data)
+            source = data
+
+        with self._lock:
+            if dataset_id in self._pending or self.exists(dataset_id):
+                return dataset_id
+            if source is None:
+                # The caller may delete its file; keep a cheap private reference
+                source = self._stage_file(data)
+            self._pending[dataset_id] = self._executor.submit(self._write, dataset_id, source)
+        return dataset_id
+
+    def _stage_file(self, path):
+        staging = os.path.join(self.root, "staging")
+        os.makedirs(staging, exist_ok=True)
+        staged = os.path.join(staging, uuid.uuid4().hex)
+        try:
+            os.link(path, staged)
+        except OSError:
+            shutil.copyfile(path, staged)
+        return staged
+
+    def _write(self, dataset_id, source):
+        final = self.path_for(dataset_id)
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        tmp = f"{final}.{uuid.uuid4().hex}.tmp"
+        try:
+            if isinstance(source, bytes):
+                with gzip.open(tmp, "wb", compresslevel=COMPRESS_LEVEL) as out:
+                    out.write(source)
+            elif isinstance(source, str):
+                with open(source, "rb") as src, gzip.open(tmp, "wb", compresslevel=COMPRESS_LEVEL) as out:
+                    shutil.copyfileobj(src, out, HASH_BLOCK_SIZE)
+                os.remove(source)
+            else:
+                source.to_csv(tmp, index=False, compression={"method": "gzip", "compresslevel": COMPRESS_LEVEL})
+            os.replace(tmp, final)
+        except Exception as e:
+            print(f"[ERROR] storing dataset {dataset_id}: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        finally:
+            with self._lock:
+                self._pending.pop(dataset_id, None)
+
+    def flush(self, timeout=None):
+        """Wait for queued writes to finish"""
+        with self._lock:
+            futures = list(self._pending.values())
+        for fut in futures:
+            fut.result(timeout=timeout)
+
+    # ----------------------------------------------------------
+    # Reads
+    # ----------------------------------------------------------
+    def read_bytes(self, dataset_id):
+        """Decompressed CSV bytes of a dataset, or None if it is not stored (yet)"""
+        with self._lock:
+            fut = self._pending.get(dataset_id)
+        if fut is not None:
+            fut.result()
+        path = self.path_for(dataset_id)
+        if not os.path.exists(path):
+            return None
+        with gzip.open(path, "rb") as f:
+            return f.read()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_dataset_store():
+    """Return the process-wide dataset store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = DatasetStore()
+        return _store
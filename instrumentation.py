@@ -0,0 +1,174 @@
+# instrumentation.py
+# Per-function timing for the scoring hot path, plus an optional sampling profiler.
+#
+# Off by default. Turn it on with SENSOR_INSTRUMENTATION=1 or enable(); while
+# off, a wrapped function costs one flag check on top of the call.
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+_enabled = os.environ.get("SENSOR_INSTRUMENTATION", "").lower() in ("1", "true", "yes")
+_stats = {}
+_lock = threading.Lock()
+
+
+def enable(flag=True):
+    global _enabled
+    _enabled = bool(flag)
+
+
+def is_enabled():
+    return _enabled
+
+
+def _default_rows(args):
+    """Rows of the first DataFrame/array argument (skipping self)"""
+    for a in args[:2]:
+        shape = getattr(a, "shape", None)
+        if shape:
+            return shape[0]
+    return 0
+
+
+def timed(name, rows=True):
+    """
+    Record calls, wall time, thread CPU time and rows for the wrapped function.
+
+    rows=True counts the rows of the first DataFrame/array argument; pass
+    False for functions that do not process rows. Times are inclusive, so a
+    wrapped caller also counts the time of wrapped callees.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+
+            wall = time.perf_counter()
+            cpu = time.thread_time()
+            failed = False
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                _record(name, time.perf_counter() - wall, time.thread_time() - cpu,
+                        _default_rows(args) if rows else 0, failed)
+        return wrapper
+    return decorator
+
+
+def _record(name, wall, cpu, rows, failed):
+    with _lock:
+        s = _stats.get(name)
+        if s is None:
+            s = _stats[name] = {"calls": 0, "errors": 0, "wall_s": 0.0, "cpu_s": 0.0, "rows": 0}
+        s["calls"] += 1
+        s["errors"] += failed
+        s["wall_s"] += wall
+        s["cpu_s"] += cpu
+        s["rows"] += rows
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+# ==========================================================
+# EXPORT
+# ==========================================================
+def snapshot():
+    """Copy of the counters per function, with rows/s over wall time"""
+    with _lock:
+        snap = {name: dict(s) for name, s in _stats.items()}
+    for s in snap.values():
+        s["rows_per_s"] = s["rows"] / s["wall_s"] if s["rows"] and s["wall_s"] else None
+    return snap
+
+
+def write_json(path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"enabled": _enabled, "functions": snapshot()}, f, indent=2)
+
+
+_PROM_METRICS = [
+    ("calls", "sensor_fn_calls_total", "Calls of an instrumented function"),
+    ("errors", "sensor_fn_errors_total", "Calls that raised"),
+    ("wall_s", "sensor_fn_wall_seconds_total", "Wall-clock seconds spent (inclusive)"),
+    ("cpu_s", "sensor_fn_cpu_seconds_total", "Thread CPU seconds spent (inclusive)"),
+    ("rows", "sensor_fn_rows_total", "Input rows processed"),
+]
+
+
+def prometheus_text():
+    """Counters in the Prometheus text exposition format"""
+    snap = snapshot()
+    lines = []
+    for key, metric, help_text in _PROM_METRICS:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        for name in sorted(snap):
+            label = name.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'{metric}{{fn="{label}"}} {snap[name][key]}')
+    return "\n".join(lines) + "\n"
+
+
+# ==========================================================
+# SAMPLING PROFILER
+# ==========================================================
+class SamplingProfiler:
+    """
+    Samples the Python stack of every thread at a fixed interval and writes
+    them as collapsed stacks ("frame;frame;frame count" per line), the input
+    format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, path, interval=0.005):
+        self.path = path
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with open(self.path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        print(f"[OK] Wrote {sum(self.samples.values())} stack samples to {self.path}")
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
@@ -0,0 +1,195 @@
+# log_store.py
+import json
+import os
+import sqlite3
+import threading
+from collections import Counter
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are still atomic per line, just unlocked
+    fcntl = None
+
+TAIL_BLOCK_SIZE = 64 * 1024
+
+
+def _lock(f):
+    if fcntl:
+        fcntl.flock(f, fcntl.LOCK_EX)
+
+
+def _unlock(f):
+    if fcntl:
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class JsonLinesLogStore:
+    """Append-only activity log: one JSON object per line, oldest first"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, entry):
+        self.extend([entry])
+
+    def extend(self, entries):
+        """Append several entries (oldest first) under one lock"""
+        lines = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries)
+        with open(self.path, "a", encoding="utf-8") as f:
+            _lock(f)
+            try:
+                f.write(lines)
+                f.flush()
+            finally:
+                _unlock(f)
+
+    def latest(self, limit):
+        """Newest `limit` entries, reading only the tail of the file"""
+        if limit <= 0 or not os.path.exists(self.path):
+            return []
+
+        with open(self.path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            data = b""
+            # One extra line, since the first one in the buffer may be partial
+            while pos > 0 and data.count(b"\n") <= limit:
+                step = min(TAIL_BLOCK_SIZE, pos)
+                pos -= step
+                f.seek(pos)
+                data = f.read(step) + data
+
+        lines = data.splitlines()
+        if pos > 0:
+            lines = lines[1:]
+        return self._parse(reversed(lines), limit)
+
+    def all(self):
+        """Every entry, newest first"""
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "rb") as f:
+            lines = f.read().splitlines()
+        return self._parse(reversed(lines))
+
+    def is_empty(self):
+        return not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+
+    @staticmethod
+    def _parse(lines, limit=None):
+        entries = []
+        for line in lines:
+            if limit is not None and len(entries) >= limit:
+                break
+            try:
+                entries.append(json.loads(line))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                # Skip a torn or corrupted line rather than losing the log
+                continue
+        return entries
+
+
+class SQLiteLogStore:
+    """Activity log in a local SQLite table indexed by username/date"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS activity_logs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "username TEXT, date TEXT, entry TEXT NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_activity_user_date "
+                "ON activity_logs (username, date)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def append(self, entry):
+        self.extend([entry])
+
+    def extend(self, entries):
+        """Append several entries (oldest first) in one transaction"""
+        rows = [
+            (e.get("username"), e.get("date"), json.dumps(e, ensure_ascii=False))
+            for e in entries
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO activity_logs (username, date, entry) VALUES (?, ?, ?)", rows
+            )
+
+    def latest(self, limit):
+        if limit <= 0:
+            return []
+        cur = self._connect().execute(
+            "SELECT entry FROM activity_logs ORDER BY id DESC LIMIT ?", (limit,)
+        )
+        return [json.loads(row[0]) for row in cur]
+
+    def all(self):
+        cur = self._connect().execute("SELECT entry FROM activity_logs ORDER BY id DESC")
+        return [json.loads(row[0]) for row in cur]
+
+    def is_empty(self):
+        cur = self._connect().execute("SELECT 1 FROM activity_logs LIMIT 1")
+        return cur.fetchone() is None
+
+
+def _entry_key(entry):
+    return json.dumps(entry, ensure_ascii=False, sort_keys=True)
+
+
+def migrate_json_log(store, json_path):
+    """
+    One-time import of a legacy activity_logs.json (newest first) into store.
+
+    Entries the store already holds (e.g. from an interrupted import) are
+    skipped. The old file is renamed to *.migrated so the import never runs twice.
+    """
+    if not os.path.exists(json_path):
+        return 0
+
+    # Serialize concurrent first starts so the import happens exactly once
+    with open(json_path + ".lock", "a") as lock_file:
+        _lock(lock_file)
+        try:
+            if not os.path.exists(json_path):
+                return 0
+
+            try:
+                with open(json_path, "r", encoding="utf-8") as f:
+                    logs = json.load(f)
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                # Keep the file so it can be fixed and imported on the next start
+                print(f"[ERROR] Cannot read {json_path}: {e}; activity logs not migrated")
+                return 0
+
+            present = Counter() if store.is_empty() else Counter(_entry_key(e) for e in store.all())
+            new = []
+            for entry in reversed(logs):
+                key = _entry_key(entry)
+                if present[key]:
+                    present[key] -= 1
+                else:
+                    new.append(entry)
+            if new:
+                store.extend(new)
+
+            os.replace(json_path, json_path + ".migrated")
+        finally:
+            _unlock(lock_file)
+
+    skipped = len(logs) - len(new)
+    print(f"[OK] Migrated {len(new)} activity logs from {json_path}"
+          + (f" ({skipped} already in the store)" if skipped else ""))
+    return len(new)
@@ -0,0 +1,145 @@
+# model_registry.py
+import os
+import threading
+import time
+
+from compiled_models import compiled_path, compiled_source, source_fingerprint
+from model_utils import load_model
+
+# Load .compiled.npz artifacts (scripts/export_compiled_models.py) instead of the .joblib
+COMPILED_MODELS = os.environ.get("SENSOR_COMPILED_MODELS", "").lower() in ("1", "true", "yes")
+
+MODEL_FILES = {
+    "wafer": "wafer_pipeline.joblib",
+    "soil": "soil_moisture_pipeline.joblib",
+    "gas": "gas_pipeline.joblib",
+    "temperature": "temperature_pipeline.joblib",
+    "light": "ldr_pipeline.joblib",
+}
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of sensor pipelines.
+
+    Each pipeline is loaded the first time its sensor is requested and then
+    shared by every caller. The file's mtime is checked on each lookup, so a
+    replaced model on disk is reloaded on the next request.
+    """
+
+    def __init__(self, model_dir="models", mmap_mode="r", use_compiled=None):
+        self.model_dir = model_dir
+        self.mmap_mode = mmap_mode
+        self.use_compiled = COMPILED_MODELS if use_compiled is None else use_compiled
+        # artifact path -> ((joblib mtime, size, artifact mtime), fingerprint matched)
+        self._verified = {}
+        self._entries = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def path_for(self, sensor):
+        """The .joblib, or its compiled artifact when enabled and compiled from that exact file"""
+        fname = MODEL_FILES.get(sensor)
+        if not fname:
+            return None
+        path = os.path.join(self.model_dir, fname)
+        if self.use_compiled:
+            compiled = compiled_path(path)
+            if os.path.exists(compiled) and self._compiled_matches(path, compiled):
+                return compiled
+        return path
+
+    def _compiled_matches(self, path, compiled):
+        """True if compiled records path's sha256; rehashed only when either file changes"""
+        try:
+            src, art = os.stat(path), os.stat(compiled)
+        except OSError:
+            return False
+        key = (src.st_mtime_ns, src.st_size, art.st_mtime_ns)
+        cached = self._verified.get(compiled)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        try:
+            matches = compiled_source(compiled) == source_fingerprint(path)
+        except Exception as e:
+            print(f"[WARN] reading {compiled}: {e}")
+            matches = False
+        if not matches:
+            print(f"[WARN] {compiled} was not compiled from the current {path}; using the .joblib")
+        self._verified[compiled] = (key, matches)
+        return matches
+
+    def get(self, sensor):
+        """Return the pipeline for a sensor, or None if it is missing or broken"""
+        path = self.path_for(sensor)
+        if path is None:
+            return None
+
+        start = time.perf_counter()
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        entry = self._entries.get(sensor)
+        if entry is None or entry["mtime"] != mtime or entry["path"] != path:
+            with self._lock:
+                entry = self._entries.get(sensor)
+                if entry is None or entry["mtime"] != mtime or entry["path"] != path:
+                    entry = self._load(sensor, path, mtime)
+                    return entry["model"]
+
+        stats = self._stats[sensor]
+        stats["warm_hits"] += 1
+        stats["warm_load_s"] = time.perf_counter() - start
+        return entry["model"]
+
+    def _load(self, sensor, path, mtime):
+        start = time.perf_counter()
+        model = None
+        try:
+            model = load_model(path, mmap_mode=self.mmap_mode)
+        except Exception as e:
+            print(f"[ERROR] loading {path}: {e}")
+        elapsed = time.perf_counter() - start
+
+        reloaded = sensor in self._entries
+        entry = {"model": model, "mtime": mtime, "path": path}
+        self._entries[sensor] = entry
+
+        stats = self._stats.setdefault(sensor, {
+            "loads": 0, "warm_hits": 0, "cold_load_s": None, "warm_load_s": None,
+        })
+        stats["loads"] += 1
+        stats["cold_load_s"] = elapsed
+        stats["loaded"] = model is not None
+
+        if model is not None:
+            action = "Reloaded" if reloaded else "Loaded"
+            print(f"[OK] {action} {sensor} in {elapsed:.3f}s")
+        return entry
+
+    def preload(self):
+        """Load every available pipeline up front"""
+        for sensor in MODEL_FILES:
+            self.get(sensor)
+
+    def stats(self):
+        """Per-model load counters and cold/warm load times in seconds"""
+        return {sensor: dict(s) for sensor, s in self._stats.items()}
+
+
+_REGISTRIES = {}
+_REGISTRIES_LOCK = threading.Lock()
+
+
+def get_registry(model_dir="models"):
+    """Return the shared registry for a model directory"""
+    key = os.path.abspath(model_dir)
+    with _REGISTRIES_LOCK:
+        registry = _REGISTRIES.get(key)
+        if registry is None:
+            registry = ModelRegistry(model_dir)
+            _REGISTRIES[key] = registry
+        return registry
@@ -2,9 +2,15 @@
 import joblib
 import cloudpickle
 
-def load_model(path):
+from compiled_models import is_compiled, load_compiled
+from instrumentation import timed
+
+@timed("model_utils.load_model", rows=False)
+def load_model(path, mmap_mode=None):
+    if is_compiled(path):
+        return load_compiled(path)
     try:
-        return joblib.load(path)
+        return joblib.load(path, mmap_mode=mmap_mode)
     except Exception as e1:
         try:
             with open(path, "rb") as f:
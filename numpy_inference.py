@@ -0,0 +1,310 @@
+# numpy_inference.py
+# Pure-NumPy predictors for the tree-ensemble pipelines.
+#
+# compile_model() returns an object with the same predict() output as a
+# StandardScaler + XGBClassifier/RandomForest pipeline, without the per-call
+# validation overhead; None for other pipelines (wafer). Used by
+# AllInOneRouter(engine="numpy").
+
+import json
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from xgboost import XGBClassifier
+
+import custom_transformers
+from custom_transformers import SoilSensorPipeline
+
+# Rows evaluated per block; bounds the (rows x trees) node-index matrix
+CHUNK_ROWS = 4096
+
+_FLOAT_DTYPES = (np.float64, np.float32, np.float16)
+
+
+def _float_array(X):
+    """Private float copy of X, keeping float32/float16 like sklearn's check_array"""
+    arr = np.array(X)
+    if arr.dtype not in _FLOAT_DTYPES:
+        arr = arr.astype(np.float64)
+    return arr
+
+
+# ==========================================================
+# TREES
+# ==========================================================
+class _Trees:
+    """Trees flattened into node arrays; a step is node = left[node] + go_right, leaves loop on themselves"""
+
+    def __init__(self, roots, feature, threshold, left, missing_right, depth, inclusive):
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.missing_right = missing_right
+        self.depth = depth
+        # sklearn sends x <= threshold left, xgboost x < threshold
+        self.inclusive = inclusive
+
+    def apply(self, X):
+        """Leaf node index per (row, tree)"""
+        n, k = X.shape
+        node = np.broadcast_to(self.roots, (n, len(self.roots))).copy()
+        flat = X.ravel()
+        row_base = (np.arange(n) * k)[:, None]
+        has_nan = np.isnan(flat).any()
+        for _ in range(self.depth):
+            x = flat.take(row_base + self.feature.take(node))
+            threshold = self.threshold.take(node)
+            go_right = x > threshold if self.inclusive else x >= threshold
+            if has_nan:
+                missing = np.isnan(x)
+                go_right[missing] = self.missing_right.take(node[missing])
+            node = self.left.take(node) + go_right
+        return node
+
+
+def _flatten(trees, inclusive, threshold_dtype):
+    """_Trees and leaf values from per-tree node arrays"""
+    roots, parts = [], []
+    offset = 0
+    depth = 0
+    for t in trees:
+        left, right = t["left"], t["right"]
+        # Breadth-first renumbering with siblings side by side
+        order = [0]
+        new_left = {}
+        for old in order:
+            if left[old] >= 0:
+                new_left[old] = len(order)
+                order.extend((left[old], right[old]))
+        order = np.asarray(order)
+        new_id = np.empty(len(order), dtype=np.intp)
+        new_id[order] = np.arange(len(order))
+
+        leaf = left[order] < 0
+        child = np.array([new_left.get(old, 0) for old in order], dtype=np.intp)
+        parts.append((
+            np.where(leaf, 0, t["feature"][order]),
+            np.where(leaf, np.nan, t["threshold"][order]),
+            np.where(leaf, new_id[order], child) + offset,
+            ~leaf & ~np.asarray(t["missing_left"], dtype=bool)[order],
+            t["value"][order],
+        ))
+        roots.append(offset)
+        offset += len(order)
+        depth = max(depth, t["depth"])
+
+    feature, threshold, left, missing_right, value = (np.concatenate(p) for p in zip(*parts))
+    trees = _Trees(np.asarray(roots, dtype=np.intp), feature.astype(np.intp),
+                   threshold.astype(threshold_dtype), left.astype(np.intp),
+                   missing_right, depth, inclusive)
+    return trees, value
+
+
+def _tree_depth(left, right):
+    depth = np.zeros(len(left), dtype=np.int64)
+    for i in range(len(left)):
+        if left[i] >= 0:
+            depth[left[i]] = depth[i] + 1
+            depth[right[i]] = depth[i] + 1
+    return int(depth.max())
+
+
+# ==========================================================
+# ESTIMATORS
+# ==========================================================
+class _XGBBinary:
+    """binary:logistic gbtree booster; predict() matches XGBClassifier.predict"""
+
+    # Above this many rows xgboost's own predictor is faster
+    max_rows = 128
+
+    def __init__(self, trees, leaf_value, base_margin, n_features):
+        self.trees = trees
+        self.leaf_value = leaf_value
+        self.base_margin = base_margin
+        self.n_features = n_features
+
+    @classmethod
+    def compile(cls, model):
+        booster = model.get_booster()
+        learner = json.loads(bytes(booster.save_raw(raw_format="json")))["learner"]
+        gbm = learner["gradient_booster"]
+        if (learner["objective"]["name"] != "binary:logistic" or gbm["name"] != "gbtree"
+                or int(learner["learner_model_param"]["num_class"]) > 1):
+            return None
+
+        trees = gbm["model"]["trees"]
+        best = booster.attr("best_iteration")
+        if best is not None:
+            trees = trees[:int(gbm["model"]["iteration_indptr"][int(best) + 1])]
+
+        flat = []
+        for t in trees:
+            if any(t["split_type"]):
+                return None  # categorical splits
+            left = np.asarray(t["left_children"], dtype=np.int64)
+            right = np.asarray(t["right_children"], dtype=np.int64)
+            cond = np.asarray(t["split_conditions"], dtype=np.float32)
+            flat.append({
+                "feature": np.asarray(t["split_indices"], dtype=np.int64),
+                "threshold": cond,
+                "left": left,
+                "right": right,
+                "missing_left": np.asarray(t["default_left"], dtype=bool),
+                "depth": _tree_depth(left, right),
+                # Leaf values live in split_conditions
+                "value": np.where(left < 0, cond, np.float32(0)),
+            })
+
+        base_score = float(learner["learner_model_param"]["base_score"].strip("[]"))
+        base_margin = np.float32(-np.log(1.0 / base_score - 1.0))
+        n_features = int(learner["learner_model_param"]["num_feature"])
+        return cls(*_flatten(flat, False, np.float32), base_margin, n_features)
+
+    def predict_proba1(self, X):
+        """P(class 1) as float32, accumulated tree by tree like xgboost"""
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"expected {self.n_features} features, got {X.shape[-1]}")
+        out = np.empty(X.shape[0], dtype=np.float32)
+        for lo in range(0, X.shape[0], CHUNK_ROWS):
+            block = X[lo:lo + CHUNK_ROWS]
+            values = self.leaf_value[self.trees.apply(block)]
+            # base + t0 + t1 + ... in float32; cumsum keeps that order
+            values = np.concatenate([np.full((len(block), 1), self.base_margin), values], axis=1)
+            margin = np.cumsum(values, axis=1, dtype=np.float32)[:, -1]
+            out[lo:lo + CHUNK_ROWS] = np.float32(1) / (np.float32(1) + np.exp(-margin))
+        return out
+
+    def predict(self, X):
+        return (self.predict_proba1(X) > 0.5).astype(np.int64)
+
+
+def _leaf_proba(value):
+    """Per-node class probabilities, normalised like DecisionTreeClassifier.predict_proba"""
+    proba = value.copy()
+    normalizer = proba.sum(axis=1)[:, None]
+    normalizer[normalizer == 0.0] = 1.0
+    return proba / normalizer
+
+
+class _Forest:
+    """RandomForestClassifier (single output); predict() matches sklearn"""
+
+    max_rows = 2048
+
+    def __init__(self, trees, leaf_proba, classes, n_features):
+        self.trees = trees
+        self.leaf_proba = leaf_proba
+        self.classes = classes
+        self.n_features = n_features
+
+    @classmethod
+    def compile(cls, model):
+        if getattr(model, "n_outputs_", 1) != 1:
+            return None
+        n_classes = len(model.classes_)
+        flat = []
+        for est in model.estimators_:
+            t = est.tree_
+            missing = getattr(t, "missing_go_to_left", None)
+            flat.append({
+                "feature": t.feature.astype(np.int64),
+                "threshold": t.threshold,
+                "left": t.children_left.astype(np.int64),
+                "right": t.children_right.astype(np.int64),
+                "missing_left": np.zeros(t.node_count, dtype=bool) if missing is None else missing,
+                "depth": t.max_depth,
+                "value": _leaf_proba(t.value[:, 0, :n_classes]),
+            })
+        return cls(*_flatten(flat, True, np.float64), model.classes_, model.n_features_in_)
+
+    def predict_proba(self, X):
+        # sklearn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"expected {self.n_features} features, got {X.shape[-1]}")
+        out = np.empty((X.shape[0], len(self.classes)))
+        for lo in range(0, X.shape[0], CHUNK_ROWS):
+            block = X[lo:lo + CHUNK_ROWS]
+            proba = self.leaf_proba[self.trees.apply(block)]
+            # Trees are summed in order, as the forest's single-job loop does
+            out[lo:lo + CHUNK_ROWS] = np.cumsum(proba, axis=1)[:, -1] / proba.shape[1]
+        return out
+
+    def predict(self, X):
+        return self.classes.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+class _Scaler:
+    def __init__(self, scaler):
+        self.mean = scaler.mean_ if scaler.with_mean else None
+        self.scale = scaler.scale_ if scaler.with_std else None
+
+    def transform(self, X):
+        X = _float_array(X)
+        if self.mean is not None:
+            X -= self.mean
+        if self.scale is not None:
+            X /= self.scale
+        return X
+
+
+# ==========================================================
+# PIPELINES
+# ==========================================================
+class NumpyPipeline:
+    """Feature steps, compiled estimator, optional label lookup; large batches use the original model"""
+
+    def __init__(self, model, steps, estimator, classes=None):
+        self.model = model
+        self.steps = steps
+        self.estimator = estimator
+        self.classes = classes
+
+    def predict(self, X):
+        if len(X) > self.estimator.max_rows:
+            return self.model.predict(X)
+        for step in self.steps:
+            X = step(X)
+        pred = self.estimator.predict(X)
+        return self.classes[pred] if self.classes is not None else pred
+
+
+def _compile_estimator(est):
+    if type(est) is XGBClassifier:
+        return _XGBBinary.compile(est)
+    if type(est) is RandomForestClassifier:
+        return _Forest.compile(est)
+    return None
+
+
+def compile_model(model):
+    """NumPy predictor equivalent to model.predict, or None if a step is unsupported"""
+    if isinstance(model, SoilSensorPipeline):
+        est = _compile_estimator(model.model)
+        if est is None or type(model.scaler) is not StandardScaler:
+            return None
+        return NumpyPipeline(model, [model._prepare_features, _Scaler(model.scaler).transform], est,
+                             classes=model.encoder.classes_)
+
+    if isinstance(model, Pipeline):
+        est = _compile_estimator(model.steps[-1][1])
+        if est is None:
+            return None
+        steps = []
+        for _, step in model.steps[:-1]:
+            if type(step) is StandardScaler:
+                steps.append(_Scaler(step).transform)
+            elif getattr(custom_transformers, type(step).__name__, None) is type(step):
+                steps.append(step.transform)
+            else:
+                return None
+        return NumpyPipeline(model, steps, est)
+
+    est = _compile_estimator(model)
+    return None if est is None else NumpyPipeline(model, [], est)
+
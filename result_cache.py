@@ -0,0 +1,199 @@
+# result_cache.py
+import glob
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+
+import pandas as pd
+
+CACHE_DIR = ".result_cache"
+CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+class ResultCache:
+    """
+    Size-bounded on-disk cache of prediction results.
+
+    Keys combine the uploaded bytes, the selected mode and the version
+    (size + mtime) of every model file (.joblib and .compiled.npz) in the
+    model directory. When a model file changes, the whole cache is dropped.
+    Entries are evicted least recently used first once the cache grows past
+    max_bytes.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, model_dir="models"):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.model_dir = model_dir
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self._stats_path = os.path.join(self.root, "stats.json")
+        self._fingerprint_path = os.path.join(self.root, "models.fingerprint")
+        self._stats = self._load_stats()
+
+    # ----------------------------------------------------------
+    # Keys
+    # ----------------------------------------------------------
+    def model_fingerprint(self):
+        h = hashlib.sha256()
+        paths = glob.glob(os.path.join(self.model_dir, "*.joblib"))
+        paths += glob.glob(os.path.join(self.model_dir, "*.compiled.npz"))
+        for path in sorted(paths):
+            st = os.stat(path)
+            h.update(f"{os.path.basename(path)}:{st.st_size}:{st.st_mtime_ns};".encode("utf-8"))
+        return h.hexdigest()
+
+    def key_for(self, data, mode):
+        """Cache key for raw uploaded bytes (or a file path) scored in a mode"""
+        h = hashlib.sha256()
+        if isinstance(data, (str, os.PathLike)):
+            with open(data, "rb") as f:
+                for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                    h.update(block)
+        else:
+            h.update(data)
+        h.update(b"\0" + str(mode).encode("utf-8"))
+        h.update(b"\0" + self._check_models().encode("utf-8"))
+        return h.hexdigest()
+
+    def _check_models(self):
+        """Drop every entry if the model files changed since they were cached"""
+        fingerprint = self.model_fingerprint()
+        with self._lock:
+            old = None
+            if os.path.exists(self._fingerprint_path):
+                with open(self._fingerprint_path, "r", encoding="utf-8") as f:
+                    old = f.read().strip()
+            if old != fingerprint:
+                if old is not None:
+                    print("[INFO] Model files changed, clearing result cache")
+                for path in self._entry_paths():
+                    os.remove(path)
+                with open(self._fingerprint_path, "w", encoding="utf-8") as f:
+                    f.write(fingerprint)
+        return fingerprint
+
+    # ----------------------------------------------------------
+    # Lookups
+    # ----------------------------------------------------------
+    def get_frame(self, key, input_size=0):
+        """Cached prediction DataFrame for key, or None"""
+        return self._hit(self._path(key, ".pkl"), input_size, pd.read_pickle)
+
+    def put_frame(self, key, df):
+        self._store(key, ".pkl", lambda tmp: df.to_pickle(tmp))
+
+    def get_file(self, key, dest_path, input_size=0):
+        """Copy the cached prediction CSV for key to dest_path; returns dest_path, or None on a miss"""
+        return self._hit(self._path(key, ".csv"), input_size,
+                         lambda path: shutil.copyfile(path, dest_path))
+
+    def put_file(self, key, src_path):
+        self._store(key, ".csv", lambda tmp: shutil.copyfile(src_path, tmp))
+
+    def _path(self, key, ext):
+        return os.path.join(self.root, key + ext)
+
+    def _hit(self, path, input_size, read):
+        """
+        read(path) of a cached entry, or None on a miss. The read happens
+        under the lock so eviction or invalidation cannot delete the entry
+        halfway; an entry removed by another process counts as a miss.
+        """
+        with self._lock:
+            try:
+                # mtime doubles as the LRU clock
+                os.utime(path)
+                result = read(path)
+            except OSError:
+                result = None
+            if result is None:
+                self._stats["misses"] += 1
+            else:
+                self._stats["hits"] += 1
+                self._stats["bytes_saved"] += int(input_size)
+            self._save_stats()
+        return result
+
+    def _store(self, key, ext, write):
+        final = self._path(key, ext)
+        tmp = f"{final}.{uuid.uuid4().hex}.tmp"
+        try:
+            write(tmp)
+            os.replace(tmp, final)
+        except Exception as e:
+            print(f"[ERROR] caching result {key}: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        self._evict()
+
+    def _entry_paths(self):
+        return [
+            p for p in glob.glob(os.path.join(self.root, "*"))
+            if p.endswith(".pkl") or p.endswith(".csv")
+        ]
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for path in self._entry_paths():
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                os.remove(path)
+                total -= size
+                self._stats["evictions"] += 1
+            self._save_stats()
+
+    # ----------------------------------------------------------
+    # Stats
+    # ----------------------------------------------------------
+    def _load_stats(self):
+        stats = {"hits": 0, "misses": 0, "bytes_saved": 0, "evictions": 0}
+        if os.path.exists(self._stats_path):
+            try:
+                with open(self._stats_path, "r", encoding="utf-8") as f:
+                    stats.update(json.load(f))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                pass
+        return stats
+
+    def _save_stats(self):
+        with open(self._stats_path, "w", encoding="utf-8") as f:
+            json.dump(self._stats, f)
+
+    def stats(self):
+        """Hit rate, input bytes not re-scored thanks to hits, and current size"""
+        with self._lock:
+            stats = dict(self._stats)
+            paths = self._entry_paths()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["entries"] = len(paths)
+        stats["size_bytes"] = sum(os.path.getsize(p) for p in paths if os.path.exists(p))
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Return the process-wide result cache"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache()
+        return _cache
@@ -0,0 +1,290 @@
+# scoring_jobs.py
+import io
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from all_in_one_router import AllInOneRouter, predictions_first
+from custom_transformers import SoilRollingFeatures
+from result_cache import get_result_cache
+from typed_loader import read_sensor_csv
+
+# Jobs scored at the same time per server process; further jobs queue
+JOB_WORKERS = int(os.environ.get("SCORING_JOB_WORKERS", 2))
+# Queued or running jobs one user may have
+JOBS_PER_OWNER = int(os.environ.get("SCORING_JOBS_PER_USER", 1))
+# Finished jobs kept per user, and for how long
+JOB_HISTORY_PER_OWNER = 3
+JOB_RETENTION_SECONDS = 3600
+# How often expired jobs are swept when nobody submits or polls
+JOB_SWEEP_SECONDS = 300
+# Frame results larger than this are spilled to the job's temp file
+JOB_RESULT_MAX_BYTES = int(float(os.environ.get("SCORING_JOB_RESULT_MB", 16)) * 1e6)
+PREVIEW_ROWS = 5
+
+ACTIVE_STATES = ("queued", "running")
+
+
+class JobLimitError(RuntimeError):
+    """The owner already has JOBS_PER_OWNER jobs queued or running"""
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class ScoringJob:
+    """
+    State of one background scoring job.
+
+    The worker thread updates status and progress through report(); the
+    page only reads them. result is set once status is "done".
+    """
+
+    def __init__(self, owner, label, total_rows=None):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.label = label
+        self.total_rows = total_rows
+        self.status = "queued"
+        self.rows_done = 0
+        self.chunks_done = 0
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.files = []
+        self._cancelled = threading.Event()
+        self._future = None
+
+    @property
+    def active(self):
+        return self.status in ACTIVE_STATES
+
+    @property
+    def progress(self):
+        """Fraction done in [0, 1]; total_rows may be an estimate"""
+        if self.status == "done":
+            return 1.0
+        if not self.total_rows:
+            return 0.0
+        return min(self.rows_done / self.total_rows, 1.0)
+
+    def report(self, chunks_done, rows_done):
+        """Progress callback for the job function; raises JobCancelled once cancelled"""
+        self.chunks_done = chunks_done
+        self.rows_done = rows_done
+        if self._cancelled.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        self._cancelled.set()
+        if self._future is not None and self._future.cancel():
+            self.finished = time.time()
+            self.status = "cancelled"
+
+    def temp_file(self, suffix):
+        """Temp file path owned by the job, removed when the job is pruned"""
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        os.close(fd)
+        self.files.append(path)
+        return path
+
+    def remove_files(self):
+        for path in self.files:
+            if os.path.exists(path):
+                os.remove(path)
+        self.files = []
+
+
+class JobExecutor:
+    """
+    Runs scoring jobs on a bounded thread pool, off the Streamlit script
+    thread. Jobs are kept by owner (username), so a rerun or a new session
+    of the same user finds its running and finished jobs again. Each owner
+    may have max_per_owner jobs queued or running, so one user cannot fill
+    the queue ahead of everybody else. Finished jobs are pruned on every
+    submit, get and jobs_for, and by a sweep every sweep_seconds.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, max_per_owner=JOBS_PER_OWNER,
+                 history_per_owner=JOB_HISTORY_PER_OWNER, retention_seconds=JOB_RETENTION_SECONDS,
+                 sweep_seconds=JOB_SWEEP_SECONDS):
+        self.max_per_owner = max_per_owner
+        self.history_per_owner = history_per_owner
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scoring-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        if sweep_seconds:
+            threading.Thread(target=self._sweep, args=(sweep_seconds,),
+                             name="scoring-job-sweep", daemon=True).start()
+
+    def submit(self, owner, fn, *args, label="", total_rows=None, **kwargs):
+        """Queue fn(job, *args, **kwargs); its return value becomes job.result"""
+        job = ScoringJob(owner, label, total_rows)
+        with self._lock:
+            self._prune()
+            active = [j for j in self._jobs.values() if j.owner == owner and j.active]
+            if len(active) >= self.max_per_owner:
+                raise JobLimitError(f"{owner} already has {len(active)} scoring job(s) in progress")
+            self._jobs[job.id] = job
+            job._future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = "running"
+        job.started = time.time()
+        # finished is set before the final status, so a job that no longer
+        # looks active always has a finish time for _prune
+        try:
+            job.result = fn(job, *args, **kwargs)
+            status = "done"
+        except JobCancelled:
+            status = "cancelled"
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            status = "failed"
+            print(f"[ERROR] scoring job {job.id} ({job.label}): {job.error}")
+        job.finished = time.time()
+        job.status = status
+
+    def get(self, job_id):
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def jobs_for(self, owner):
+        """The owner's jobs, newest first"""
+        with self._lock:
+            self._prune()
+            jobs = [j for j in self._jobs.values() if j.owner == owner]
+        return sorted(jobs, key=lambda j: j.created, reverse=True)
+
+    def _prune(self):
+        """Drop expired finished jobs and all but the newest few per owner"""
+        now = time.time()
+        kept = {}
+        for job in sorted(self._jobs.values(), key=lambda j: j.created, reverse=True):
+            if job.active or job.finished is None:
+                continue
+            history = kept.setdefault(job.owner, 0)
+            if history >= self.history_per_owner or now - job.finished > self.retention_seconds:
+                del self._jobs[job.id]
+                job.remove_files()
+            else:
+                kept[job.owner] = history + 1
+
+    def _sweep(self, interval):
+        while not self._stopped.wait(interval):
+            try:
+                with self._lock:
+                    self._prune()
+            except Exception as e:
+                print(f"[ERROR] pruning scoring jobs: {type(e).__name__}: {e}")
+
+    def shutdown(self, wait=True):
+        self._stopped.set()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_job_executor():
+    """Return the process-wide scoring job executor"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = JobExecutor()
+        return _executor
+
+
+# ==========================================================
+# UPLOAD SCORING JOB
+# ==========================================================
+def estimate_rows(upload_bytes):
+    """Data rows of a CSV upload, from its line count"""
+    lines = upload_bytes.count(b"\n") + (not upload_bytes.endswith(b"\n"))
+    return max(lines - 1, 0)
+
+
+def score_upload(job, upload_bytes, mode, sensor_key=None, df=None, streaming=False,
+                 chunk_rows=50000, compact=False, model_dir="models", on_done=None,
+                 max_result_bytes=JOB_RESULT_MAX_BYTES):
+    """
+    Score one upload chunk by chunk, reporting progress after every chunk.
+
+    Streaming jobs read the upload from a temp file and write predictions to
+    another; frame jobs score df (the frame the page already read) in slices
+    of chunk_rows and keep the result in memory, or in a temp file once it
+    is larger than max_result_bytes. Soil rolling windows carry over between
+    chunks, so the predictions are the same as one call. Results are served
+    from and stored in the result cache.
+
+    Returns dict(pred_df, output_path, from_cache, rows, chunks, input_path).
+    pred_df is the full result when output_path is None, else a preview.
+    """
+    cache = get_result_cache()
+    cache_key = cache.key_for(upload_bytes, f"{mode}|{'stream' if streaming else 'frame'}"
+                                            f"{'|compact' if compact else ''}")
+    router = AllInOneRouter(model_dir=model_dir)
+    result = {"output_path": None, "input_path": None, "from_cache": False}
+
+    if streaming:
+        input_path, output_path = job.temp_file("_input.csv"), job.temp_file("_output.csv")
+        with open(input_path, "wb") as f:
+            f.write(upload_bytes)
+        result.update(input_path=input_path, output_path=output_path)
+
+        if cache.get_file(cache_key, output_path, input_size=len(upload_bytes)) is not None:
+            result.update(pred_df=pd.read_csv(output_path, nrows=PREVIEW_ROWS), from_cache=True)
+        else:
+            summary = router.route_and_predict_csv(
+                input_path, output_path, chunksize=chunk_rows,
+                sensor_key=sensor_key, label=mode, on_chunk=job.report, compact=compact
+            )
+            cache.put_file(cache_key, output_path)
+            result.update(pred_df=summary["preview"], rows=summary["rows"], chunks=summary["chunks"])
+    else:
+        pred_df = cache.get_frame(cache_key, input_size=len(upload_bytes))
+        parts = []
+        if pred_df is not None:
+            result["from_cache"] = True
+        else:
+            if df is None:
+                df = read_sensor_csv(io.BytesIO(upload_bytes), compact=compact)
+            soil_rolling = SoilRollingFeatures()
+            for lo in range(0, len(df), chunk_rows):
+                block = df.iloc[lo:lo + chunk_rows]
+                if sensor_key is None:
+                    parts.append(router.route_and_predict(block, soil_rolling=soil_rolling))
+                else:
+                    parts.append(router.predict_single_sensor(block, sensor_key, label=mode,
+                                                              soil_rolling=soil_rolling))
+                job.report(len(parts), lo + len(block))
+            if parts:
+                pred_df = pd.concat(parts, ignore_index=True)
+            elif sensor_key is None:
+                pred_df = router.route_and_predict(df)
+            else:
+                pred_df = router.predict_single_sensor(df, sensor_key, label=mode)
+            cache.put_frame(cache_key, pred_df)
+        pred_df = predictions_first(pred_df)
+        result.update(pred_df=pred_df, rows=len(pred_df), chunks=len(parts))
+        if pred_df.memory_usage(deep=True).sum() > max_result_bytes:
+            output_path = job.temp_file("_output.csv")
+            pred_df.to_csv(output_path, index=False)
+            result.update(pred_df=pred_df.head(PREVIEW_ROWS), output_path=output_path)
+
+    if on_done is not None:
+        on_done(result)
+    return result
@@ -0,0 +1,304 @@
+# scoring_server.py
+# Local HTTP/JSON scoring service: python scoring_server.py --port 8502
+#
+#   POST /predict   one reading {"timestamp(ms)": ..., "sensor_value": ...}
+#                   or a list of readings (also {"readings": [...]})
+#   GET  /metrics   latency percentiles and batch-size histograms
+#   GET  /metrics/prometheus, /metrics/functions
+#                   per-function timings (with --instrument)
+#   GET  /health
+#
+# Requests that arrive within --window-ms of each other are merged, so each
+# sensor type gets one vectorized predict call per batch. Standard library only.
+
+import argparse
+import json
+import math
+import queue
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+# These imports are required so joblib can unpickle the custom classes
+from custom_transformers import WaferAggregator, FeatureEngineer, SoilSensorPipeline, SoilRollingFeatures
+from all_in_one_router import AllInOneRouter
+import instrumentation
+
+LATENCY_SAMPLES = 10000
+
+
+class _Pending:
+    def __init__(self, readings):
+        self.readings = readings
+        self.results = [None] * len(readings)
+        self.error = None
+        self.done = threading.Event()
+
+
+class Metrics:
+    """Request latency samples and power-of-two batch-size histograms"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.requests = 0
+        self.readings = 0
+        self.batches = 0
+        self.batch_sizes = {}
+        self.predict_sizes = {}
+
+    @staticmethod
+    def _bucket(n):
+        return 1 << max(0, math.ceil(math.log2(n))) if n > 0 else 0
+
+    def record_request(self, seconds, readings):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.requests += 1
+            self.readings += readings
+
+    def record_batch(self, readings, predict_sizes):
+        with self._lock:
+            self.batches += 1
+            b = self._bucket(readings)
+            self.batch_sizes[b] = self.batch_sizes.get(b, 0) + 1
+            for sensor, n in predict_sizes.items():
+                hist = self.predict_sizes.setdefault(sensor, {})
+                b = self._bucket(n)
+                hist[b] = hist.get(b, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            lat = np.array(self.latencies) * 1000.0
+            snap = {
+                "requests": self.requests,
+                "readings": self.readings,
+                "batches": self.batches,
+                "latency_ms": {
+                    "p50": float(np.percentile(lat, 50)) if lat.size else None,
+                    "p99": float(np.percentile(lat, 99)) if lat.size else None,
+                    "samples": int(lat.size),
+                },
+                # Keys are bucket upper bounds (readings per batch)
+                "batch_size_histogram": {str(k): v for k, v in sorted(self.batch_sizes.items())},
+                "predict_size_histogram": {
+                    s: {str(k): v for k, v in sorted(h.items())} for s, h in self.predict_sizes.items()
+                },
+            }
+        return snap
+
+
+class MicroBatcher:
+    """
+    Merges concurrent scoring requests into one predict call per sensor.
+
+    The first queued request opens a window of window_ms; everything that
+    arrives before it closes (up to max_batch readings) is scored together.
+    """
+
+    def __init__(self, router, window_ms=5.0, max_batch=4096, metrics=None):
+        self.router = router
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.metrics = metrics or Metrics()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, readings):
+        """Score a list of reading dicts; blocks until its batch is done"""
+        item = _Pending(readings)
+        self._queue.put(item)
+        item.done.wait()
+        if item.error is not None:
+            raise item.error
+        return item.results
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0].readings)
+            deadline = time.perf_counter() + self.window
+            while size < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item.readings)
+
+            try:
+                self._score(batch)
+            except Exception as e:
+                for item in batch:
+                    item.error = e
+            finally:
+                for item in batch:
+                    item.done.set()
+
+    @instrumentation.timed("server.score_batch", rows=False)
+    def _score(self, batch):
+        router = self.router
+        by_sensor = {}
+
+        # Detect and prepare per request and column signature. Soil rolling
+        # windows stay inside one request's readings.
+        for item in batch:
+            signatures = {}
+            for i, reading in enumerate(item.readings):
+                signatures.setdefault(tuple(reading.keys()), []).append(i)
+
+            for columns, idxs in signatures.items():
+                sensor = router._detect_signature(columns)
+                frame = pd.DataFrame([item.readings[i] for i in idxs], columns=list(columns))
+                by_sensor.setdefault(sensor, []).append((item, idxs, frame))
+
+        predict_sizes = {}
+        for sensor, parts in by_sensor.items():
+            predict_sizes[sensor] = sum(len(idxs) for _, idxs, _ in parts)
+            self._score_sensor(sensor, parts)
+
+        self.metrics.record_batch(sum(len(i.readings) for i in batch), predict_sizes)
+
+    def _score_sensor(self, sensor, parts):
+        router = self.router
+        model = router._get_model(sensor)
+
+        try:
+            if model is None:
+                raise LookupError
+            prepared_parts = []
+            part_notes = []
+            for _, _, frame in parts:
+                prepared, alias_notes = router._apply_aliases(frame, sensor, SoilRollingFeatures())
+                prepared_parts.append(prepared)
+                part_notes.append(";".join([f"detected:{sensor}"] + alias_notes + ["predict_ok"]))
+
+            combined = pd.concat(prepared_parts, ignore_index=True)
+            pred = router._predict_prepared(model, combined, sensor)
+        except Exception:
+            # Missing model or a failing merged batch: score each part on its own
+            for item, idxs, frame in parts:
+                preds, notes = router._predict_block(frame, sensor, SoilRollingFeatures())
+                for i, p, note in zip(idxs, preds, notes):
+                    item.results[i] = _result(sensor, p, note)
+            return
+
+        offset = 0
+        for (item, idxs, _), note in zip(parts, part_notes):
+            for i, p in zip(idxs, pred[offset:offset + len(idxs)]):
+                item.results[i] = _result(sensor, p, note)
+            offset += len(idxs)
+
+
+def _result(sensor, pred, note):
+    if isinstance(pred, np.generic):
+        pred = pred.item()
+    return {"sensor_type": sensor, "prediction": pred, "note": note}
+
+
+def make_handler(batcher):
+    class ScoringHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_text(self, status, text):
+            body = text.encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                self._send_json(200, batcher.metrics.snapshot())
+            elif self.path == "/metrics/prometheus":
+                self._send_text(200, instrumentation.prometheus_text())
+            elif self.path == "/metrics/functions":
+                self._send_json(200, instrumentation.snapshot())
+            elif self.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            else:
+                self._send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send_json(404, {"error": "not found"})
+                return
+
+            start = time.perf_counter()
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"null")
+            except (ValueError, json.JSONDecodeError) as e:
+                self._send_json(400, {"error": f"invalid JSON: {e}"})
+                return
+
+            single = isinstance(payload, dict) and "readings" not in payload
+            readings = [payload] if single else (
+                payload.get("readings") if isinstance(payload, dict) else payload
+            )
+            if not isinstance(readings, list) or not all(isinstance(r, dict) for r in readings):
+                self._send_json(400, {"error": "expected a reading object or a list of them"})
+                return
+
+            try:
+                results = batcher.submit(readings) if readings else []
+            except Exception as e:
+                self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+                return
+
+            batcher.metrics.record_request(time.perf_counter() - start, len(readings))
+            self._send_json(200, results[0] if single else results)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ScoringHandler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local HTTP scoring service for sensor readings")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8502)
+    parser.add_argument("--model-dir", default="models")
+    parser.add_argument("--window-ms", type=float, default=5.0, help="Micro-batching window")
+    parser.add_argument("--max-batch", type=int, default=4096, help="Max readings per batch")
+    parser.add_argument("--instrument", action="store_true", help="Record per-function timings")
+    parser.add_argument("--engine", choices=["native", "numpy"], default="native",
+                        help="'numpy' scores small batches of tree models with numpy_inference")
+    args = parser.parse_args(argv)
+
+    if args.instrument:
+        instrumentation.enable()
+
+    router = AllInOneRouter(model_dir=args.model_dir, engine=args.engine)
+    # Keep every model resident before the first request arrives
+    router.registry.preload()
+
+    batcher = MicroBatcher(router, window_ms=args.window_ms, max_batch=args.max_batch)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(batcher))
+    print(f"[OK] Scoring service on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
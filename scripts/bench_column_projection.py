@@ -0,0 +1,77 @@
+# scripts/bench_column_projection.py
+# Peak memory and time of the feature transformers as the input frame gets
+# wider, against their previous copy-everything versions (parity is covered
+# by tests/test_column_projection.py).
+#
+#   python -m scripts.bench_column_projection
+#   python -m scripts.bench_column_projection --rows 200000 --extra-cols 0,20,100
+import argparse
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from custom_transformers import FeatureEngineer, LDRFeatureEngineer, SoilSensorPipeline, rolling_mean_std
+from scripts.bench_timestamp_features import legacy_gas, legacy_ldr
+from scripts.generate_test_csv import make_sensor_frame
+
+
+def legacy_soil(X):
+    X = X.copy()
+    if "rolling_mean" not in X.columns or "rolling_std" not in X.columns:
+        X["rolling_mean"], X["rolling_std"] = rolling_mean_std(X["sensor_value"], window=3)
+    return X[["sensor_value", "rolling_mean", "rolling_std"]]
+
+
+def widen(df, extra_cols, seed):
+    rng = np.random.default_rng(seed)
+    extra = pd.DataFrame(rng.random((len(df), extra_cols)), index=df.index,
+                         columns=[f"extra_{i}" for i in range(extra_cols)])
+    return pd.concat([df, extra], axis=1)
+
+
+def cases(rows, extra_cols, seed):
+    gas = widen(make_sensor_frame("gas", rows, seed).drop(columns=["label"]), extra_cols, seed)
+    light = widen(make_sensor_frame("light", rows, seed).drop(columns=["status"]), extra_cols, seed)
+    soil = widen(make_sensor_frame("soil", rows, seed).drop(columns=["status"], errors="ignore"), extra_cols, seed)
+    gas_fe, ldr_fe, soil_pipe = FeatureEngineer(), LDRFeatureEngineer(), SoilSensorPipeline()
+    return [
+        ("gas", lambda: legacy_gas(gas_fe, gas), lambda: gas_fe.transform(gas)),
+        ("light", lambda: legacy_ldr(ldr_fe, light), lambda: ldr_fe.transform(light)),
+        ("soil", lambda: legacy_soil(soil), lambda: soil_pipe._prepare_features(soil)),
+    ]
+
+
+def measure(fn):
+    """(seconds, peak traced MB) of one call; tracing slows it, so time separately"""
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return elapsed, peak / 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory of projected vs copied feature frames")
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--extra-cols", default="0,10,50", help="Unused columns added to each input")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    print(f"{'transform':<10} {'extra':>6} {'legacy MB':>10} {'proj MB':>10} {'legacy s':>9} {'proj s':>9}")
+    for extra_cols in [int(n) for n in args.extra_cols.split(",")]:
+        for name, legacy, projected in cases(args.rows, extra_cols, args.seed):
+            a_s, a_mb = measure(legacy)
+            b_s, b_mb = measure(projected)
+            print(f"{name:<10} {extra_cols:>6} {a_mb:>10.1f} {b_mb:>10.1f} {a_s:>9.3f} {b_s:>9.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
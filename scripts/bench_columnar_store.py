@@ -0,0 +1,128 @@
+# scripts/bench_columnar_store.py
+# Whether out-of-core scoring of memory-mapped columns predicts the same as
+# streaming the CSV, and the heap memory each needs.
+#
+#   python -m scripts.bench_columnar_store
+#   python -m scripts.bench_columnar_store --rows 500000 --chunksize 50000
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# These imports are required so joblib can unpickle the custom classes
+from custom_transformers import WaferAggregator, FeatureEngineer, SoilSensorPipeline
+from all_in_one_router import AllInOneRouter
+from columnar_store import convert_csv, open_columnar
+from scripts.generate_test_csv import SENSORS, make_mixed_frame, make_sensor_frame
+
+
+def csv_predictions(router, path, chunksize, sensor_key=None):
+    pred = pd.concat(router.iter_predict_csv(path, chunksize, sensor_key=sensor_key), ignore_index=True)
+    return pred["sensor_type"].to_numpy(), pd.to_numeric(pred["prediction"]).to_numpy(dtype=np.float64)
+
+
+def columnar_predictions(router, source, output_dir, chunksize, sensor_key=None):
+    router.predict_columnar(source, output_dir, chunk_rows=chunksize, sensor_key=sensor_key)
+    out = open_columnar(output_dir).frame(0, len(open_columnar(output_dir)))
+    return out["sensor_type"].to_numpy(), out["prediction"].to_numpy(dtype=np.float64)
+
+
+def compare(name, expected, actual):
+    sensors = int((expected[0] != actual[0]).sum())
+    preds = int((~np.isclose(expected[1], actual[1], equal_nan=True)).sum())
+    if sensors or preds:
+        print(f"[ERROR] parity: {name}: {sensors} sensor types and {preds} predictions differ")
+        return 1
+    print(f"[OK] parity: {name} ({len(expected[0])} rows)")
+    return 0
+
+
+def check_parity(directory, rows, chunksize, seed, model_dir):
+    """Header detection, --sensor and rows detection against the CSV path"""
+    router = AllInOneRouter(model_dir=model_dir)
+    failed = 0
+    for sensor in SENSORS:
+        if router._get_model(sensor) is None:
+            print(f"[WARN] parity: no {sensor} model — skip")
+            continue
+        path = os.path.join(directory, f"{sensor}.csv")
+        make_sensor_frame(sensor, rows, seed).to_csv(path, index=False)
+        store = os.path.join(directory, f"{sensor}.cols")
+        convert_csv(path, store, chunksize=chunksize)
+        for sensor_key in (None, sensor):
+            name = f"{sensor} {'--sensor' if sensor_key else 'header'}"
+            failed += compare(name, csv_predictions(router, path, chunksize, sensor_key),
+                              columnar_predictions(router, store, os.path.join(directory, "out.cols"),
+                                                   chunksize, sensor_key))
+
+        try:
+            import pyarrow.feather as feather
+        except ImportError:
+            continue
+        arrow = os.path.join(directory, f"{sensor}.feather")
+        feather.write_feather(pd.read_csv(path), arrow, compression="uncompressed")
+        failed += compare(f"{sensor} arrow", csv_predictions(router, path, chunksize),
+                          columnar_predictions(router, arrow, os.path.join(directory, "out.cols"), chunksize))
+
+    router = AllInOneRouter(model_dir=model_dir, detection="rows")
+    path = os.path.join(directory, "mixed.csv")
+    make_mixed_frame(rows, seed).to_csv(path, index=False)
+    store = os.path.join(directory, "mixed.cols")
+    convert_csv(path, store, chunksize=chunksize)
+    failed += compare("mixed rows detection", csv_predictions(router, path, chunksize),
+                      columnar_predictions(router, store, os.path.join(directory, "out.cols"), chunksize))
+    return failed
+
+
+def measure(fn):
+    """(seconds, peak traced MB) of one call; memory-mapped pages are not traced"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare memory-mapped columnar scoring with CSV streaming")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--chunksize", type=int, default=50000)
+    parser.add_argument("--sensor", default="temperature", help="Sensor of the memory benchmark file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model-dir", default="models")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        failed = check_parity(directory, min(args.rows, 20000), args.chunksize // 4, args.seed, args.model_dir)
+
+        path = os.path.join(directory, "bench.csv")
+        make_sensor_frame(args.sensor, args.rows, args.seed).to_csv(path, index=False)
+        store = os.path.join(directory, "bench.cols")
+        router = AllInOneRouter(model_dir=args.model_dir)
+
+        print()
+        print(f"{args.sensor} file: {args.rows} rows, {os.path.getsize(path) / 1e6:.1f} MB CSV, "
+              f"slices of {args.chunksize}")
+        print(f"{'step':<28} {'peak MB':>9} {'seconds':>9}")
+        for name, fn in [
+            ("convert CSV -> .npy", lambda: convert_csv(path, store, chunksize=args.chunksize)),
+            ("score CSV (whole frame)", lambda: router.route_and_predict(pd.read_csv(path))),
+            ("score CSV (streaming)", lambda: router.route_and_predict_csv(
+                path, os.path.join(directory, "bench_out.csv"), chunksize=args.chunksize)),
+            ("score .npy (memory-mapped)", lambda: router.predict_columnar(
+                store, os.path.join(directory, "bench_out.cols"), chunk_rows=args.chunksize)),
+        ]:
+            seconds, mb = measure(fn)
+            print(f"{name:<28} {mb:>9.1f} {seconds:>9.2f}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
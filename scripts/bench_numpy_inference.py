@@ -0,0 +1,61 @@
+# scripts/bench_numpy_inference.py
+# Latency of numpy_inference against the loaded models per batch size
+# (parity is covered by tests/test_numpy_inference.py).
+#
+#   python -m scripts.bench_numpy_inference --repeat 50
+import argparse
+import sys
+import time
+
+# These imports are required so joblib can unpickle the custom classes
+from custom_transformers import WaferAggregator, FeatureEngineer, SoilSensorPipeline, SoilRollingFeatures
+from all_in_one_router import AllInOneRouter
+from numpy_inference import compile_model
+from scripts.generate_test_csv import SENSORS, make_sensor_frame
+
+BATCH_SIZES = [1, 10, 100, 1000]
+
+
+def prepared_frame(router, sensor, rows, seed):
+    df = make_sensor_frame(sensor, rows, seed)
+    prepared, _ = router._apply_aliases(df, sensor, SoilRollingFeatures())
+    return prepared
+
+
+def best_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def benchmark(router, seed, repeat):
+    print(f"{'sensor':<12} {'rows':>6} {'model ms':>10} {'numpy ms':>10} {'speedup':>8}")
+    for sensor in SENSORS:
+        model = router._get_model(sensor)
+        engine = compile_model(model) if model is not None else None
+        if engine is None:
+            continue
+        prepared = prepared_frame(router, sensor, max(BATCH_SIZES), seed)
+        for n in BATCH_SIZES:
+            X = prepared.iloc[:n]
+            a = best_time(lambda: model.predict(X), repeat)
+            b = best_time(lambda: engine.predict(X), repeat)
+            print(f"{sensor:<12} {n:>6} {a * 1000:>10.3f} {b * 1000:>10.3f} {a / b:>7.1f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time numpy_inference against the fitted models")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--model-dir", default="models")
+    args = parser.parse_args(argv)
+
+    benchmark(AllInOneRouter(model_dir=args.model_dir), args.seed, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# scripts/bench_timestamp_features.py
+# Speed of the integer timestamp kernel used by FeatureEngineer and
+# LDRFeatureEngineer against their previous pd.to_datetime versions
+# (parity is covered by tests/test_timestamp_features.py).
+#
+#   python -m scripts.bench_timestamp_features --rows 5000000
+import argparse
+import sys
+import time
+
+import pandas as pd
+
+from custom_transformers import FeatureEngineer, LDRFeatureEngineer
+from scripts.generate_test_csv import make_sensor_frame
+
+
+# ==========================================================
+# LEGACY
+# ==========================================================
+def legacy_gas(fe, X):
+    X = X.copy()
+    ts = fe.detect_timestamp(X)
+    if ts:
+        try:
+            X["datetime"] = pd.to_datetime(X[ts], unit="ms", origin="unix", errors="coerce")
+        except Exception:
+            X["datetime"] = pd.to_datetime(X[ts], errors="coerce")
+        X["hour"] = X["datetime"].dt.hour.fillna(0)
+        X["dayofweek"] = X["datetime"].dt.dayofweek.fillna(0)
+    else:
+        X["hour"] = 0
+        X["dayofweek"] = 0
+    X = X.drop(columns=["datetime"], errors="ignore")
+    required_cols = ["mq2_value", "temperature", "humidity", "hour", "dayofweek"]
+    for col in required_cols:
+        if col not in X.columns:
+            X[col] = 0
+    return X[required_cols]
+
+
+def legacy_ldr(fe, X):
+    X = X.copy()
+    ts_col = fe.detect_timestamp_col(X)
+    if ts_col:
+        X["_dt"] = pd.to_datetime(X[ts_col], errors="coerce")
+        X["hour"] = X["_dt"].dt.hour.fillna(0).astype(int)
+        X["dayofweek"] = X["_dt"].dt.dayofweek.fillna(0).astype(int)
+        X.drop(columns=["_dt"], errors="ignore", inplace=True)
+    else:
+        X["hour"] = 0
+        X["dayofweek"] = 0
+    required = fe.feature_names_ or ["ldr_value", "voltage", "resistance", "ambient_light", "hour", "dayofweek"]
+    for col in required:
+        if col not in X.columns:
+            X[col] = 0
+    X[required] = X[required].fillna(0)
+    return X[required]
+
+
+def best_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def benchmark(rows, repeat):
+    gas = make_sensor_frame("gas", rows, 0).drop(columns=["label"])
+    light = make_sensor_frame("light", rows, 0).drop(columns=["status"])
+    print(f"{'case':<24} {'rows':>10} {'legacy s':>10} {'kernel s':>10} {'speedup':>8}")
+    for name, fe, legacy, X in [
+        ("gas (epoch ms)", FeatureEngineer(), legacy_gas, gas),
+        ("light (iso strings)", LDRFeatureEngineer(), legacy_ldr, light),
+    ]:
+        a = best_time(lambda: legacy(fe, X), repeat)
+        b = best_time(lambda: fe.transform(X), repeat)
+        print(f"{name:<24} {rows:>10} {a:>10.3f} {b:>10.3f} {a / b:>7.1f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the timestamp feature kernel against pd.to_datetime")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    benchmark(args.rows, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
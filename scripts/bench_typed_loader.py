@@ -0,0 +1,65 @@
+# scripts/bench_typed_loader.py
+# Memory of typed_loader's compact frames against pd.read_csv defaults
+# (parity is covered by tests/test_typed_loader.py).
+#
+#   python -m scripts.bench_typed_loader
+#   python -m scripts.bench_typed_loader --rows 200000 --extra-cols 500
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from scripts.generate_test_csv import make_sensor_frame
+from typed_loader import read_sensor_csv
+
+
+def write_csv(df, directory, name):
+    path = os.path.join(directory, f"{name}.csv")
+    df.to_csv(path, index=False)
+    return path
+
+
+def wide_wafer_frame(rows, extra_cols, seed):
+    """Wafer upload with extra columns no model reads"""
+    df = make_sensor_frame("wafer", rows, seed)
+    rng = np.random.default_rng(seed)
+    extra = pd.DataFrame(rng.standard_normal((rows, extra_cols)),
+                         columns=[f"aux_{i}" for i in range(extra_cols)])
+    return pd.concat([df, extra], axis=1)
+
+
+def timed_read(fn):
+    start = time.perf_counter()
+    df = fn()
+    return df, time.perf_counter() - start, df.memory_usage(deep=True).sum() / 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare compact typed CSV loading with pandas defaults")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--extra-cols", type=int, default=100, help="Unused columns in the wide wafer file")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_csv(wide_wafer_frame(args.rows, args.extra_cols, args.seed), directory, "wide_wafer")
+        print(f"wide wafer file: {args.rows} rows, {31 + args.extra_cols} sensor columns")
+        print(f"{'read':<22} {'MB':>9} {'seconds':>9} {'vs default':>11}")
+        base_mb = None
+        for name, fn in [
+            ("pd.read_csv", lambda: pd.read_csv(path)),
+            ("compact", lambda: read_sensor_csv(path)),
+            ("compact, model cols", lambda: read_sensor_csv(path, "wafer", model_columns_only=True)),
+        ]:
+            _, seconds, mb = timed_read(fn)
+            base_mb = base_mb or mb
+            print(f"{name:<22} {mb:>9.1f} {seconds:>9.2f} {base_mb / mb:>10.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
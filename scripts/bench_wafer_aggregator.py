@@ -0,0 +1,79 @@
+# scripts/bench_wafer_aggregator.py
+# Benchmark of WaferAggregator's NumPy path against pandas groupby
+# (parity is covered by tests/test_wafer_aggregator.py).
+#
+#   python -m scripts.bench_wafer_aggregator
+#   python -m scripts.bench_wafer_aggregator --rows 1000000 --cols 30
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from custom_transformers import WaferAggregator
+
+
+def make_wafer_frame(rows, cols, wafers, seed=0, nan_rate=0.01, shuffle=True):
+    rng = np.random.default_rng(seed)
+    ids = rng.integers(0, wafers, rows) if shuffle else np.sort(rng.integers(0, wafers, rows))
+    data = {"wafer_id": np.char.add("W", ids.astype(str)), "timestamp": np.arange(rows)}
+    for s in range(1, cols + 1):
+        values = rng.normal(size=rows)
+        if nan_rate:
+            values[rng.random(rows) < nan_rate] = np.nan
+        data[f"sensor_{s}"] = values
+    return pd.DataFrame(data)
+
+
+def legacy_transform(agg, df):
+    """WaferAggregator.transform before the NumPy path (copy, per-column drops, groupby)"""
+    df = df.copy()
+    for c in list(df.columns):
+        if 'time' in c.lower():
+            df.drop(columns=[c], inplace=True, errors='ignore')
+    feature_cols = [c for c in df.columns if c not in [agg.wafer_col, agg.target]]
+    df_agg = df.groupby(agg.wafer_col)[feature_cols].agg(['mean', 'std', 'min', 'max'])
+    df_agg.columns = ['_'.join(col).strip() for col in df_agg.columns.values]
+    if agg.target in df.columns:
+        df_agg[agg.target] = df.groupby(agg.wafer_col)[agg.target].max()
+    return df_agg.reset_index(drop=True)
+
+
+def benchmark(rows, cols, wafers, repeat):
+    def best(fn):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    print(f"{rows:,} rows x {cols} columns (best of {repeat})")
+    print(f"  {'layout':<28} {'legacy s':>9} {'new s':>9} {'rows/s':>14} {'speedup':>8}")
+    for layout in ["grouped by wafer", "shuffled", "one row per wafer"]:
+        df = make_wafer_frame(rows, cols, wafers, shuffle=(layout == "shuffled"))
+        if layout == "one row per wafer":
+            df["wafer_id"] = np.arange(rows)
+        agg = WaferAggregator().fit(df)
+
+        slow = best(lambda: legacy_transform(agg, df))
+        fast = best(lambda: agg.transform(df))
+        print(f"  {layout:<28} {slow:>9.3f} {fast:>9.3f} {rows / fast:>14,.0f} {slow / fast:>7.1f}x")
+        del df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--cols", type=int, default=4, help="Sensor columns (memory grows with rows x cols)")
+    parser.add_argument("--wafers", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    benchmark(args.rows, args.cols, args.wafers, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+# scripts/benchmark.py
+# Throughput benchmark per sensor and per scoring stage.
+#
+#   python -m scripts.benchmark                                  # 1k..100k rows, every sensor + mixed
+#   python -m scripts.benchmark --sizes 1m,10m --sensors soil,mixed
+#   python -m scripts.benchmark --compare benchmark_results/<old>.json
+#
+# Input CSVs are generated deterministically (scripts/generate_test_csv.py)
+# and cached in benchmark_data/. Results are written as JSON tagged with the
+# git commit, so runs on different commits can be compared.
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+# These imports are required so joblib can unpickle the custom classes
+from custom_transformers import WaferAggregator, FeatureEngineer, SoilSensorPipeline, SoilRollingFeatures
+from all_in_one_router import AllInOneRouter
+from alias_utils import map_columns_with_aliases, clear_alias_cache, EXPECTED_FEATURES
+from sensor_schema import classify_columns
+from scripts.generate_test_csv import SENSORS, make_frame
+
+DATA_DIR = "benchmark_data"
+RESULTS_DIR = "benchmark_results"
+STAGES = ["parse", "detection", "alias", "features", "predict", "serialize"]
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1])
+    return int(float(text[:-1]) * scale) if scale else int(text)
+
+
+def git_info():
+    def run(*args):
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    status = run("status", "--porcelain", "--untracked-files=no")
+    return {"commit": run("rev-parse", "HEAD"), "dirty": bool(status) if status is not None else None}
+
+
+def dataset_path(sensor, rows, seed):
+    """Cached input CSV for a case; generated on first use"""
+    path = os.path.join(DATA_DIR, f"{sensor}_{rows}_{seed}.csv")
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        tmp = f"{path}.tmp"
+        make_frame(sensor, rows, seed).to_csv(tmp, index=False)
+        os.replace(tmp, path)
+    return path
+
+
+def split_model(model):
+    """(feature step, final estimator) of a sensor model, as two callables"""
+    if isinstance(model, Pipeline):
+        return model[:-1].transform, model[-1].predict
+    if isinstance(model, SoilSensorPipeline):
+        return (lambda X: model.scaler.transform(model._prepare_features(X)),
+                lambda X: model.encoder.inverse_transform(model.model.predict(X)))
+    return (lambda X: X), model.predict
+
+
+class StageTimer:
+    def __init__(self):
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+
+    def run(self, stage, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.seconds[stage] += time.perf_counter() - start
+        return result
+
+
+def run_stages(router, path, out_path):
+    """
+    Score one file the way route_and_predict does, timing each stage.
+
+    Caches (schema, alias) are cleared first so detection and alias mapping
+    are measured cold.
+    """
+    t = StageTimer()
+    classify_columns.cache_clear()
+    clear_alias_cache()
+
+    df = t.run("parse", pd.read_csv, path)
+
+    def detect():
+        groups = []
+        for columns, positions in router._column_signatures(df):
+            groups.append((router._detect_signature(columns), columns, positions))
+        return groups
+    groups = t.run("detection", detect)
+
+    n = len(df)
+    preds = np.empty(n, dtype=object)
+    for sensor, columns, positions in groups:
+        block = router._block(df, columns, positions)
+        model = router._get_model(sensor)
+        t.run("alias", lambda: map_columns_with_aliases(
+            block.columns, EXPECTED_FEATURES.get(sensor, []), fuzzy_cutoff=router.fuzzy_cutoff))
+        if model is None:
+            continue
+        features, estimator = split_model(model)
+
+        def prepare():
+            prepared, _ = router._apply_aliases(block, sensor, SoilRollingFeatures())
+            if sensor == "wafer":
+                prepared["wafer_id"] = np.arange(len(prepared))
+            return features(prepared)
+        X = t.run("features", prepare)
+        preds[positions] = t.run("predict", estimator, X)
+
+    def serialize():
+        out = df.assign(prediction=preds)
+        out.to_csv(out_path, index=False)
+    t.run("serialize", serialize)
+    return t.seconds
+
+
+def run_end_to_end(router, path, out_path):
+    start = time.perf_counter()
+    pred = router.route_and_predict(pd.read_csv(path))
+    pred.to_csv(out_path, index=False)
+    return time.perf_counter() - start
+
+
+def best_of(repeat, fn):
+    runs = [fn() for _ in range(repeat)]
+    if isinstance(runs[0], dict):
+        return {k: min(r[k] for r in runs) for k in runs[0]}
+    return min(runs)
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(r["sensor"], r["rows"]): r for r in baseline["results"]}
+    print()
+    print(f"vs {baseline_path} (commit {str(baseline['git'].get('commit'))[:10]})")
+    print(f"{'case':<22} {'old s':>9} {'new s':>9} {'speedup':>8}")
+    for r in current["results"]:
+        b = old.get((r["sensor"], r["rows"]))
+        if b is None:
+            continue
+        a_s, b_s = r["end_to_end_s"], b["end_to_end_s"]
+        print(f"{r['sensor'] + ' ' + str(r['rows']):<22} {b_s:>9.3f} {a_s:>9.3f} {b_s / a_s:>7.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scoring throughput per sensor and stage")
+    parser.add_argument("--sizes", default="1k,10k,100k", help="Comma-separated row counts (1k ... 10m)")
+    parser.add_argument("--sensors", default=",".join(SENSORS + ["mixed"]))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="Best of this many runs")
+    parser.add_argument("--model-dir", default="models")
+    parser.add_argument("--output", help=f"Result JSON (default {RESULTS_DIR}/<commit>-<time>.json)")
+    parser.add_argument("--compare", help="Earlier result JSON to compare end-to-end times against")
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(s) for s in args.sizes.split(",")]
+    sensors = [s.strip() for s in args.sensors.split(",")]
+    git = git_info()
+    results = []
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    out_path = os.path.join(DATA_DIR, "_predictions.csv")
+
+    print(f"{'sensor':<12} {'rows':>10} " + " ".join(f"{s:>10}" for s in STAGES) + f" {'total s':>9} {'rows/s':>12}")
+    for sensor in sensors:
+        router = AllInOneRouter(model_dir=args.model_dir,
+                                detection="rows" if sensor == "mixed" else "header")
+        router.registry.preload()
+        for rows in sizes:
+            path = dataset_path(sensor, rows, args.seed)
+            stages = best_of(args.repeat, lambda: run_stages(router, path, out_path))
+            total = best_of(args.repeat, lambda: run_end_to_end(router, path, out_path))
+            results.append({
+                "sensor": sensor,
+                "rows": rows,
+                "stages_s": stages,
+                "end_to_end_s": total,
+                "rows_per_s": rows / total if total else None,
+            })
+            print(f"{sensor:<12} {rows:>10} " + " ".join(f"{stages[s]:>10.4f}" for s in STAGES)
+                  + f" {total:>9.3f} {rows / total:>12,.0f}")
+
+    if os.path.exists(out_path):
+        os.remove(out_path)
+
+    report = {
+        "git": git,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+        },
+        "results": results,
+    }
+    output = args.output
+    if not output:
+        tag = (git["commit"] or "nogit")[:10] + ("-dirty" if git["dirty"] else "")
+        output = os.path.join(RESULTS_DIR, f"{tag}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[OK] Results written to {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,36 @@
 # scripts/convert_pkls_to_joblib.py
+# Convert the .pkl pipelines in models/ to load-ready artifacts, in parallel,
+# and record what each format costs.
+#
+#   python -m scripts.convert_pkls_to_joblib                       # .pkl -> .joblib (uncompressed)
+#   python -m scripts.convert_pkls_to_joblib --formats none,zlib,lz4,compiled -o models/candidates
+#
+# Every artifact is reloaded and checked against the original pipeline on a
+# sample batch; models/manifest.json (or --manifest) records hashes, sizes,
+# dump/load times and the verification result, plus the fastest-loading
+# verified format per model.
+import argparse
+import hashlib
+import json
 import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
 from pathlib import Path
+
 import joblib
 import cloudpickle
+import sklearn
+import xgboost
+
+# These imports are required so joblib can unpickle the custom classes
+from custom_transformers import WaferAggregator, FeatureEngineer, SoilSensorPipeline, LDRFeatureEngineer
+from all_in_one_router import AllInOneRouter
+from compiled_models import NotCompilable, export_compiled, load_compiled, COMPILED_SUFFIX
+from model_registry import MODEL_FILES
+from scripts.export_compiled_models import verify
 
 MODELS_DIR = Path("models")
 PKL_FILES = [
@@ -12,6 +40,17 @@ PKL_FILES = [
     "temperature_pipeline.pkl",
     "ldr_pipeline.pkl"
 ]
+# sensor -> .pkl name, from the registry's .joblib names
+PKL_SENSORS = {Path(fname).with_suffix(".pkl").name: sensor for sensor, fname in MODEL_FILES.items()}
+
+# format -> joblib compress argument ("compiled" is compiled_models' .npz)
+FORMATS = {
+    "none": 0,
+    "zlib": ("zlib", 3),
+    "lz4": ("lz4", 3),
+    "compiled": None,
+}
+
 
 def load_any(path):
     try:
@@ -23,21 +62,183 @@ def load_any(path):
         except Exception as e2:
             raise RuntimeError(f"Could not load {path}: joblib error: {e1}; cloudpickle error: {e2}")
 
-def convert_all():
+
+def format_available(fmt):
+    if fmt != "lz4":
+        return True
+    try:
+        import lz4  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def artifact_path(src, out_dir, fmt, single):
+    stem = Path(src).stem
+    if fmt == "compiled":
+        return Path(out_dir) / f"{stem}{COMPILED_SUFFIX}"
+    return Path(out_dir) / (f"{stem}.joblib" if single else f"{stem}.{fmt}.joblib")
+
+
+def sha256_of(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def timed_call(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+# ==========================================================
+# WORKER
+# ==========================================================
+def convert_one(src, formats, out_dir, load_repeat=3, sample_rows=2000, seed=0):
+    """Convert one .pkl to every format; returns its manifest entry"""
+    model, source_load_s = timed_call(load_any, src)
+    sensor = PKL_SENSORS.get(Path(src).name)
+    router = AllInOneRouter()
+    entry = {
+        "source": str(src),
+        "sensor": sensor,
+        "source_sha256": sha256_of(src),
+        "source_bytes": os.path.getsize(src),
+        "source_load_s": source_load_s,
+        "artifacts": [],
+    }
+
+    # compiled last, so the .joblib it is paired with already exists
+    for fmt in sorted(formats, key=lambda f: f == "compiled"):
+        out = artifact_path(src, out_dir, fmt, single=len(formats) == 1)
+        tmp = f"{out}.tmp"
+        if fmt == "compiled":
+            # The registry loads the artifact only if it records the sha256 of
+            # the .joblib beside it; without one, record the .pkl it came from
+            paired = artifact_path(src, out_dir, "none", single=True)
+            try:
+                _, dump_s = timed_call(export_compiled, model, tmp, paired if paired.exists() else src)
+            except NotCompilable as e:
+                entry["artifacts"].append({"format": fmt, "path": None, "skipped": str(e), "verified": None})
+                continue
+            loader = load_compiled
+        else:
+            _, dump_s = timed_call(joblib.dump, model, tmp, FORMATS[fmt])
+            loader = joblib.load
+        os.replace(tmp, out)
+
+        loads = [timed_call(loader, out) for _ in range(load_repeat)]
+        converted = loads[-1][0]
+        verified = None
+        if sensor is not None:
+            verified = bool(verify(router, sensor, model, converted, sample_rows, seed))
+
+        entry["artifacts"].append({
+            "format": fmt,
+            "path": str(out),
+            "sha256": sha256_of(out),
+            "bytes": os.path.getsize(out),
+            "dump_s": dump_s,
+            "load_s": min(s for _, s in loads),
+            "verified": verified,
+        })
+    return entry
+
+
+# ==========================================================
+# DRIVER
+# ==========================================================
+def fastest_verified(entry):
+    ok = [a for a in entry["artifacts"] if a["verified"] is not False and not a.get("skipped")]
+    return min(ok, key=lambda a: a["load_s"])["format"] if ok else None
+
+
+def convert_all(formats=("none",), out_dir=MODELS_DIR, workers=None, manifest=None,
+                load_repeat=3, sample_rows=2000, seed=0):
+    for fmt in [f for f in formats if not format_available(f)]:
+        print(f"[WARN] {fmt} compression needs the lz4 package — skip")
+    formats = [f for f in formats if format_available(f)]
+
+    sources = []
     for fname in PKL_FILES:
         p = MODELS_DIR / fname
         if not p.exists():
             print(f"[WARN] {p} not found — skip")
             continue
-        print(f"[INFO] Loading {p} ...")
-        try:
-            model = load_any(p)
-        except Exception as e:
-            print(f"[ERROR] Failed to load {p}: {e}")
-            continue
-        out = p.with_suffix(".joblib")
-        joblib.dump(model, out)
-        print(f"[OK] Saved joblib: {out}")
+        sources.append(p)
+    if not sources or not formats:
+        return []
+
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or min(len(sources), os.cpu_count() or 1)
+    entries = []
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(convert_one, p, formats, out_dir, load_repeat, sample_rows, seed): p
+            for p in sources
+        }
+        for fut in as_completed(futures):
+            p = futures[fut]
+            try:
+                entry = fut.result()
+            except Exception as e:
+                failed += 1
+                print(f"[ERROR] Failed to convert {p}: {e}")
+                continue
+            entry["fastest"] = fastest_verified(entry)
+            entries.append(entry)
+            for a in entry["artifacts"]:
+                if a.get("skipped"):
+                    print(f"[WARN] {p}: no {a['format']} artifact ({a['skipped']})")
+                    continue
+                tag = {True: "verified", False: "MISMATCH", None: "not verified"}[a["verified"]]
+                level = "ERROR" if a["verified"] is False else "OK"
+                print(f"[{level}] {a['path']}: {a['bytes'] / 1e6:.2f} MB, "
+                      f"load {a['load_s'] * 1000:.1f} ms, {tag}")
+            failed += sum(a["verified"] is False for a in entry["artifacts"])
+
+    entries.sort(key=lambda e: e["source"])
+    manifest = manifest or os.path.join(out_dir, "manifest.json")
+    with open(manifest, "w", encoding="utf-8") as f:
+        json.dump({
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "formats": formats,
+            "sample_rows": sample_rows,
+            "environment": {
+                "python": platform.python_version(),
+                "joblib": joblib.__version__,
+                "sklearn": sklearn.__version__,
+                "xgboost": xgboost.__version__,
+            },
+            "models": entries,
+        }, f, indent=2)
+    print(f"[OK] Manifest written to {manifest}")
+    return entries if not failed else None
+
 
 if __name__ == "__main__":
-    convert_all()
+    parser = argparse.ArgumentParser(description="Convert .pkl pipelines to verified joblib/compiled artifacts")
+    parser.add_argument("--formats", default="none",
+                        help=f"Comma-separated, from {', '.join(FORMATS)} (several: <stem>.<format>.joblib)")
+    parser.add_argument("-o", "--output-dir", default=str(MODELS_DIR))
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Conversion processes (default: one per model)")
+    parser.add_argument("--manifest", help="Manifest path (default <output-dir>/manifest.json)")
+    parser.add_argument("--load-repeat", type=int, default=3, help="Loads timed per artifact (best is kept)")
+    parser.add_argument("--sample-rows", type=int, default=2000, help="Synthetic rows used to verify predictions")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    formats = [f.strip() for f in args.formats.split(",")]
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown:
+        parser.error(f"unknown format(s): {', '.join(unknown)}")
+
+    result = convert_all(
+        formats=formats, out_dir=args.output_dir,
+        workers=args.workers, manifest=args.manifest, load_repeat=args.load_repeat,
+        sample_rows=args.sample_rows, seed=args.seed,
+    )
+    sys.exit(0 if result else 1)
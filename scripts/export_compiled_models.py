@@ -0,0 +1,79 @@
+# scripts/export_compiled_models.py
+# Write a compact .compiled.npz next to every model in models/ that has one and
+# check that it predicts exactly like the .joblib it came from. The registry
+# uses them with SENSOR_COMPILED_MODELS=1.
+#
+#   python -m scripts.export_compiled_models
+#   python -m scripts.export_compiled_models --rows 20000 --model-dir models
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# These imports are required so joblib can unpickle the custom classes
+from custom_transformers import WaferAggregator, FeatureEngineer, SoilSensorPipeline, SoilRollingFeatures
+from all_in_one_router import AllInOneRouter
+from compiled_models import NotCompilable, compiled_path, export_compiled, load_compiled
+from model_registry import MODEL_FILES
+from model_utils import load_model
+from scripts.generate_test_csv import make_sensor_frame
+
+
+def timed_load(fn, path):
+    start = time.perf_counter()
+    model = fn(path)
+    return model, time.perf_counter() - start
+
+
+def verify(router, sensor, original, compiled, rows, seed):
+    """True when both models give identical predictions on synthetic input"""
+    df = make_sensor_frame(sensor, rows, seed)
+    prepared, _ = router._apply_aliases(df, sensor, SoilRollingFeatures())
+    if sensor == "wafer":
+        prepared["wafer_id"] = np.arange(len(prepared))
+    expected = np.asarray(original.predict(prepared.copy()))
+    actual = np.asarray(compiled.predict(prepared.copy()))
+    return expected.dtype == actual.dtype and np.array_equal(expected, actual)
+
+
+def export_all(model_dir="models", rows=5000, seed=0):
+    router = AllInOneRouter(model_dir=model_dir)
+    failed = 0
+    for sensor, fname in MODEL_FILES.items():
+        src = os.path.join(model_dir, fname)
+        if not os.path.exists(src):
+            print(f"[WARN] {src} not found — skip")
+            continue
+
+        original, joblib_s = timed_load(load_model, src)
+        out = compiled_path(src)
+        try:
+            export_compiled(original, out, source=src)
+        except NotCompilable as e:
+            print(f"[WARN] {src}: {e} — kept as .joblib only")
+            if os.path.exists(out):
+                os.remove(out)
+            continue
+        compiled, compiled_s = timed_load(load_compiled, out)
+
+        if not verify(router, sensor, original, compiled, rows, seed):
+            print(f"[ERROR] {out}: predictions differ from {src}; removing it")
+            os.remove(out)
+            failed += 1
+            continue
+
+        print(f"[OK] {out}: {os.path.getsize(out) / 1e6:.2f} MB "
+              f"(joblib {os.path.getsize(src) / 1e6:.2f} MB), "
+              f"load {compiled_s * 1000:.0f} ms (joblib {joblib_s * 1000:.0f} ms), predictions identical")
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export models as compact compiled artifacts")
+    parser.add_argument("--model-dir", default="models")
+    parser.add_argument("--rows", type=int, default=5000, help="Synthetic rows used to verify predictions")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    sys.exit(1 if export_all(args.model_dir, args.rows, args.seed) else 0)
@@ -1,60 +1,104 @@
 # scripts/generate_test_csv.py
+#   python scripts/generate_test_csv.py                              # 50 mixed rows
+#   python scripts/generate_test_csv.py --sensor soil --rows 1000000 --seed 1
+import argparse
+import os
+
 import pandas as pd
 import numpy as np
-import os
-from datetime import datetime
-
-def generate():
-    rows = []
-
-    for i in range(50):
-        choice = np.random.choice(["wafer","gas","temperature","soil","light"])
-
-        if choice == "wafer":
-            row = {"wafer_id": f"W{i}", "timestamp": int(datetime.now().timestamp()*1000)}
-            for s in range(1,31):
-                row[f"sensor_{s}"] = np.random.randn()
-            row["faulty"] = ""
-
-        elif choice == "gas":
-            row = {
-                "timestramp_millies": int(datetime.now().timestamp() * 1000),
-                "mq2_value": np.random.rand()*5,
-                "temperature": 20 + np.random.rand()*10,
-                "humidity": 30 + np.random.rand()*20,
-                "label": ""
-            }
-
-        elif choice == "temperature":
-            row = {
-                "timestramp": int(datetime.now().timestamp() * 1000),
-                "sensor_value": 15 + np.random.rand()*10,
-                "label": ""
-            }
-
-        elif choice == "soil":
-            row = {
-                "timestamp_ms": int(datetime.now().timestamp() * 1000),
-                "sensor_value": np.random.rand()*1000,
-                "label": ""
-            }
-
-        else:  # light
-            row = {
-                "timestamp": int(datetime.now().timestamp() * 1000),
-                "ldr_value": np.random.rand() * 1000,
-                "voltage": np.random.rand(),
-                "resistance": np.random.rand()*100,
-                "ambient_light": np.random.rand()*200,
-                "status": ""
-            }
-
-        rows.append(row)
-
-    df = pd.DataFrame(rows)
-    os.makedirs("data", exist_ok=True)
-    df.to_csv("data/test_input_50.csv", index=False)
-    print("Generated data/test_input_50.csv")
+
+SENSORS = ["wafer", "gas", "temperature", "soil", "light"]
+BASE_TIMESTAMP_MS = 1_700_000_000_000
+ROWS_PER_WAFER = 50
+
+
+def make_sensor_frame(sensor, rows, seed=0):
+    """Deterministic synthetic readings for one sensor type, in its upload layout"""
+    rng = np.random.default_rng([seed, SENSORS.index(sensor)])
+    ts = BASE_TIMESTAMP_MS + np.arange(rows, dtype=np.int64) * 1000
+
+    if sensor == "wafer":
+        data = {
+            "wafer_id": np.char.add("W", (np.arange(rows) // ROWS_PER_WAFER).astype(str)),
+            "timestamp": ts,
+        }
+        for s in range(1, 31):
+            data[f"sensor_{s}"] = rng.standard_normal(rows)
+        data["faulty"] = ""
+        return pd.DataFrame(data)
+
+    if sensor == "gas":
+        return pd.DataFrame({
+            "timestramp_millies": ts,
+            "mq2_value": rng.random(rows) * 5,
+            "temperature": 20 + rng.random(rows) * 10,
+            "humidity": 30 + rng.random(rows) * 20,
+            "label": "",
+        })
+
+    if sensor == "temperature":
+        return pd.DataFrame({
+            "timestamp(ms)": ts,
+            "sensor_value": 15 + rng.random(rows) * 10,
+            "label": "",
+        })
+
+    if sensor == "soil":
+        return pd.DataFrame({
+            "timestamp_ms": ts,
+            "sensor_value": rng.random(rows) * 1000,
+            "label": "",
+        })
+
+    if sensor == "light":
+        resistance = rng.random(rows) * 100
+        resistance[rng.random(rows) < 0.05] = np.nan
+        return pd.DataFrame({
+            "timestamp": pd.to_datetime(ts, unit="ms").strftime("%Y-%m-%d %H:%M:%S"),
+            "ldr_value": rng.random(rows) * 1000,
+            "voltage": rng.random(rows),
+            "resistance": resistance,
+            "ambient_light": rng.random(rows) * 200,
+            "status": "",
+        })
+
+    raise ValueError(f"Unknown sensor: {sensor}")
+
+
+def make_mixed_frame(rows, seed=0):
+    """All-in-one file: every sensor's rows shuffled together under one union header"""
+    rng = np.random.default_rng([seed, len(SENSORS)])
+    choice = rng.integers(0, len(SENSORS), rows)
+    parts = []
+    for i, sensor in enumerate(SENSORS):
+        positions = np.flatnonzero(choice == i)
+        part = make_sensor_frame(sensor, len(positions), seed)
+        # Empty label columns would mark rows of other sensors as non-null
+        part = part.drop(columns=["faulty", "label", "status"], errors="ignore")
+        parts.append(part.set_axis(positions))
+    return pd.concat(parts).sort_index().reset_index(drop=True)
+
+
+def make_frame(sensor, rows, seed=0):
+    if sensor == "mixed":
+        return make_mixed_frame(rows, seed)
+    return make_sensor_frame(sensor, rows, seed)
+
+
+def generate(rows=50, sensor="mixed", seed=0, out=None):
+    out = out or os.path.join("data", f"test_input_{rows}.csv")
+    df = make_frame(sensor, rows, seed)
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    df.to_csv(out, index=False)
+    print(f"Generated {out}")
+    return out
+
 
 if __name__ == "__main__":
-    generate()
+    parser = argparse.ArgumentParser(description="Write deterministic synthetic sensor CSVs")
+    parser.add_argument("--rows", type=int, default=50)
+    parser.add_argument("--sensor", choices=SENSORS + ["mixed"], default="mixed")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Output CSV (default data/test_input_<rows>.csv)")
+    args = parser.parse_args()
+    generate(args.rows, args.sensor, args.seed, args.out)
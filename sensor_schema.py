@@ -0,0 +1,136 @@
+# sensor_schema.py
+from functools import lru_cache
+
+import numpy as np
+
+from alias_utils import normalize_col
+
+SCHEMA_CACHE_SIZE = 1024
+
+
+class _Header:
+    """Precomputed raw/normalized column sets of one header"""
+    __slots__ = ("exact", "raw", "norm", "has_sensor_value")
+
+    def __init__(self, columns):
+        self.exact = frozenset(columns)
+        self.raw = frozenset(str(c).strip().lower() for c in columns)
+        self.norm = frozenset(normalize_col(c) for c in columns)
+        self.has_sensor_value = "sensorvalue" in self.norm
+
+
+@lru_cache(maxsize=SCHEMA_CACHE_SIZE)
+def _header(columns):
+    return _Header(columns)
+
+
+@lru_cache(maxsize=SCHEMA_CACHE_SIZE)
+def classify_columns(columns):
+    """
+    Sensor type ("soil", "temperature", "gas", "light", "wafer" or "unknown")
+    of a header, given as a tuple of column labels. Memoized per header.
+    """
+    h = _header(columns)
+
+    # Soil → must have EXACT timestamp_ms
+    if "timestamp_ms" in h.raw and h.has_sensor_value:
+        return "soil"
+
+    # Temperature → must have EXACT timestamp(ms)
+    if "timestamp(ms)" in h.exact and h.has_sensor_value:
+        return "temperature"
+
+    # Temperature fallback: normalized "timestampms" but NOT soil
+    if "timestampms" in h.norm and "timestamp_ms" not in h.raw and h.has_sensor_value:
+        return "temperature"
+
+    # Gas
+    if "mq2value" in h.norm or ("temperature" in h.raw and "humidity" in h.raw):
+        return "gas"
+
+    # Light
+    if "ldrvalue" in h.norm or "ambientlight" in h.norm:
+        return "light"
+
+    # Wafer
+    if "waferid" in h.norm:
+        return "wafer"
+
+    if not h.has_sensor_value and any(n.startswith("sensor") for n in h.norm):
+        return "wafer"
+
+    return "unknown"
+
+
+@lru_cache(maxsize=SCHEMA_CACHE_SIZE)
+def columns_match_sensor(columns, sensor):
+    """Whether a header is a proper dataset for an explicitly selected sensor"""
+    h = _header(columns)
+
+    # Wafer: Must have wafer_id OR multiple sensor_N columns (but not just sensor_value)
+    if sensor == "wafer":
+        has_wafer_id = any("wafer" in col for col in h.norm)
+        sensor_cols = [col for col in h.norm if col.startswith("sensor") and col != "sensorvalue"]
+        return has_wafer_id or len(sensor_cols) >= 2
+
+    # Soil Moisture: Must have EXACT timestamp_ms (underscore version) + sensor_value
+    if sensor == "soil":
+        return "timestamp_ms" in h.raw and h.has_sensor_value
+
+    # Temperature: Must have EXACT timestamp(ms) (parentheses version) + sensor_value
+    if sensor == "temperature":
+        return "timestamp(ms)" in h.exact and h.has_sensor_value
+
+    # Gas: Must have mq2_value or (temperature AND humidity)
+    if sensor == "gas":
+        return "mq2value" in h.norm or ("temperature" in h.raw and "humidity" in h.raw)
+
+    # Light: Must have ldr_value OR ambient_light
+    if sensor == "light":
+        return "ldrvalue" in h.norm or "ambientlight" in h.norm
+
+    return True  # Unknown sensor, allow
+
+
+def header_signatures(df):
+    """One (columns, row positions) group: the whole frame shares its header"""
+    return [(tuple(df.columns), np.arange(len(df)))]
+
+
+def row_signatures(df):
+    """
+    Group rows of a mixed file by which columns are non-null.
+
+    Each group is classified once from its non-null columns, so a file that
+    stacks several sensors under a union header is split per sensor. Cost is
+    one vectorized null check plus one lookup per distinct pattern.
+    """
+    columns = list(df.columns)
+    if len(df) == 0:
+        return []
+
+    present = df.notna().to_numpy()
+    packed = np.packbits(present, axis=1)
+    patterns, inverse = np.unique(packed, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+
+    order = np.argsort(inverse, kind="stable")
+    bounds = np.flatnonzero(np.diff(inverse[order])) + 1
+    groups = []
+    for positions in np.split(order, bounds):
+        mask = np.unpackbits(patterns[inverse[positions[0]]])[:len(columns)].astype(bool)
+        groups.append((tuple(c for c, m in zip(columns, mask) if m), positions))
+    return groups
+
+
+def detect_sensor_rows(df):
+    """Per-row sensor labels for a mixed file, from each row's non-null columns"""
+    labels = np.full(len(df), "unknown", dtype=object)
+    for columns, positions in row_signatures(df):
+        labels[positions] = classify_columns(columns)
+    return labels
+
+
+def schema_cache_info():
+    info = classify_columns.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
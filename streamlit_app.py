@@ -6,11 +6,14 @@ from datetime import datetime
 
 # These imports are required so joblib can unpickle your custom classes
 from custom_transformers import WaferAggregator, FeatureEngineer, SoilSensorPipeline
-from all_in_one_router import AllInOneRouter
+from typed_loader import read_sensor_csv
+from model_registry import get_registry
+from sensor_schema import columns_match_sensor
+import instrumentation
+from result_cache import get_result_cache
+from scoring_jobs import JobLimitError, estimate_rows, get_job_executor, score_upload
 from auth import authenticate, register_user, get_all_users
-from activity_logger import get_latest_logs, get_dataset_path, log_user_activity
-
-import joblib
+from activity_logger import get_latest_logs, get_dataset_path, log_user_activity, read_logged_dataset
 
 # Initialize session state
 if 'logged_in' not in st.session_state:
@@ -320,6 +323,25 @@ if st.session_state.role == 'admin':
     
     st.markdown("<br>", unsafe_allow_html=True)
     
+    # Model load times from the shared registry
+    model_stats = get_registry("models").stats()
+    if model_stats:
+        with st.expander("Model Load Times"):
+            st.dataframe(pd.DataFrame.from_dict(model_stats, orient="index"))
+    
+    # Prediction result cache effectiveness
+    cache_stats = get_result_cache().stats()
+    with st.expander("Result Cache"):
+        c1, c2, c3 = st.columns(3)
+        c1.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}", f"{cache_stats['hits']} hits / {cache_stats['misses']} misses", delta_color="off")
+        c2.metric("Input Bytes Not Re-scored", f"{cache_stats['bytes_saved'] / 1e6:.1f} MB")
+        c3.metric("Cache Size", f"{cache_stats['size_bytes'] / 1e6:.1f} MB", f"{cache_stats['entries']} entries", delta_color="off")
+    
+    # Per-function timings (only recorded with SENSOR_INSTRUMENTATION=1)
+    if instrumentation.is_enabled():
+        with st.expander("Function Timings"):
+            st.dataframe(pd.DataFrame.from_dict(instrumentation.snapshot(), orient="index"))
+    
     if not logs:
         st.info("No user activity recorded yet.")
     else:
@@ -344,34 +366,32 @@ if st.session_state.role == 'admin':
             with col2:
                 st.write(f"**Input:** `{log['input_dataset']}`")
                 # Download input dataset
-                input_path = log.get('input_path', '')
-                if input_path and os.path.exists(input_path):
-                    with open(input_path, 'rb') as f:
-                        st.download_button(
-                            label="Download Input",
-                            data=f.read(),
-                            file_name=log['input_dataset'],
-                            mime='text/csv',
-                            key=f"input_{idx}",
-                            use_container_width=True
-                        )
+                input_bytes = read_logged_dataset(log, "input")
+                if input_bytes is not None:
+                    st.download_button(
+                        label="Download Input",
+                        data=input_bytes,
+                        file_name=log['input_dataset'],
+                        mime='text/csv',
+                        key=f"input_{idx}",
+                        use_container_width=True
+                    )
                 else:
                     st.caption("File not available")
             
             with col3:
                 st.write(f"**Output:** `{log['output_dataset']}`")
                 # Download output dataset
-                output_path = log.get('output_path', '')
-                if output_path and os.path.exists(output_path):
-                    with open(output_path, 'rb') as f:
-                        st.download_button(
-                            label="Download Output",
-                            data=f.read(),
-                            file_name=log['output_dataset'],
-                            mime='text/csv',
-                            key=f"output_{idx}",
-                            use_container_width=True
-                        )
+                output_bytes = read_logged_dataset(log, "output")
+                if output_bytes is not None:
+                    st.download_button(
+                        label="Download Output",
+                        data=output_bytes,
+                        file_name=log['output_dataset'],
+                        mime='text/csv',
+                        key=f"output_{idx}",
+                        use_container_width=True
+                    )
                 else:
                     st.caption("File not available")
             
@@ -428,6 +448,7 @@ with col1:
 with col2:
     if st.button("Reset", use_container_width=True):
         st.session_state.file_uploader_key += 1
+        st.session_state.job_id = None
         st.rerun()
 with col3:
     if st.button("Logout", use_container_width=True):
@@ -436,10 +457,84 @@ with col3:
         st.session_state.role = None
         st.session_state.name = None
         st.session_state.page = 'login'
+        # The next user to log in here picks up their own latest job
+        st.session_state.pop("job_id", None)
         st.rerun()
 
 st.markdown("---")
 
+# --------------------------------------------------------------
+# Background scoring jobs: progress and results survive reruns, and a
+# new session of the same user picks up its latest job
+# --------------------------------------------------------------
+JOB_POLL_SECONDS = 1.0
+
+
+def current_job():
+    executor = get_job_executor()
+    if "job_id" not in st.session_state:
+        jobs = executor.jobs_for(st.session_state.username)
+        st.session_state.job_id = jobs[0].id if jobs else None
+    return executor.get(st.session_state.job_id) if st.session_state.job_id else None
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def job_progress(job_id):
+    job = get_job_executor().get(job_id)
+    if job is None or not job.active:
+        # Rerun the whole page to show the result
+        st.rerun()
+    if job.status == "queued":
+        st.info(f"{job.label}: waiting for a free scoring slot...")
+    else:
+        st.progress(job.progress, text=f"{job.label}: {job.rows_done:,} rows scored ({job.chunks_done} chunks)")
+    if st.button("Cancel", key=f"cancel_{job.id}"):
+        job.cancel()
+
+
+def show_scoring_job():
+    job = current_job()
+    if job is None:
+        return
+    if job.active:
+        job_progress(job.id)
+        return
+    if job.status == "failed":
+        st.error(f"❌ {job.label}: prediction failed ({job.error})")
+        return
+    if job.status == "cancelled":
+        st.warning(f"{job.label}: cancelled")
+        return
+
+    result = job.result
+    st.subheader("Predictions Preview")
+    if result["from_cache"]:
+        st.caption("Served from the result cache")
+    elif result["output_path"]:
+        st.caption(f"Scored {result['rows']} rows in {result['chunks']} chunks")
+    st.dataframe(result["pred_df"].head())
+
+    # Download button
+    if result["output_path"]:
+        # Served straight from the temp file written chunk by chunk
+        with open(result["output_path"], "rb") as f:
+            st.download_button(
+                "Download Full Prediction CSV",
+                f,
+                "predictions.csv",
+                "text/csv",
+                key=f"download_{job.id}"
+            )
+    else:
+        st.download_button(
+            "Download Full Prediction CSV",
+            result["pred_df"].to_csv(index=False).encode("utf-8"),
+            "predictions.csv",
+            "text/csv",
+            key=f"download_{job.id}"
+        )
+
+
 # Main heading
 st.markdown("## Upload Sensor Dataset")
 
@@ -473,188 +568,112 @@ uploaded_file = st.file_uploader(
 
 if mode == "-- Select a sensor --":
     st.warning("Please select a sensor type.")
+    show_scoring_job()
     st.stop()
 
+# --------------------------------------------------------------
+# Streaming mode for large uploads
+# --------------------------------------------------------------
+streaming = st.checkbox("Streaming mode (large files)", key="streaming_mode")
+chunk_size = 50000
+if streaming:
+    chunk_size = int(st.number_input("Rows per chunk", min_value=1000, value=50000, step=1000))
+compact = st.checkbox("Compact column types (float32 readings, less memory)", key="compact_types")
+
 if not uploaded_file:
     st.info("Please upload a CSV file to start.")
+    show_scoring_job()
     st.stop()
 
-df = pd.read_csv(uploaded_file)
+if streaming:
+    # Only the header is read here; rows are scored chunk by chunk later
+    df = None
+    df_columns = pd.read_csv(uploaded_file, nrows=0).columns
+    uploaded_file.seek(0)
+elif compact:
+    df = read_sensor_csv(uploaded_file)
+    df_columns = df.columns
+else:
+    df = pd.read_csv(uploaded_file)
+    df_columns = df.columns
 
 # --------------------------------------------------------------
 # Helper to validate dataset matches selected sensor type
 # --------------------------------------------------------------
 def validate_dataset(df_cols, sensor_mode):
     """Check if uploaded dataset columns match the selected sensor type"""
-    from alias_utils import normalize_col
-    
-    raw_cols = [str(c).strip().lower() for c in df_cols]
-    norm_cols = [normalize_col(c) for c in df_cols]
-    
-    has_sensor_value = ("sensorvalue" in norm_cols)
-    
-    # Wafer: Must have wafer_id OR multiple sensor_N columns (but not just sensor_value)
-    if sensor_mode == "Wafer Sensor":
-        has_wafer_id = any("wafer" in col for col in norm_cols)
-        sensor_cols = [col for col in norm_cols if col.startswith("sensor") and col != "sensorvalue"]
-        has_multiple_sensors = len(sensor_cols) >= 2
-        return has_wafer_id or has_multiple_sensors
-    
-    # Soil Moisture: Must have EXACT timestamp_ms (underscore version) + sensor_value
-    if sensor_mode == "Soil-Moisture Sensor":
-        has_timestamp_ms = "timestamp_ms" in raw_cols
-        return has_timestamp_ms and has_sensor_value
-    
-    # Temperature: Must have EXACT timestamp(ms) (parentheses version) + sensor_value
-    if sensor_mode == "Temperature Sensor":
-        has_timestamp_paren = "timestamp(ms)" in df_cols
-        return has_timestamp_paren and has_sensor_value
-    
-    # Gas: Must have mq2_value or (temperature AND humidity)
-    if sensor_mode == "Gas Sensor":
-        has_mq2 = "mq2value" in norm_cols
-        has_temp_hum = ("temperature" in raw_cols and "humidity" in raw_cols)
-        return has_mq2 or has_temp_hum
-    
-    # Light: Must have ldr_value OR ambient_light
-    if sensor_mode == "Light Sensor":
-        has_ldr = "ldrvalue" in norm_cols
-        has_ambient = "ambientlight" in norm_cols
-        return has_ldr or has_ambient
-    
-    return True  # Unknown mode, allow
+    sensor_key = SENSOR_KEYS.get(sensor_mode)
+    if sensor_key is None:
+        return True  # Unknown mode, allow
+    return columns_match_sensor(tuple(df_cols), sensor_key)
 
 # --------------------------------------------------------------
 # Helper to load specific sensor model exactly like router
 # --------------------------------------------------------------
-def load_single_model(sensor_name):
-    file_map = {
-        "Wafer Sensor": "wafer_pipeline.joblib",
-        "Soil-Moisture Sensor": "soil_moisture_pipeline.joblib",
-        "Gas Sensor": "gas_pipeline.joblib",
-        "Temperature Sensor": "temperature_pipeline.joblib",
-        "Light Sensor": "ldr_pipeline.joblib",
-    }
-    fname = file_map.get(sensor_name)
-    if not fname:
-        return None
+SENSOR_KEYS = {
+    "Wafer Sensor": "wafer",
+    "Soil-Moisture Sensor": "soil",
+    "Gas Sensor": "gas",
+    "Temperature Sensor": "temperature",
+    "Light Sensor": "light",
+}
 
-    model_path = os.path.join("models", fname)
-    if not os.path.exists(model_path):
+def load_single_model(sensor_name):
+    sensor_key = SENSOR_KEYS.get(sensor_name)
+    if not sensor_key:
         return None
 
-    return joblib.load(model_path)
+    # Shared with the router, so the pipeline is only loaded once per process
+    return get_registry("models").get(sensor_key)
 
 
 # --------------------------------------------------------------
-# Prediction button
+# Prediction button → queue a background scoring job
 # --------------------------------------------------------------
 if st.button("Run Fault Detection"):
-    with st.spinner("Predicting..."):
-
-        # ------------------------------------------------------
-        # 1️⃣ ALL-IN-ONE MODE → use your working router
-        # ------------------------------------------------------
-        if mode == "All-in-One Sensor":
-            router = AllInOneRouter(model_dir="models")
-            pred_df = router.route_and_predict(df)
-
-        # ------------------------------------------------------
-        # 2️⃣ SINGLE SENSOR MODE → load specific model
-        # ------------------------------------------------------
-        else:
-            # Validate dataset matches selected sensor type
-            if not validate_dataset(df.columns, mode):
-                st.error(f"❌ The dataset is not proper for {mode} sensor!")
-                st.warning(f"Please upload a valid {mode} sensor dataset or use 'All-in-One (Auto Detect)' mode.")
-                st.stop()
-            
-            model = load_single_model(mode)
-
-            if model is None:
-                st.error(f"Model not found for sensor: {mode}")
-                st.stop()
-
-            # Use the existing router logic for alias mapping
-            router = AllInOneRouter(model_dir="models")
-
-            # But override auto-detection:
-            results = []
-            expected_map = {
-                "Wafer Sensor": "wafer",
-                "Soil-Moisture Sensor": "soil",
-                "Gas Sensor": "gas",
-                "Temperature Sensor": "temperature",
-                "Light Sensor": "light",
-            }
-            sensor_key = expected_map[mode]
-
-            from alias_utils import EXPECTED_FEATURES, map_columns_with_aliases
-            expected_cols = EXPECTED_FEATURES[sensor_key]
-
-            for _, row in df.iterrows():
-                row_df = row.to_frame().T
-
-                # Alias mapping (same code as router)
-                rename_map, notes = map_columns_with_aliases(
-                    row_df.columns, expected_cols
-                )
-                prepared = row_df.rename(columns=rename_map)
-
-                # Fill missing expected columns
-                for col in expected_cols:
-                    if col not in prepared.columns:
-                        prepared[col] = 0
-
-                prepared = prepared[expected_cols].copy()
-
-                # Convert to numeric
-                for c in prepared.columns:
-                    prepared[c] = pd.to_numeric(prepared[c], errors="coerce").fillna(0)
-
-                # Predict
-                pred = model.predict(prepared)[0]
-
-                out = row.to_dict()
-                out["sensor_type"] = mode
-                out["prediction"] = pred
-                out["note"] = f"single_model:{mode}"
-                results.append(out)
-
-            pred_df = pd.DataFrame(results)
-
-    # ------------------------------------------------------
-    # Reorder columns to show sensor_type and prediction first
-    # ------------------------------------------------------
-    cols = ['sensor_type', 'prediction'] + [col for col in pred_df.columns if col not in ['sensor_type', 'prediction']]
-    pred_df = pred_df[cols]
-
-    # ------------------------------------------------------
-    # Log user activity immediately after prediction
-    # ------------------------------------------------------
+    sensor_key = None
+    if mode != "All-in-One Sensor":
+        # Validate dataset matches selected sensor type
+        if not validate_dataset(df_columns, mode):
+            st.error(f"❌ The dataset is not proper for {mode} sensor!")
+            st.warning(f"Please upload a valid {mode} sensor dataset or use 'All-in-One (Auto Detect)' mode.")
+            st.stop()
+
+        model = load_single_model(mode)
+
+        if model is None:
+            st.error(f"Model not found for sensor: {mode}")
+            st.stop()
+
+        sensor_key = SENSOR_KEYS[mode]
+
+    upload_bytes = uploaded_file.getvalue()
+
+    def log_job(result, username=st.session_state.username, sensor_type=mode,
+                input_filename=uploaded_file.name, upload_bytes=upload_bytes):
+        """Log user activity as soon as the job's prediction is ready"""
+        try:
+            log_user_activity(
+                username=username,
+                sensor_type=sensor_type,
+                input_filename=input_filename,
+                output_filename="predictions.csv",
+                input_data=result["input_path"] or upload_bytes,
+                output_data=result["output_path"] or result["pred_df"]
+            )
+        except Exception as e:
+            print(f"[WARN] Activity logging failed: {e}")
+
     try:
-        log_user_activity(
-            username=st.session_state.username,
-            sensor_type=mode,
-            input_filename=uploaded_file.name,
-            output_filename="predictions.csv",
-            input_data=df,
-            output_data=pred_df
+        job = get_job_executor().submit(
+            st.session_state.username, score_upload, upload_bytes, mode,
+            sensor_key=sensor_key, df=df, streaming=streaming, chunk_rows=chunk_size,
+            compact=compact, on_done=log_job,
+            label=f"{mode} · {uploaded_file.name}",
+            total_rows=estimate_rows(upload_bytes) if streaming else len(df),
         )
-    except Exception as e:
-        st.warning(f"Activity logging failed: {str(e)}")
-
-    # ------------------------------------------------------
-    # Show results
-    # ------------------------------------------------------
-    st.subheader("Predictions Preview")
-    st.dataframe(pred_df.head())
-
-    # Download button
-    st.download_button(
-        "Download Full Prediction CSV",
-        pred_df.to_csv(index=False).encode("utf-8"),
-        "predictions.csv",
-        "text/csv"
-    )
+        st.session_state.job_id = job.id
+    except JobLimitError:
+        st.warning("A prediction of yours is still running. Wait for it to finish or cancel it first.")
 
+show_scoring_job()
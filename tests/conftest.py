@@ -0,0 +1,27 @@
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.path.join(ROOT, "models")
+
+
+@pytest.fixture(scope="session")
+def registry():
+    import __main__
+    import custom_transformers
+    from model_registry import ModelRegistry
+
+    # Some pickles reference the custom classes as __main__.<name>; the app
+    # and scripts import them into __main__, pytest does not
+    for name in ("WaferAggregator", "FeatureEngineer", "SoilSensorPipeline"):
+        setattr(__main__, name, getattr(custom_transformers, name))
+    return ModelRegistry(MODEL_DIR)
+
+
+def require_model(registry, sensor):
+    """The loaded pipeline for sensor, or skip the test when it is not on disk"""
+    model = registry.get(sensor)
+    if model is None:
+        pytest.skip(f"no {sensor} model in {MODEL_DIR}")
+    return model
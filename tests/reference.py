@@ -0,0 +1,89 @@
+"""Previous implementations of rewritten transformers, kept as parity references"""
+import numpy as np
+import pandas as pd
+
+from custom_transformers import rolling_mean_std
+
+
+def make_wafer_frame(rows, cols, wafers, seed=0, nan_rate=0.01, shuffle=True):
+    rng = np.random.default_rng(seed)
+    ids = rng.integers(0, wafers, rows) if shuffle else np.sort(rng.integers(0, wafers, rows))
+    data = {"wafer_id": np.char.add("W", ids.astype(str)), "timestamp": np.arange(rows)}
+    for s in range(1, cols + 1):
+        values = rng.normal(size=rows)
+        if nan_rate:
+            values[rng.random(rows) < nan_rate] = np.nan
+        data[f"sensor_{s}"] = values
+    return pd.DataFrame(data)
+
+
+def widen(df, extra_cols, seed):
+    """df with extra_cols random columns the transformers do not read"""
+    rng = np.random.default_rng(seed)
+    extra = pd.DataFrame(rng.random((len(df), extra_cols)), index=df.index,
+                         columns=[f"extra_{i}" for i in range(extra_cols)])
+    return pd.concat([df, extra], axis=1)
+
+
+def legacy_transform(agg, df):
+    """WaferAggregator.transform before the NumPy path (copy, per-column drops, groupby)"""
+    df = df.copy()
+    for c in list(df.columns):
+        if 'time' in c.lower():
+            df.drop(columns=[c], inplace=True, errors='ignore')
+    feature_cols = [c for c in df.columns if c not in [agg.wafer_col, agg.target]]
+    df_agg = df.groupby(agg.wafer_col)[feature_cols].agg(['mean', 'std', 'min', 'max'])
+    df_agg.columns = ['_'.join(col).strip() for col in df_agg.columns.values]
+    if agg.target in df.columns:
+        df_agg[agg.target] = df.groupby(agg.wafer_col)[agg.target].max()
+    return df_agg.reset_index(drop=True)
+
+
+def legacy_gas(fe, X):
+    """FeatureEngineer.transform before the integer timestamp kernel"""
+    X = X.copy()
+    ts = fe.detect_timestamp(X)
+    if ts:
+        try:
+            X["datetime"] = pd.to_datetime(X[ts], unit="ms", origin="unix", errors="coerce")
+        except Exception:
+            X["datetime"] = pd.to_datetime(X[ts], errors="coerce")
+        X["hour"] = X["datetime"].dt.hour.fillna(0)
+        X["dayofweek"] = X["datetime"].dt.dayofweek.fillna(0)
+    else:
+        X["hour"] = 0
+        X["dayofweek"] = 0
+    X = X.drop(columns=["datetime"], errors="ignore")
+    required_cols = ["mq2_value", "temperature", "humidity", "hour", "dayofweek"]
+    for col in required_cols:
+        if col not in X.columns:
+            X[col] = 0
+    return X[required_cols]
+
+
+def legacy_ldr(fe, X):
+    """LDRFeatureEngineer.transform before the integer timestamp kernel"""
+    X = X.copy()
+    ts_col = fe.detect_timestamp_col(X)
+    if ts_col:
+        X["_dt"] = pd.to_datetime(X[ts_col], errors="coerce")
+        X["hour"] = X["_dt"].dt.hour.fillna(0).astype(int)
+        X["dayofweek"] = X["_dt"].dt.dayofweek.fillna(0).astype(int)
+        X.drop(columns=["_dt"], errors="ignore", inplace=True)
+    else:
+        X["hour"] = 0
+        X["dayofweek"] = 0
+    required = fe.feature_names_ or ["ldr_value", "voltage", "resistance", "ambient_light", "hour", "dayofweek"]
+    for col in required:
+        if col not in X.columns:
+            X[col] = 0
+    X[required] = X[required].fillna(0)
+    return X[required]
+
+
+def legacy_soil(X):
+    """SoilSensorPipeline._prepare_features before column projection"""
+    X = X.copy()
+    if "rolling_mean" not in X.columns or "rolling_std" not in X.columns:
+        X["rolling_mean"], X["rolling_std"] = rolling_mean_std(X["sensor_value"], window=3)
+    return X[["sensor_value", "rolling_mean", "rolling_std"]]
@@ -0,0 +1,60 @@
+import pytest
+
+import alias_utils
+from alias_utils import (EXPECTED_FEATURES, SYNONYMS, _build_expected_index, _resolve_columns,
+                         alias_cache_info, clear_alias_cache, map_columns_with_aliases)
+
+COLUMN_SETS = [
+    ["Timestamp (ms)", "Sensor Value"],
+    ["LDR", "Voltage", "resistnce", "Ambient Light"],
+    ["Wafer"] + [f"Sensor{i}" for i in range(1, 31)],
+    ["MQ2", "Temp", "Hum", "hour", "day of week", "unrelated"],
+]
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_alias_cache()
+    yield
+    clear_alias_cache()
+
+
+@pytest.mark.parametrize("columns", COLUMN_SETS)
+@pytest.mark.parametrize("sensor", list(EXPECTED_FEATURES))
+def test_cached_matches_uncached(columns, sensor):
+    expected = EXPECTED_FEATURES[sensor]
+    uncached = _resolve_columns(tuple(columns), tuple(expected), SYNONYMS, 0.78,
+                                list(SYNONYMS), _build_expected_index(expected))
+    assert map_columns_with_aliases(columns, expected) == uncached
+    assert map_columns_with_aliases(columns, expected) == uncached
+
+
+def test_repeated_columns_hit_the_cache():
+    columns, expected = COLUMN_SETS[0], EXPECTED_FEATURES["temperature"]
+    map_columns_with_aliases(columns, expected)
+    map_columns_with_aliases(columns, expected)
+    map_columns_with_aliases(columns, expected, fuzzy_cutoff=0.9)
+
+    info = alias_cache_info()
+    assert (info["hits"], info["misses"], info["size"]) == (1, 2, 2)
+    clear_alias_cache()
+    assert alias_cache_info()["size"] == 0
+
+
+def test_callers_get_fresh_copies():
+    columns, expected = COLUMN_SETS[0], EXPECTED_FEATURES["temperature"]
+    rename_map, notes = map_columns_with_aliases(columns, expected)
+    rename_map.clear()
+    notes.append("filled_missing:x=0")
+
+    again_map, again_notes = map_columns_with_aliases(columns, expected)
+    assert again_map == {"Timestamp (ms)": "timestamp(ms)", "Sensor Value": "sensor_value"}
+    assert "filled_missing:x=0" not in again_notes
+
+
+def test_custom_synonyms_bypass_the_cache():
+    synonyms = dict(SYNONYMS, reading="sensor_value")
+    rename_map, _ = map_columns_with_aliases(["reading"], EXPECTED_FEATURES["soil"], synonyms=synonyms)
+    assert rename_map == {"reading": "sensor_value"}
+    assert alias_cache_info()["misses"] == 0
+    assert alias_utils.ALIAS_CACHE_SIZE == alias_cache_info()["maxsize"]
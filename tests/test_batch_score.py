@@ -0,0 +1,111 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import batch_score
+from conftest import ROOT
+
+
+class StubRouter:
+    detection = "header"
+    engine = "native"
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.closed = 0
+        self.timings = {}
+
+    def iter_predict_csv(self, path, **kwargs):
+        if self.fail:
+            raise ValueError("bad chunk")
+        yield pd.DataFrame({"sensor_type": ["soil"], "prediction": [1]})
+
+    def close(self):
+        self.closed += 1
+
+
+def test_import_does_not_load_models():
+    code = ("import sys, batch_score; "
+            "print(any(m in sys.modules for m in ('all_in_one_router', 'xgboost', 'sklearn', 'pyarrow')))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+
+
+@pytest.mark.parametrize("fail", [False, True])
+def test_score_file_closes_router(monkeypatch, tmp_path, fail):
+    router = StubRouter(fail)
+    monkeypatch.setattr(batch_score, "_router", router)
+    output = str(tmp_path / "out.csv")
+
+    if fail:
+        with pytest.raises(ValueError):
+            batch_score.score_file("in.csv", output, chunk_workers=2)
+    else:
+        assert batch_score.score_file("in.csv", output, chunk_workers=2)["rows"] == 1
+    assert router.closed == 1
+
+
+def test_same_named_inputs_keep_their_directories(tmp_path):
+    inputs = [str(tmp_path / "a" / "x.csv"), str(tmp_path / "b" / "x.csv")]
+    outputs = batch_score.output_paths(inputs, "out", "csv")
+    assert outputs == [os.path.join("out", "a", "x_predictions.csv"),
+                       os.path.join("out", "b", "x_predictions.csv")]
+    assert batch_score.output_paths(inputs[:1], "out", "csv") == [os.path.join("out", "x_predictions.csv")]
+
+
+def test_duplicate_inputs_are_scored_once(tmp_path, monkeypatch):
+    (tmp_path / "x.csv").write_text("a\n1\n")
+    monkeypatch.chdir(tmp_path)
+    assert batch_score.expand_inputs(["x.csv", "./x.csv", "*.csv"]) == ["x.csv"]
+
+
+def test_summary_reports_failures(tmp_path, monkeypatch, capsys):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "b").mkdir()
+    for name in ("a/x.csv", "b/x.csv", "b/bad.csv"):
+        (tmp_path / name).write_text("a\n1\n")
+
+    def fake_score(input_path, output_path, **options):
+        if "bad" in input_path:
+            raise ValueError("broken file")
+        with open(output_path, "w") as f:
+            f.write(input_path)
+        return {"input": input_path, "output": output_path, "rows": 1, "seconds": 0.1, "timings": {}}
+
+    monkeypatch.setattr(batch_score, "score_file", fake_score)
+    out_dir = tmp_path / "out"
+    assert batch_score.main([str(tmp_path / "a"), str(tmp_path / "b"), "-o", str(out_dir)]) == 1
+
+    lines = capsys.readouterr().out.strip().splitlines()
+    assert lines[-1].startswith("[ERROR] Scored 2 rows from 2 files") and "1 of 3 files failed" in lines[-1]
+    assert (out_dir / "a" / "x_predictions.csv").read_text().endswith(os.path.join("a", "x.csv"))
+    assert (out_dir / "b" / "x_predictions.csv").read_text().endswith(os.path.join("b", "x.csv"))
+
+
+def test_parquet_conforms_later_chunks_to_the_first(tmp_path):
+    pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+
+    chunks = [
+        pd.DataFrame({"sensor_type": ["soil"] * 2, "prediction": [0, 1], "status": [np.nan, np.nan],
+                      "ts": [1, 2]}),
+        pd.DataFrame({"sensor_type": ["soil"] * 2, "prediction": [1, None], "status": ["ok", np.nan],
+                      "ts": [3.0, np.nan]}),
+    ]
+    path = str(tmp_path / "out.parquet")
+    assert batch_score._write_parquet(iter(chunks), path) == 4
+    table = pq.read_table(path)
+    assert table.column("status").to_pylist() == [None, None, "ok", None]
+    assert table.column("ts").to_pylist() == [1, 2, 3, None]
+    assert table.column("prediction").to_pylist() == [0, 1, 1, None]
+
+
+def test_parquet_rejects_values_that_do_not_fit(tmp_path):
+    pytest.importorskip("pyarrow")
+    chunks = [pd.DataFrame({"reading": [1.5, 2.5]}), pd.DataFrame({"reading": ["broken", "1"]})]
+    with pytest.raises(ValueError, match="reading"):
+        batch_score._write_parquet(iter(chunks), str(tmp_path / "out.parquet"))
@@ -0,0 +1,51 @@
+import json
+
+import pandas as pd
+import pytest
+
+from conftest import MODEL_DIR
+from scripts import benchmark
+from scripts.generate_test_csv import SENSORS, generate, make_mixed_frame, make_sensor_frame
+from sensor_schema import classify_columns, detect_sensor_rows
+
+
+@pytest.mark.parametrize("sensor", SENSORS)
+def test_generated_frames_are_deterministic(sensor):
+    a = make_sensor_frame(sensor, 100, seed=3)
+    pd.testing.assert_frame_equal(a, make_sensor_frame(sensor, 100, seed=3))
+    assert not a.equals(make_sensor_frame(sensor, 100, seed=4))
+    assert len(a) == 100 and classify_columns(tuple(a.columns)) == sensor
+
+
+def test_mixed_frame_holds_every_sensor():
+    df = make_mixed_frame(400)
+    pd.testing.assert_frame_equal(df, make_mixed_frame(400))
+    assert set(detect_sensor_rows(df)) == set(SENSORS)
+
+
+def test_generate_writes_csv(tmp_path):
+    out = tmp_path / "mixed.csv"
+    generate(rows=30, out=str(out))
+    assert len(pd.read_csv(out)) == 30
+
+
+@pytest.mark.parametrize("text, rows", [("1k", 1000), ("2.5k", 2500), ("10m", 10_000_000), ("300", 300)])
+def test_parse_size(text, rows):
+    assert benchmark.parse_size(text) == rows
+
+
+def test_benchmark_run_and_compare(registry, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    output = tmp_path / "run.json"
+    argv = ["--sizes", "200", "--sensors", "temperature,mixed", "--model-dir", MODEL_DIR, "--output", str(output)]
+    assert benchmark.main(argv) == 0
+
+    report = json.loads(output.read_text())
+    assert [(r["sensor"], r["rows"]) for r in report["results"]] == [("temperature", 200), ("mixed", 200)]
+    for result in report["results"]:
+        assert set(result["stages_s"]) == set(benchmark.STAGES)
+        assert result["end_to_end_s"] > 0
+    assert (tmp_path / "benchmark_data" / "temperature_200_0.csv").exists()
+
+    assert benchmark.main(argv[:-2] + ["--output", str(tmp_path / "again.json"), "--compare", str(output)]) == 0
+    assert "speedup" in capsys.readouterr().out
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from custom_transformers import FeatureEngineer, LDRFeatureEngineer, SoilSensorPipeline, project_columns
+from reference import legacy_gas, legacy_ldr, legacy_soil, widen
+from scripts.generate_test_csv import make_sensor_frame
+
+
+def frames(extra_cols):
+    gas = make_sensor_frame("gas", 3000, 0).drop(columns=["label"])
+    light = make_sensor_frame("light", 3000, 0).drop(columns=["status"])
+    soil = make_sensor_frame("soil", 3000, 0).drop(columns=["status"], errors="ignore")
+    return {
+        "gas": (widen(gas, extra_cols, 0), lambda X: FeatureEngineer().transform(X),
+                lambda X: legacy_gas(FeatureEngineer(), X)),
+        "light": (widen(light, extra_cols, 0), lambda X: LDRFeatureEngineer().transform(X),
+                  lambda X: legacy_ldr(LDRFeatureEngineer(), X)),
+        "soil": (widen(soil, extra_cols, 0), lambda X: SoilSensorPipeline()._prepare_features(X), legacy_soil),
+    }
+
+
+@pytest.mark.parametrize("extra_cols", [0, 25])
+@pytest.mark.parametrize("sensor", ["gas", "light", "soil"])
+def test_transformers_match_copying_versions(sensor, extra_cols):
+    X, projected, legacy = frames(extra_cols)[sensor]
+    pd.testing.assert_frame_equal(projected(X), legacy(X), check_dtype=False)
+
+
+def test_projection_fills_missing_and_keeps_index():
+    X = pd.DataFrame({"a": [1.0, np.nan], "unused": ["x", "y"]}, index=[10, 11])
+    out = project_columns(X, ["b", "a"], values={"b": np.array([3, 4])}, fillna=0)
+
+    assert list(out.columns) == ["b", "a"] and list(out.index) == [10, 11]
+    assert out.to_numpy().tolist() == [[3.0, 1.0], [4.0, 0.0]]
+    assert out["a"].dtype == np.float64
+
+
+def test_projection_keeps_float32_and_reads_nullable_columns():
+    X = pd.DataFrame({"a": np.array([1, 2], dtype=np.float32),
+                      "b": pd.array([1, None], dtype="Int64")})
+    assert project_columns(X, ["a"])["a"].dtype == np.float32
+
+    out = project_columns(X, ["a", "b"])
+    assert out["b"].dtype == np.float64 and np.isnan(out["b"].iloc[1])
+
+
+def test_projection_falls_back_for_text_columns():
+    X = pd.DataFrame({"a": [1.0, 2.0], "s": ["x", None]})
+    out = project_columns(X, ["a", "s"], fillna=0)
+    assert out["s"].tolist() == ["x", 0]
+    assert out["a"].tolist() == [1.0, 2.0]
@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from columnar_store import convert_csv, open_columnar
+from conftest import MODEL_DIR, require_model
+from scripts.generate_test_csv import make_sensor_frame
+
+
+def round_trip(tmp_path, df, chunksize):
+    path = tmp_path / "in.csv"
+    df.to_csv(path, index=False)
+    store = str(tmp_path / "in.cols")
+    assert convert_csv(path, store, chunksize=chunksize) == len(df)
+    return pd.read_csv(path), open_columnar(store), store
+
+
+def kinds(store):
+    columns = open_columnar(store)
+    return {name: columns._specs[name]["kind"] for name in columns.columns}
+
+
+def test_text_after_missing_first_chunks(tmp_path):
+    df = pd.DataFrame({"status": [None] * 600 + [f"s{i % 3}" for i in range(400)],
+                       "value": np.arange(1000) / 4})
+    expected, columns, store = round_trip(tmp_path, df, chunksize=250)
+
+    assert kinds(store) == {"status": "text", "value": "numeric"}
+    pd.testing.assert_frame_equal(columns.frame(0, len(columns)), expected, check_dtype=False)
+    assert columns.frame(600, 601)["status"].tolist() == ["s0"]
+    assert columns.frame(599, 600)["status"].isna().all()
+
+
+def test_high_cardinality_text_is_kept(tmp_path):
+    df = pd.DataFrame({"wafer": [f"Wafer-{i:06d}-é" for i in range(70000)]})
+    expected, columns, store = round_trip(tmp_path, df, chunksize=20000)
+
+    assert kinds(store) == {"wafer": "text"}
+    assert columns.frame(0, len(columns))["wafer"].tolist() == expected["wafer"].tolist()
+    assert columns.frame(69998, 70000)["wafer"].tolist() == ["Wafer-069998-é", "Wafer-069999-é"]
+
+
+def test_numeric_column_promoted_to_text(tmp_path):
+    values = [str(i) for i in range(700)] + ["broken", None] + ["2.5"] * 298
+    expected, columns, store = round_trip(tmp_path, pd.DataFrame({"reading": values}), chunksize=250)
+
+    assert kinds(store) == {"reading": "text"}
+    assert "c00000.npy" not in os.listdir(store)
+    got = columns.frame(0, len(columns))["reading"]
+    assert got[:700].tolist() == [str(i) for i in range(700)]
+    assert got[700] == "broken" and pd.isna(got[701]) and got[702] == "2.5"
+    # The router's to_numeric sees the same numbers as from the CSV
+    pd.testing.assert_series_equal(pd.to_numeric(got, errors="coerce"),
+                                   pd.to_numeric(expected["reading"], errors="coerce"), check_dtype=False)
+
+
+def test_all_missing_column_is_numeric(tmp_path):
+    df = pd.DataFrame({"empty": [None] * 10, "x": range(10)})
+    _, columns, store = round_trip(tmp_path, df, chunksize=4)
+
+    assert kinds(store) == {"empty": "numeric", "x": "numeric"}
+    assert columns.frame(0, 10)["empty"].isna().all()
+
+
+@pytest.mark.parametrize("sensor", ["temperature", "soil", "light"])
+def test_predict_columnar_matches_csv(registry, tmp_path, sensor):
+    from all_in_one_router import AllInOneRouter
+
+    require_model(registry, sensor)
+    path = tmp_path / f"{sensor}.csv"
+    make_sensor_frame(sensor, 3000, 0).to_csv(path, index=False)
+    store = str(tmp_path / "in.cols")
+    convert_csv(path, store, chunksize=700)
+
+    router = AllInOneRouter(model_dir=MODEL_DIR)
+    expected = pd.concat(router.iter_predict_csv(str(path), 700), ignore_index=True)
+    router.predict_columnar(store, str(tmp_path / "out.cols"), chunk_rows=700)
+    out = open_columnar(str(tmp_path / "out.cols")).frame(0, 3000)
+
+    assert out["sensor_type"].tolist() == expected["sensor_type"].tolist()
+    np.testing.assert_allclose(out["prediction"].to_numpy(dtype=np.float64),
+                               pd.to_numeric(expected["prediction"]).to_numpy(dtype=np.float64))
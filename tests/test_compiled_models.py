@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from xgboost import XGBClassifier
+
+from compiled_models import NotCompilable, compiled_path, export_compiled, load_compiled
+from conftest import ROOT
+from model_registry import MODEL_FILES, ModelRegistry
+
+
+def training_data(seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(200, 3)), columns=["a", "b", "c"])
+    return X, (X["a"] + X["b"] > 0).astype(int)
+
+
+def xgb_pipeline(seed=0):
+    X, y = training_data(seed)
+    return Pipeline([("scaler", StandardScaler()),
+                     ("model", XGBClassifier(n_estimators=5, max_depth=2, random_state=seed))]).fit(X, y)
+
+
+def write_model(model_dir, model):
+    path = os.path.join(model_dir, MODEL_FILES["light"])
+    joblib.dump(model, path)
+    return path
+
+
+def test_import_does_not_load_sklearn_or_xgboost():
+    code = "import sys, model_utils; print(any(m in sys.modules for m in ('xgboost', 'sklearn')))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+
+
+def test_round_trip_predicts_identically(tmp_path):
+    model = xgb_pipeline()
+    path = str(tmp_path / "m.compiled.npz")
+    export_compiled(model, path)
+
+    X, _ = training_data(1)
+    assert np.array_equal(load_compiled(path).predict(X), model.predict(X))
+
+
+def test_models_without_compact_form_are_not_exported(tmp_path):
+    X, y = training_data()
+    model = Pipeline([("scaler", StandardScaler()), ("model", RandomForestClassifier(n_estimators=3))]).fit(X, y)
+    path = str(tmp_path / "m.compiled.npz")
+
+    with pytest.raises(NotCompilable):
+        export_compiled(model, path)
+    assert not os.path.exists(path)
+
+
+def test_registry_uses_compiled_only_when_enabled_and_fingerprint_matches(tmp_path):
+    model_dir = str(tmp_path)
+    src = write_model(model_dir, xgb_pipeline())
+    compiled = compiled_path(src)
+    export_compiled(joblib.load(src), compiled, source=src)
+
+    assert ModelRegistry(model_dir, use_compiled=False).path_for("light") == src
+    registry = ModelRegistry(model_dir, use_compiled=True)
+    assert registry.path_for("light") == compiled
+
+    # Retrained .joblib: the old artifact no longer matches, even if it looks newer
+    write_model(model_dir, xgb_pipeline(seed=1))
+    os.utime(compiled)
+    assert registry.path_for("light") == src
+
+
+def test_registry_rejects_artifact_without_fingerprint(tmp_path):
+    model_dir = str(tmp_path)
+    src = write_model(model_dir, xgb_pipeline())
+    export_compiled(joblib.load(src), compiled_path(src))
+
+    assert ModelRegistry(model_dir, use_compiled=True).path_for("light") == src
@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+from compiled_models import compiled_source, source_fingerprint
+from conftest import MODEL_DIR
+from model_registry import ModelRegistry
+from scripts.convert_pkls_to_joblib import convert_one, fastest_verified
+
+
+def pkl(name):
+    path = os.path.join(MODEL_DIR, name)
+    if not os.path.exists(path):
+        pytest.skip(f"no {name} in {MODEL_DIR}")
+    return path
+
+
+def test_uncompilable_model_keeps_its_joblib_formats(registry, tmp_path):
+    entry = convert_one(pkl("temperature_pipeline.pkl"), ["none", "zlib", "compiled"], str(tmp_path),
+                        load_repeat=1, sample_rows=200)
+
+    artifacts = {a["format"]: a for a in entry["artifacts"]}
+    assert artifacts["none"]["verified"] is True and artifacts["zlib"]["verified"] is True
+    assert artifacts["compiled"]["path"] is None and artifacts["compiled"]["skipped"]
+    assert not list(tmp_path.glob("*.npz"))
+    assert fastest_verified(entry) in ("none", "zlib")
+
+
+def test_compiled_artifact_is_paired_with_its_joblib(registry, tmp_path):
+    src = pkl("ldr_pipeline.pkl")
+    convert_one(src, ["none"], str(tmp_path), load_repeat=1, sample_rows=200)
+    entry = convert_one(src, ["compiled"], str(tmp_path), load_repeat=1, sample_rows=200)
+
+    compiled = entry["artifacts"][0]
+    assert compiled["verified"] is True
+    joblib_path = tmp_path / "ldr_pipeline.joblib"
+    assert compiled_source(compiled["path"]) == source_fingerprint(joblib_path)
+    assert ModelRegistry(str(tmp_path), use_compiled=True).path_for("light") == compiled["path"]
+
+
+def test_compiled_without_joblib_records_the_pickle(registry, tmp_path):
+    src = pkl("ldr_pipeline.pkl")
+    entry = convert_one(src, ["compiled"], str(tmp_path), load_repeat=1, sample_rows=200)
+    assert compiled_source(entry["artifacts"][0]["path"]) == source_fingerprint(src)
@@ -0,0 +1,70 @@
+import gzip
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from activity_logger import read_logged_dataset
+from dataset_store import DatasetStore
+
+CSV = b"timestamp(ms),sensor_value\n1000,21.5\n2000,22.0\n"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return DatasetStore(root=str(tmp_path / "objects"))
+
+
+def stored_files(store):
+    return [f for _, dirs, files in os.walk(store.root) for f in files if f.endswith(".csv.gz")]
+
+
+def test_bytes_and_file_share_one_object(store, tmp_path):
+    path = tmp_path / "upload.csv"
+    path.write_bytes(CSV)
+
+    from_bytes = store.put(CSV)
+    from_file = store.put(str(path))
+    store.flush()
+
+    assert from_bytes == from_file == DatasetStore.hash_bytes(CSV)
+    assert stored_files(store) == [f"{from_bytes}.csv.gz"]
+    assert store.read_bytes(from_bytes) == CSV
+
+
+def test_file_may_be_removed_after_put(store, tmp_path):
+    path = tmp_path / "upload.csv"
+    path.write_bytes(CSV)
+    dataset_id = store.put(str(path))
+    os.remove(path)
+
+    assert store.read_bytes(dataset_id) == CSV
+    assert not os.listdir(os.path.join(store.root, "staging"))
+
+
+def test_frames_round_trip(store):
+    df = pd.DataFrame({"sensor_type": ["soil", "soil"], "prediction": [0, 1]})
+    dataset_id = store.put(df)
+
+    assert store.put(df.copy()) == dataset_id
+    assert store.put(df.astype({"prediction": float})) != dataset_id
+    pd.testing.assert_frame_equal(pd.read_csv(io.BytesIO(store.read_bytes(dataset_id))), df)
+    with gzip.open(store.path_for(dataset_id)) as f:
+        assert f.read().startswith(b"sensor_type,prediction")
+
+
+def test_unknown_id_is_none(store):
+    assert store.read_bytes("0" * 64) is None
+
+
+def test_logged_datasets_by_id_and_legacy_path(monkeypatch, store, tmp_path):
+    import activity_logger
+    monkeypatch.setattr(activity_logger, "get_dataset_store", lambda: store)
+    legacy = tmp_path / "old_output.csv"
+    legacy.write_bytes(b"prediction\n1\n")
+
+    entry = {"input_dataset_id": store.put(CSV), "output_path": str(legacy)}
+    assert read_logged_dataset(entry, "input") == CSV
+    assert read_logged_dataset(entry, "output") == b"prediction\n1\n"
+    assert read_logged_dataset({"output_path": str(tmp_path / "gone.csv")}, "output") is None
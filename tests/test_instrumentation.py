@@ -0,0 +1,96 @@
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import batch_score
+import instrumentation
+from all_in_one_router import AllInOneRouter
+from conftest import MODEL_DIR, require_model
+from scripts.generate_test_csv import make_sensor_frame
+
+
+@pytest.fixture
+def recording():
+    was_enabled = instrumentation.is_enabled()
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.enable(was_enabled)
+    instrumentation.reset()
+
+
+@instrumentation.timed("test.square")
+def square(values):
+    return values ** 2
+
+
+@instrumentation.timed("test.fail", rows=False)
+def fail(values):
+    raise ValueError("boom")
+
+
+def test_disabled_records_nothing(recording):
+    instrumentation.enable(False)
+    square(np.arange(10))
+    assert instrumentation.snapshot() == {}
+
+
+def test_calls_rows_and_errors(recording):
+    square(np.arange(10))
+    square(pd.DataFrame({"a": range(5)}))
+    with pytest.raises(ValueError):
+        fail(np.arange(3))
+
+    snap = instrumentation.snapshot()
+    assert {k: snap["test.square"][k] for k in ("calls", "errors", "rows")} == {"calls": 2, "errors": 0, "rows": 15}
+    assert {k: snap["test.fail"][k] for k in ("calls", "errors", "rows")} == {"calls": 1, "errors": 1, "rows": 0}
+    assert snap["test.fail"]["rows_per_s"] is None
+
+
+def test_prometheus_and_json_export(recording, tmp_path):
+    square(np.arange(4))
+    text = instrumentation.prometheus_text()
+    assert "# TYPE sensor_fn_calls_total counter" in text
+    assert 'sensor_fn_rows_total{fn="test.square"} 4' in text
+
+    path = tmp_path / "stats.json"
+    instrumentation.write_json(str(path))
+    data = json.loads(path.read_text())
+    assert data["enabled"] is True and data["functions"]["test.square"]["calls"] == 1
+
+
+def test_router_hot_path_is_recorded(recording, registry):
+    require_model(registry, "temperature")
+    AllInOneRouter(registry=registry).route_and_predict(make_sensor_frame("temperature", 50))
+    snap = instrumentation.snapshot()
+    assert snap["router.route_and_predict"]["rows"] == 50
+    assert "alias.map_columns_with_aliases" in snap
+
+
+def test_sampling_profiler_writes_collapsed_stacks(tmp_path):
+    path = tmp_path / "stacks.txt"
+    with instrumentation.SamplingProfiler(str(path), interval=0.001):
+        deadline = time.time() + 0.2
+        while time.time() < deadline:
+            sum(range(1000))
+    lines = path.read_text().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("test_instrumentation.py:" in line for line in lines)
+
+
+def test_batch_score_stats_json(registry, tmp_path):
+    require_model(registry, "temperature")
+    src = tmp_path / "t.csv"
+    make_sensor_frame("temperature", 40).to_csv(src, index=False)
+    stats = tmp_path / "stats.json"
+    argv = [str(src), "-o", str(tmp_path / "out"), "--model-dir", MODEL_DIR, "--stats-json", str(stats)]
+    try:
+        assert batch_score.main(argv) == 0
+    finally:
+        instrumentation.enable(False)
+        instrumentation.reset()
+    functions = json.loads(stats.read_text())["functions"]
+    assert functions["router.route_and_predict"]["rows"] == 40
@@ -0,0 +1,54 @@
+import json
+import os
+
+import pytest
+
+from log_store import JsonLinesLogStore, SQLiteLogStore, migrate_json_log
+
+
+def entries(n):
+    return [{"username": f"user{i % 2}", "date": f"2024-01-{i + 1:02d}", "action": "predict"}
+            for i in range(n)]
+
+
+@pytest.fixture(params=["jsonl", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "jsonl":
+        return JsonLinesLogStore(str(tmp_path / "activity.jsonl"))
+    return SQLiteLogStore(str(tmp_path / "activity.db"))
+
+
+def write_legacy(tmp_path, logs):
+    path = str(tmp_path / "activity_logs.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(list(reversed(logs)), f)  # legacy file is newest first
+    return path
+
+
+def test_migrates_into_empty_store(store, tmp_path):
+    logs = entries(5)
+    path = write_legacy(tmp_path, logs)
+
+    assert migrate_json_log(store, path) == 5
+    assert store.all() == list(reversed(logs))
+    assert not os.path.exists(path) and os.path.exists(path + ".migrated")
+
+
+def test_merges_into_non_empty_store_without_duplicates(store, tmp_path):
+    logs = entries(6)
+    # An interrupted import left the first three behind
+    store.extend(logs[:3])
+    path = write_legacy(tmp_path, logs)
+
+    assert migrate_json_log(store, path) == 3
+    assert sorted(map(json.dumps, store.all())) == sorted(map(json.dumps, logs))
+
+
+def test_unreadable_legacy_file_is_kept(store, tmp_path):
+    path = str(tmp_path / "activity_logs.json")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[{not json")
+
+    assert migrate_json_log(store, path) == 0
+    assert os.path.exists(path)
+    assert store.is_empty()
@@ -0,0 +1,68 @@
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+from model_registry import MODEL_FILES, ModelRegistry, get_registry
+
+
+def write_model(model_dir, sensor, value, mtime=None):
+    path = os.path.join(model_dir, MODEL_FILES[sensor])
+    joblib.dump({"weights": np.full(4, value)}, path)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_models_load_on_first_request(tmp_path):
+    write_model(tmp_path, "soil", 1.0)
+    write_model(tmp_path, "temperature", 2.0)
+    registry = ModelRegistry(str(tmp_path))
+    assert registry.stats() == {}
+
+    model = registry.get("soil")
+    assert model["weights"][0] == 1.0
+    assert registry.get("soil") is model
+    stats = registry.stats()
+    assert list(stats) == ["soil"]
+    assert (stats["soil"]["loads"], stats["soil"]["warm_hits"]) == (1, 1)
+
+
+def test_replaced_model_is_reloaded(tmp_path):
+    path = write_model(tmp_path, "soil", 1.0, mtime=1_000_000)
+    registry = ModelRegistry(str(tmp_path))
+    old = registry.get("soil")
+
+    write_model(tmp_path, "soil", 5.0, mtime=2_000_000)
+    new = registry.get("soil")
+    assert new is not old and new["weights"][0] == 5.0
+    assert registry.stats()["soil"]["loads"] == 2
+
+    os.remove(path)
+    assert registry.get("soil") is None
+
+
+def test_weights_are_memory_mapped(tmp_path):
+    write_model(tmp_path, "soil", 1.0)
+    weights = ModelRegistry(str(tmp_path), mmap_mode="r").get("soil")["weights"]
+    assert isinstance(weights, np.memmap)
+    assert not isinstance(ModelRegistry(str(tmp_path), mmap_mode=None).get("soil")["weights"], np.memmap)
+
+
+@pytest.mark.parametrize("sensor", ["gas", "unknown"])
+def test_missing_models_are_none(tmp_path, sensor):
+    assert ModelRegistry(str(tmp_path)).get(sensor) is None
+
+
+def test_broken_model_is_none(tmp_path):
+    with open(os.path.join(tmp_path, MODEL_FILES["soil"]), "wb") as f:
+        f.write(b"not a pickle")
+    registry = ModelRegistry(str(tmp_path))
+    assert registry.get("soil") is None
+    assert registry.stats()["soil"]["loaded"] is False
+
+
+def test_registry_is_shared_per_directory(tmp_path):
+    assert get_registry(str(tmp_path)) is get_registry(str(tmp_path / ".." / tmp_path.name))
+    assert get_registry(str(tmp_path)) is not get_registry(str(tmp_path / "other"))
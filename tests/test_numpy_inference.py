@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from xgboost import XGBClassifier
+
+from all_in_one_router import AllInOneRouter
+from conftest import MODEL_DIR, require_model
+from custom_transformers import SoilRollingFeatures, SoilSensorPipeline
+from numpy_inference import compile_model
+from scripts.generate_test_csv import make_sensor_frame
+
+
+def predict_small(engine, X):
+    """engine.predict in batches small enough to take the NumPy path"""
+    step = engine.estimator.max_rows
+    return np.concatenate([engine.predict(X.iloc[lo:lo + step]) for lo in range(0, len(X), step)])
+
+
+def threshold_inputs(engine, rows, seed=0):
+    """Rows whose features sit exactly on (or one ulp around) split thresholds, with some NaN"""
+    rng = np.random.default_rng(seed)
+    trees = engine.estimator.trees
+    thresholds = trees.threshold[trees.left != np.arange(len(trees.left))]
+    X = rng.choice(thresholds, size=(rows, engine.estimator.n_features)).astype(trees.threshold.dtype)
+    nudge = rng.integers(-1, 2, size=X.shape)
+    X = np.where(nudge < 0, np.nextafter(X, -np.inf), np.where(nudge > 0, np.nextafter(X, np.inf), X))
+    X[rng.random(X.shape) < 0.05] = np.nan
+    return X
+
+
+def assert_same(expected, actual):
+    expected, actual = np.asarray(expected), np.asarray(actual)
+    assert expected.dtype == actual.dtype
+    np.testing.assert_array_equal(actual, expected)
+
+
+def fitted(estimator, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(2000, 4)), columns=list("abcd"))
+    X.iloc[rng.random(X.shape) < 0.02] = np.nan
+    y = ((X["a"].fillna(0) + X["b"].fillna(0) * X["c"].fillna(0)) > 0).astype(int)
+    if isinstance(estimator, RandomForestClassifier):
+        X = X.fillna(0)
+    return Pipeline([("scaler", StandardScaler()), ("model", estimator)]).fit(X, y), X
+
+
+@pytest.mark.parametrize("estimator", [
+    XGBClassifier(n_estimators=30, max_depth=4, random_state=0),
+    RandomForestClassifier(n_estimators=20, max_depth=6, random_state=0),
+], ids=["xgboost", "random_forest"])
+def test_fitted_pipeline_parity(estimator):
+    model, X = fitted(estimator)
+    engine = compile_model(model)
+    assert engine is not None
+
+    assert_same(model.predict(X), predict_small(engine, X))
+    assert_same(model.predict(X.astype(np.float32)), predict_small(engine, X.astype(np.float32)))
+    thresholds = threshold_inputs(engine, 5000)
+    assert_same(model.steps[-1][1].predict(thresholds), engine.estimator.predict(thresholds))
+
+
+@pytest.mark.parametrize("sensor", ["soil", "temperature", "light"])
+def test_shipped_model_parity(registry, sensor):
+    model = require_model(registry, sensor)
+    engine = compile_model(model)
+    assert engine is not None
+
+    router = AllInOneRouter(model_dir=MODEL_DIR, registry=registry)
+    prepared, _ = router._apply_aliases(make_sensor_frame(sensor, 5000), sensor, SoilRollingFeatures())
+    assert_same(model.predict(prepared), predict_small(engine, prepared))
+    as32 = prepared.astype(np.float32)
+    assert_same(model.predict(as32), predict_small(engine, as32))
+
+    est = model.model if isinstance(model, SoilSensorPipeline) else model.steps[-1][1] \
+        if hasattr(model, "steps") else model
+    thresholds = threshold_inputs(engine, 5000)
+    assert_same(est.predict(thresholds), engine.estimator.predict(thresholds))
+
+
+def test_unsupported_pipeline_is_not_compiled(registry):
+    assert compile_model(require_model(registry, "wafer")) is None
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from all_in_one_router import AllInOneRouter
+from conftest import MODEL_DIR
+from scripts.generate_test_csv import make_mixed_frame, make_sensor_frame
+
+
+@pytest.fixture(scope="module")
+def rows_router(registry):
+    router = AllInOneRouter(model_dir=MODEL_DIR, registry=registry, detection="rows")
+    yield router
+    router.close()
+
+
+def assert_same(parallel, serial):
+    assert parallel["sensor_type"].tolist() == serial["sensor_type"].tolist()
+    assert parallel["note"].tolist() == serial["note"].tolist()
+    np.testing.assert_array_equal(pd.to_numeric(parallel["prediction"]).to_numpy(dtype=np.float64),
+                                  pd.to_numeric(serial["prediction"]).to_numpy(dtype=np.float64))
+
+
+@pytest.mark.parametrize("chunk_rows", [37, 1000])
+def test_parallel_matches_serial_on_mixed_file(rows_router, chunk_rows):
+    df = make_mixed_frame(800)
+    serial = rows_router.route_and_predict(df)
+    parallel = rows_router.route_and_predict(df, workers=2, chunk_rows=chunk_rows)
+
+    assert len(set(serial["sensor_type"])) >= 4
+    assert_same(parallel, serial)
+    assert parallel.drop(columns=["sensor_type", "prediction", "note"]).equals(df)
+
+
+def test_soil_windows_cross_parallel_chunks(rows_router):
+    df = make_sensor_frame("soil", 300)
+    serial = rows_router.route_and_predict(df)
+    assert_same(rows_router.route_and_predict(df, workers=2, chunk_rows=7), serial)
+
+
+def test_pool_is_reused_and_closed(registry):
+    router = AllInOneRouter(model_dir=MODEL_DIR, registry=registry)
+    df = make_sensor_frame("temperature", 50)
+    router.route_and_predict(df, workers=2, chunk_rows=10)
+    pool = router._pool
+    router.route_and_predict(df, workers=2, chunk_rows=10)
+    assert router._pool is pool
+    router.close()
+    assert router._pool is None
@@ -0,0 +1,89 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from result_cache import ResultCache
+
+FRAME = pd.DataFrame({"sensor_type": ["soil"] * 3, "prediction": [0, 1, 0]})
+
+
+@pytest.fixture
+def model_dir(tmp_path):
+    path = tmp_path / "models"
+    path.mkdir()
+    (path / "soil_moisture_pipeline.joblib").write_bytes(b"v1")
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path, model_dir):
+    return ResultCache(root=str(tmp_path / "cache"), model_dir=str(model_dir))
+
+
+def test_frame_hit_and_miss(cache):
+    key = cache.key_for(b"a,b\n1,2\n", "soil|frame")
+    assert cache.get_frame(key, input_size=8) is None
+
+    cache.put_frame(key, FRAME)
+    pd.testing.assert_frame_equal(cache.get_frame(key, input_size=8), FRAME)
+    assert cache.key_for(b"a,b\n1,2\n", "soil|stream") != key
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["bytes_saved"], stats["entries"]) == (1, 1, 8, 1)
+
+
+def test_file_hit_copies_to_destination(cache, tmp_path):
+    src = tmp_path / "pred.csv"
+    FRAME.to_csv(src, index=False)
+    key = cache.key_for(str(src), "soil|stream")
+    dest = str(tmp_path / "out.csv")
+
+    assert cache.get_file(key, dest) is None and not os.path.exists(dest)
+    cache.put_file(key, str(src))
+    assert cache.get_file(key, dest) == dest
+    assert open(dest, "rb").read() == src.read_bytes()
+
+
+def test_entry_removed_before_read_is_a_miss(cache, tmp_path):
+    key = cache.key_for(b"x", "soil")
+    cache.put_frame(key, FRAME)
+    cache.put_file(key, __file__)
+    for path in cache._entry_paths():
+        os.remove(path)
+
+    assert cache.get_frame(key) is None
+    assert cache.get_file(key, str(tmp_path / "out.csv")) is None
+    assert cache.stats()["misses"] == 2
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    keys = [cache.key_for(bytes([i]), "soil") for i in range(3)]
+    cache.put_frame(keys[0], FRAME)
+    entry_size = os.path.getsize(cache._path(keys[0], ".pkl"))
+    cache.max_bytes = 2 * entry_size
+
+    cache.put_frame(keys[1], FRAME)
+    old = time.time() - 60
+    os.utime(cache._path(keys[1], ".pkl"), (old, old))
+    os.utime(cache._path(keys[0], ".pkl"), (old - 60, old - 60))
+    assert cache.get_frame(keys[0]) is not None  # touch: keys[1] is now the oldest
+    cache.put_frame(keys[2], FRAME)
+
+    assert cache.get_frame(keys[1]) is None
+    assert cache.get_frame(keys[0]) is not None and cache.get_frame(keys[2]) is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_model_change_clears_the_cache(cache, model_dir):
+    key = cache.key_for(b"x", "soil")
+    cache.put_frame(key, FRAME)
+    assert cache.key_for(b"x", "soil") == key
+
+    model = model_dir / "soil_moisture_pipeline.joblib"
+    model.write_bytes(b"version 2")
+    new_key = cache.key_for(b"x", "soil")
+
+    assert new_key != key
+    assert cache.get_frame(key) is None and cache.stats()["entries"] == 0
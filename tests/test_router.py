@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from all_in_one_router import AllInOneRouter
+from conftest import require_model
+from scripts.generate_test_csv import make_sensor_frame
+
+
+class NegativeRejectingModel:
+    """Fails any batch that contains a negative reading"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, X):
+        self.calls += 1
+        values = X["sensor_value"].to_numpy()
+        if (values < 0).any():
+            raise ValueError("negative temperature")
+        return (values > 20).astype(int)
+
+
+class StubRegistry:
+    def __init__(self, models):
+        self.models = models
+
+    def get(self, sensor):
+        return self.models.get(sensor)
+
+
+def temperature_frame(n):
+    return pd.DataFrame({
+        "timestamp(ms)": np.arange(n) * 1000,
+        "sensor_value": np.linspace(10, 30, n),
+    })
+
+
+def router_with(model):
+    return AllInOneRouter(registry=StubRegistry({"temperature": model}))
+
+
+def test_bad_rows_are_isolated_without_row_by_row_fallback():
+    model = NegativeRejectingModel()
+    df = temperature_frame(1024)
+    df.loc[[7, 700], "sensor_value"] = -5.0
+
+    preds, notes = router_with(model)._predict_block(df, "temperature")
+
+    assert preds[7] is None and preds[700] is None
+    assert "predict_error:ValueError:negative temperature" in notes[7]
+    assert sum(p is None for p in preds) == 2
+    assert all(n.endswith("predict_ok") for i, n in enumerate(notes) if i not in (7, 700))
+    # Bisecting costs about 2 * log2(n) calls per bad row, not one per row
+    assert model.calls < 50
+
+
+def test_clean_block_is_one_call():
+    model = NegativeRejectingModel()
+    df = temperature_frame(500)
+
+    preds, notes = router_with(model)._predict_block(df, "temperature")
+
+    assert model.calls == 1
+    assert list(preds) == list((df["sensor_value"] > 20).astype(int))
+    assert len(set(notes)) == 1
+
+
+def test_row_by_row_path_detects_with_signature():
+    df = temperature_frame(3)
+    out = router_with(NegativeRejectingModel()).route_and_predict(df, row_by_row=True)
+    assert list(out["sensor_type"]) == ["temperature"] * 3
+
+
+# ==========================================================
+# REAL MODELS
+# ==========================================================
+@pytest.mark.parametrize("sensor", ["temperature", "soil", "wafer", "light"])
+def test_empty_input_with_real_models(registry, sensor):
+    require_model(registry, sensor)
+    router = AllInOneRouter(registry=registry)
+    empty = make_sensor_frame(sensor, 0)
+
+    batch = router.route_and_predict(empty)
+    rows = router.route_and_predict(empty, row_by_row=True)
+    assert len(batch) == len(rows) == 0
+    assert {"sensor_type", "prediction", "note"} <= set(batch.columns)
+
+    single = router.predict_single_sensor(empty, sensor)
+    assert len(single) == 0 and "prediction" in single.columns
+
+
+@pytest.mark.parametrize("sensor", ["temperature", "wafer", "light"])
+def test_batch_matches_row_by_row_with_real_models(registry, sensor):
+    require_model(registry, sensor)
+    router = AllInOneRouter(registry=registry)
+    df = make_sensor_frame(sensor, 40)
+
+    batch = router.route_and_predict(df)
+    rows = router.route_and_predict(df, row_by_row=True)
+    assert batch["sensor_type"].tolist() == rows["sensor_type"].tolist() == [sensor] * 40
+    assert batch["prediction"].tolist() == rows["prediction"].tolist()
+
+
+def test_soil_batch_matches_single_sensor(registry):
+    # A one-row frame has no rolling window, so soil is compared with the
+    # single-sensor path, which carries the window the same way
+    require_model(registry, "soil")
+    router = AllInOneRouter(registry=registry)
+    df = make_sensor_frame("soil", 40)
+
+    batch = router.route_and_predict(df)
+    single = router.predict_single_sensor(df, "soil")
+    assert batch["prediction"].tolist() == single["prediction"].tolist()
+
+
+# ==========================================================
+# SINGLE SENSOR
+# ==========================================================
+@pytest.mark.parametrize("sensor, renames", [
+    ("temperature", {"timestamp(ms)": "Timestamp (ms)", "sensor_value": "Sensor Value"}),
+    ("light", {"ldr_value": "LDR", "ambient_light": "Ambient Light"}),
+])
+def test_single_sensor_matches_per_row_mapping(registry, sensor, renames):
+    require_model(registry, sensor)
+    router = AllInOneRouter(registry=registry)
+    df = make_sensor_frame(sensor, 30).rename(columns=renames)
+    column = list(renames.values())[-1]
+    df[column] = df[column].astype(object)
+    df.loc[3, column] = "n/a"
+
+    out = router.predict_single_sensor(df, sensor, label="Custom")
+    per_row = [router._predict_row(df.iloc[[i]], sensor)[0] for i in range(len(df))]
+
+    assert out["prediction"].tolist() == per_row
+    assert set(out["sensor_type"]) == {"Custom"} and set(out["note"]) == {"single_model:Custom"}
+    assert out.drop(columns=["sensor_type", "prediction", "note"]).equals(df)
+
+
+def test_single_sensor_without_model_raises():
+    with pytest.raises(ValueError, match="Model not found"):
+        AllInOneRouter(registry=StubRegistry({})).predict_single_sensor(temperature_frame(3), "temperature")
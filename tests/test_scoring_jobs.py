@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import scoring_jobs
+from scoring_jobs import JobExecutor, ScoringJob, score_upload
+
+
+def write_file(job):
+    path = job.temp_file("_output.csv")
+    with open(path, "w") as f:
+        f.write("prediction\n1\n")
+    return {"path": path}
+
+
+def wait_done(job):
+    job._future.result(timeout=10)
+    return job
+
+
+@pytest.fixture
+def executor():
+    executor = JobExecutor(max_workers=1, retention_seconds=60, sweep_seconds=None)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.mark.parametrize("lookup", ["get", "jobs_for"])
+def test_expired_jobs_pruned_on_lookup(executor, lookup):
+    job = wait_done(executor.submit("ada", write_file))
+    path = job.result["path"]
+    assert executor.get(job.id) is job and os.path.exists(path)
+
+    executor.retention_seconds = 0
+    time.sleep(0.01)
+    if lookup == "get":
+        assert executor.get(job.id) is None
+    else:
+        assert executor.jobs_for("ada") == []
+    assert not os.path.exists(path)
+
+
+def test_sweep_prunes_without_lookups():
+    executor = JobExecutor(max_workers=1, retention_seconds=0, sweep_seconds=0.05)
+    try:
+        job = wait_done(executor.submit("ada", write_file))
+        deadline = time.time() + 5
+        while os.path.exists(job.result["path"]) and time.time() < deadline:
+            time.sleep(0.05)
+        assert not os.path.exists(job.result["path"])
+        assert job.id not in executor._jobs
+    finally:
+        executor.shutdown()
+
+
+def test_active_jobs_are_kept(executor):
+    release = threading.Event()
+    job = executor.submit("ada", lambda job: release.wait(10))
+    executor.retention_seconds = 0
+    assert executor.get(job.id) is job
+    release.set()
+    wait_done(job)
+
+
+# ==========================================================
+# RESULT SIZE
+# ==========================================================
+class MissCache:
+    def key_for(self, data, salt):
+        return "key"
+
+    def get_frame(self, key, input_size=None):
+        return None
+
+    def put_frame(self, key, df):
+        pass
+
+
+class EchoRouter:
+    def __init__(self, model_dir=None):
+        pass
+
+    def route_and_predict(self, df, soil_rolling=None):
+        return df.assign(sensor_type="temperature", prediction=0)
+
+
+@pytest.mark.parametrize("max_bytes, spilled", [(1e9, False), (0, True)])
+def test_large_frame_results_are_spilled(monkeypatch, executor, max_bytes, spilled):
+    monkeypatch.setattr(scoring_jobs, "get_result_cache", MissCache)
+    monkeypatch.setattr(scoring_jobs, "AllInOneRouter", EchoRouter)
+    df = pd.DataFrame({"sensor_value": range(100)})
+
+    job = wait_done(executor.submit("ada", score_upload, b"", "temperature", df=df,
+                                    chunk_rows=30, max_result_bytes=max_bytes))
+    result = job.result
+    assert (result["rows"], result["chunks"]) == (100, 4)
+    if spilled:
+        assert len(result["pred_df"]) == scoring_jobs.PREVIEW_ROWS
+        assert result["output_path"] in job.files
+        saved = pd.read_csv(result["output_path"])
+        assert saved["sensor_value"].tolist() == list(range(100))
+        assert saved.columns[:2].tolist() == ["sensor_type", "prediction"]
+    else:
+        assert len(result["pred_df"]) == 100
+        assert result["output_path"] is None
+
+
+def test_job_between_status_and_finish_time_is_kept(executor):
+    # The window where the worker has set a final status but not yet the
+    # finish time; pruning must neither raise nor drop the job
+    job = ScoringJob("ada", "racing")
+    job.status = "done"
+    executor._jobs[job.id] = job
+    executor.retention_seconds = 0
+
+    assert executor.get(job.id) is job
+    assert executor.jobs_for("ada") == [job]
+    job.finished = time.time() - 1
+    assert executor.get(job.id) is None
+
+
+class RecordingJob(ScoringJob):
+    """Records finished at every status change"""
+
+    def __setattr__(self, name, value):
+        if name == "status":
+            self.__dict__.setdefault("history", []).append((value, getattr(self, "finished", None)))
+        super().__setattr__(name, value)
+
+
+@pytest.mark.parametrize("fn", [lambda job: 1, lambda job: 1 / 0])
+def test_finish_time_is_set_before_final_status(monkeypatch, executor, fn):
+    monkeypatch.setattr(scoring_jobs, "ScoringJob", RecordingJob)
+    job = wait_done(executor.submit("ada", fn))
+
+    final = [(status, finished) for status, finished in job.history if status not in ("queued", "running")]
+    assert len(final) == 1 and final[0][1] is not None
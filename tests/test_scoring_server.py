@@ -0,0 +1,83 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from all_in_one_router import AllInOneRouter
+from conftest import require_model
+from scoring_server import MicroBatcher, make_handler
+from scripts.generate_test_csv import make_sensor_frame
+
+
+@pytest.fixture
+def serve(registry):
+    servers = []
+
+    def start(window_ms=5.0, max_batch=4096):
+        batcher = MicroBatcher(AllInOneRouter(registry=registry), window_ms=window_ms, max_batch=max_batch)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(batcher))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}", batcher
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def call(url, payload=None, raw=None):
+    data = raw if raw is not None else (None if payload is None else json.dumps(payload).encode())
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=30) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def readings(sensor, n):
+    return json.loads(make_sensor_frame(sensor, n).to_json(orient="records"))
+
+
+@pytest.mark.parametrize("sensor", ["temperature", "light", "wafer"])
+def test_predictions_match_the_router(registry, serve, sensor):
+    require_model(registry, sensor)
+    url, _ = serve()
+    batch = readings(sensor, 20)
+    expected = AllInOneRouter(registry=registry).route_and_predict(make_sensor_frame(sensor, 20))
+
+    status, results = call(url + "/predict", {"readings": batch})
+    assert status == 200
+    assert [r["sensor_type"] for r in results] == [sensor] * 20
+    assert [r["prediction"] for r in results] == expected["prediction"].tolist()
+
+    status, single = call(url + "/predict", batch[3])
+    assert status == 200 and single["prediction"] == results[3]["prediction"]
+
+
+def test_concurrent_requests_share_a_batch(registry, serve):
+    require_model(registry, "temperature")
+    url, batcher = serve(window_ms=300)
+    batch = readings("temperature", 8)
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda r: call(url + "/predict", r), batch))
+
+    assert all(status == 200 for status, _ in results)
+    metrics = call(url + "/metrics")[1]
+    assert metrics["requests"] == 8 and metrics["readings"] == 8
+    assert metrics["batches"] < 8
+    assert sum(metrics["predict_size_histogram"]["temperature"].values()) == metrics["batches"]
+
+
+def test_bad_requests(serve):
+    url, _ = serve()
+    assert call(url + "/predict", raw=b"{not json")[0] == 400
+    assert call(url + "/predict", [1, 2])[0] == 400
+    assert call(url + "/nowhere")[0] == 404
+    assert call(url + "/predict", []) == (200, [])
+    assert call(url + "/health") == (200, {"status": "ok"})
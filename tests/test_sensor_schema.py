@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from alias_utils import normalize_col
+from all_in_one_router import AllInOneRouter
+from sensor_schema import classify_columns, detect_sensor_rows, row_signatures
+from scripts.generate_test_csv import SENSORS, make_mixed_frame, make_sensor_frame
+
+
+def legacy_detect(columns):
+    """The router's original per-row detection"""
+    raw_cols = [str(c).strip().lower() for c in columns]
+    norm_cols = [normalize_col(c) for c in columns]
+    has_sensor_value = "sensorvalue" in norm_cols
+    if "timestamp_ms" in raw_cols and has_sensor_value:
+        return "soil"
+    if "timestamp(ms)" in columns and has_sensor_value:
+        return "temperature"
+    if "timestampms" in norm_cols and "timestamp_ms" not in raw_cols and has_sensor_value:
+        return "temperature"
+    if "mq2value" in norm_cols or ("temperature" in raw_cols and "humidity" in raw_cols):
+        return "gas"
+    if "ldrvalue" in norm_cols or "ambientlight" in norm_cols:
+        return "light"
+    if "waferid" in norm_cols:
+        return "wafer"
+    if any(n.startswith("sensor") for n in norm_cols) and not has_sensor_value:
+        return "wafer"
+    return "unknown"
+
+
+HEADERS = [list(make_sensor_frame(sensor, 1).columns) for sensor in SENSORS] + [
+    ["Timestamp_MS", "Sensor Value"],
+    ["Timestamp (ms)", "sensor_value"],
+    ["timestampms", "sensorvalue"],
+    ["MQ2", "hour"],
+    ["Temperature", "Humidity"],
+    ["LDR Value"],
+    ["Ambient Light", "voltage"],
+    ["Wafer ID", "Sensor1"],
+    ["Sensor-1", "Sensor-2"],
+    ["sensor_value"],
+    ["a", "b"],
+    [],
+]
+
+
+@pytest.mark.parametrize("columns", HEADERS)
+def test_classifier_matches_legacy_detection(columns):
+    assert classify_columns(tuple(columns)) == legacy_detect(columns)
+
+
+def test_rows_detection_matches_per_row_detection():
+    df = make_mixed_frame(500)
+    df.loc[5] = np.nan
+    expected = [legacy_detect(list(row.dropna().index)) for _, row in df.iterrows()]
+
+    assert detect_sensor_rows(df).tolist() == expected
+    assert len(set(expected)) == len(SENSORS) + 1  # every sensor plus the empty row
+    assert sorted(np.concatenate([p for _, p in row_signatures(df)]).tolist()) == list(range(len(df)))
+    assert row_signatures(df.iloc[:0]) == []
+
+
+def test_header_and_rows_detection_agree(registry):
+    header = AllInOneRouter(registry=registry)
+    rows = AllInOneRouter(registry=registry, detection="rows")
+
+    for sensor in SENSORS:
+        df = make_sensor_frame(sensor, 60)
+        a, b = header.route_and_predict(df), rows.route_and_predict(df)
+        assert a["sensor_type"].tolist() == b["sensor_type"].tolist() == [sensor] * 60
+        assert a["prediction"].tolist() == b["prediction"].tolist()
+
+    # Each sensor's rows of a mixed file score as they would in their own file
+    mixed = make_mixed_frame(600)
+    scored = rows.route_and_predict(mixed)
+    for sensor in SENSORS:
+        own = mixed[scored["sensor_type"] == sensor].dropna(axis=1, how="all")
+        alone = header.route_and_predict(own.reset_index(drop=True))
+        np.testing.assert_array_equal(pd.to_numeric(alone["prediction"]).to_numpy(dtype=np.float64),
+                                      pd.to_numeric(scored.loc[own.index, "prediction"]).to_numpy(dtype=np.float64))
@@ -0,0 +1,69 @@
+import math
+from fractions import Fraction
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from custom_transformers import SoilRollingFeatures, rolling_mean_std
+from conftest import require_model
+from scripts.generate_test_csv import make_sensor_frame
+
+
+def pandas_rolling(values, window=3):
+    rolling = pd.Series(values).rolling(window, min_periods=1)
+    return rolling.mean().to_numpy(), rolling.std().fillna(0).to_numpy()
+
+
+def soil_values(rows):
+    return make_sensor_frame("soil", rows)["sensor_value"].to_numpy(dtype=np.float64)
+
+
+def test_agrees_with_pandas_within_stated_tolerance():
+    values = soil_values(200000)
+    mean, std = rolling_mean_std(values)
+    pd_mean, pd_std = pandas_rolling(values)
+
+    atol = 1e-10 * np.abs(values).max()
+    np.testing.assert_allclose(mean, pd_mean, rtol=0, atol=atol)
+    np.testing.assert_allclose(std, pd_std, rtol=0, atol=atol)
+
+
+def test_windows_are_exact_to_rounding():
+    values = soil_values(2000)
+    mean, std = rolling_mean_std(values)
+    for i in range(2, len(values), 97):
+        window = [Fraction(v) for v in values[i - 2:i + 1]]
+        exact_mean = sum(window) / 3
+        exact_std = math.sqrt(float(sum((v - exact_mean) ** 2 for v in window) / 2))
+        assert mean[i] == pytest.approx(float(exact_mean), rel=1e-15)
+        assert std[i] == pytest.approx(exact_std, rel=1e-13, abs=1e-12)
+
+
+def test_leading_values_and_nans_match_pandas():
+    values = np.array([4.0, np.nan, 6.0, 7.0, np.nan, np.nan, 1.0, 2.0])
+    mean, std = rolling_mean_std(values)
+    pd_mean, pd_std = pandas_rolling(values)
+    np.testing.assert_allclose(mean, pd_mean, equal_nan=True)
+    np.testing.assert_allclose(std, pd_std, equal_nan=True)
+
+
+@pytest.mark.parametrize("sizes", [[1] * 10, [2, 3, 5], [7, 0, 3], [10]])
+def test_batches_match_the_whole_series_exactly(sizes):
+    values = soil_values(10)
+    whole = rolling_mean_std(values)
+    state = SoilRollingFeatures()
+    parts = [state.transform(values[lo:lo + n]) for lo, n in zip(np.cumsum([0] + sizes[:-1]), sizes)]
+
+    np.testing.assert_array_equal(np.concatenate([p[0] for p in parts]), whole[0])
+    np.testing.assert_array_equal(np.concatenate([p[1] for p in parts]), whole[1])
+
+
+def test_soil_predictions_unchanged_against_pandas_features(registry):
+    model = require_model(registry, "soil")
+    values = soil_values(20000)
+    pd_mean, pd_std = pandas_rolling(values)
+    with_pandas = pd.DataFrame({"sensor_value": values, "rolling_mean": pd_mean, "rolling_std": pd_std})
+
+    np.testing.assert_array_equal(model.predict(pd.DataFrame({"sensor_value": values})),
+                                  model.predict(with_pandas))
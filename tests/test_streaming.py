@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from all_in_one_router import AllInOneRouter
+from conftest import require_model
+from scripts.generate_test_csv import make_mixed_frame, make_sensor_frame
+
+
+def assert_same_predictions(actual, expected):
+    assert len(actual) == len(expected)
+    assert actual["sensor_type"].tolist() == expected["sensor_type"].tolist()
+    np.testing.assert_array_equal(pd.to_numeric(actual["prediction"]).to_numpy(dtype=np.float64),
+                                  pd.to_numeric(expected["prediction"]).to_numpy(dtype=np.float64))
+
+
+@pytest.mark.parametrize("sensor_key", [None, "sensor"])
+@pytest.mark.parametrize("sensor", ["temperature", "soil", "wafer", "light"])
+def test_streaming_matches_in_memory(registry, tmp_path, sensor, sensor_key):
+    require_model(registry, sensor)
+    router = AllInOneRouter(registry=registry)
+    path = tmp_path / "in.csv"
+    make_sensor_frame(sensor, 500).to_csv(path, index=False)
+    df = pd.read_csv(path)
+    sensor_key = sensor_key and sensor
+
+    if sensor_key:
+        expected = router.predict_single_sensor(df, sensor_key)
+    else:
+        expected = router.route_and_predict(df)
+    progress = []
+    summary = router.route_and_predict_csv(str(path), str(tmp_path / "out.csv"), chunksize=64,
+                                           sensor_key=sensor_key, on_chunk=lambda c, r: progress.append((c, r)))
+
+    assert (summary["rows"], summary["chunks"]) == (500, 8)
+    assert progress[-1] == (8, 500) and len(progress) == 8
+    streamed = pd.read_csv(tmp_path / "out.csv")
+    assert streamed.columns[:2].tolist() == ["sensor_type", "prediction"]
+    assert_same_predictions(streamed, expected)
+
+
+def test_mixed_file_streaming_matches_in_memory(registry, tmp_path):
+    router = AllInOneRouter(registry=registry, detection="rows")
+    path = tmp_path / "mixed.csv"
+    make_mixed_frame(600).to_csv(path, index=False)
+
+    expected = router.route_and_predict(pd.read_csv(path))
+    streamed = pd.concat(router.iter_predict_csv(str(path), chunksize=50), ignore_index=True)
+    assert_same_predictions(streamed, expected)
+
+
+def test_header_only_csv(registry, tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_text("timestamp(ms),sensor_value\n")
+    summary = AllInOneRouter(registry=registry).route_and_predict_csv(str(path), str(tmp_path / "out.csv"))
+    assert summary["rows"] == 0
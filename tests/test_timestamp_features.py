@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from custom_transformers import FeatureEngineer, LDRFeatureEngineer, timestamp_hour_dayofweek
+from reference import legacy_gas, legacy_ldr
+from scripts.generate_test_csv import make_sensor_frame
+
+ROWS = 2000
+
+
+def gas_cases(rows, rng):
+    base = make_sensor_frame("gas", rows, 0).drop(columns=["label"])
+    ts = base["timestramp_millies"]
+    holes = rng.random(rows) < 0.1
+    iso = pd.to_datetime(ts, unit="ms").dt.strftime("%Y-%m-%d %H:%M:%S")
+    return {
+        "int ms": base,
+        "ms with gaps (float)": base.assign(timestramp_millies=ts.where(~holes)),
+        "nullable Int64": base.assign(timestramp_millies=ts.astype("Int64").mask(holes)),
+        "negative and huge": base.assign(
+            timestramp_millies=rng.integers(-10 ** 14, 10 ** 14, rows, dtype=np.int64)),
+        "fractional ms": base.assign(timestramp_millies=ts + rng.random(rows)),
+        "iso strings": base.assign(timestramp_millies=iso),
+        "numeric strings": base.assign(timestramp_millies=ts.astype(str)),
+        "junk strings": base.assign(timestramp_millies=iso.where(~holes, "not a time")),
+        "datetime64": base.assign(timestramp_millies=pd.to_datetime(ts, unit="ms")),
+        "no timestamp": base.drop(columns=["timestramp_millies"]),
+        "missing features": base[["timestramp_millies", "mq2_value"]],
+        "empty": base.iloc[:0],
+        "shuffled index": base.set_axis(rng.permutation(rows)),
+    }
+
+
+def ldr_cases(rows, rng):
+    base = make_sensor_frame("light", rows, 0).drop(columns=["status"])
+    iso = base["timestamp"]
+    holes = rng.random(rows) < 0.1
+    ms = pd.to_datetime(iso).astype("int64") // 10 ** 6
+    return {
+        "iso strings": base,
+        "iso with None": base.assign(timestamp=iso.where(~holes, None)),
+        "object dtype": base.assign(timestamp=iso.astype(object)),
+        "T separator": base.assign(timestamp=iso.str.replace(" ", "T")),
+        "minutes only": base.assign(timestamp=iso.str[:16]),
+        "date only": base.assign(timestamp=iso.str[:10]),
+        "invalid dates": base.assign(timestamp=iso.where(~holes, "2023-02-30 10:00:00")),
+        "mixed widths": base.assign(timestamp=iso.where(~holes, iso.str[:10])),
+        "utc suffix": base.assign(timestamp=iso + "Z"),
+        "leap days": base.assign(timestamp=pd.Series(
+            ["2024-02-29 23:59:59", "2000-02-29 00:00:00", "1900-03-01 12:00:00", "0001-01-01 00:00:00"]
+            * (rows // 4) + ["2024-02-29 23:59:59"] * (rows % 4))),
+        "epoch ns ints": base.assign(timestamp=ms * 10 ** 6),
+        "epoch ms ints (read as ns)": base.assign(timestamp=ms),
+        "whole floats": base.assign(timestamp=(ms * 10 ** 6).astype(float).where(~holes)),
+        "no timestamp": base.drop(columns=["timestamp"]),
+        "empty": base.iloc[:0],
+    }
+
+
+GAS_CASES = gas_cases(ROWS, np.random.default_rng(0))
+LDR_CASES = ldr_cases(ROWS, np.random.default_rng(1))
+
+
+@pytest.mark.parametrize("name", GAS_CASES)
+def test_gas_matches_to_datetime(name):
+    fe = FeatureEngineer()
+    X = GAS_CASES[name]
+    pd.testing.assert_frame_equal(fe.transform(X), legacy_gas(fe, X), check_dtype=False)
+
+
+@pytest.mark.parametrize("name", LDR_CASES)
+def test_light_matches_to_datetime(name):
+    fe = LDRFeatureEngineer()
+    X = LDR_CASES[name]
+    pd.testing.assert_frame_equal(fe.transform(X), legacy_ldr(fe, X), check_dtype=False)
+
+
+def test_kernel_known_values():
+    # 2024-02-29 23:00 UTC was a Thursday
+    ms = pd.Series([1709247600000, None], dtype="Int64")
+    hour, dayofweek = timestamp_hour_dayofweek(ms)
+    assert list(hour) == [23, 0] and list(dayofweek) == [3, 0]
+
+    iso = pd.Series(["1970-01-05 07:30:00"], dtype="str")
+    if timestamp_hour_dayofweek(iso) is not None:  # needs pyarrow-backed strings
+        assert [list(v) for v in timestamp_hour_dayofweek(iso)] == [[7], [0]]
+
+
+@pytest.mark.parametrize("col", [
+    pd.Series([1.5, 2.0]),                                 # fractional epochs
+    pd.Series(["2023-02-30 10:00:00"], dtype="str"),       # not a real date
+    pd.Series(["2023-01-01 10:00:00Z"], dtype="str"),      # other layout
+    pd.Series([True, False]),
+])
+def test_kernel_leaves_other_columns_to_pandas(col):
+    assert timestamp_hour_dayofweek(col) is None
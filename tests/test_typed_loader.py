@@ -0,0 +1,101 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from all_in_one_router import AllInOneRouter
+from conftest import MODEL_DIR, require_model
+from scripts.generate_test_csv import SENSORS, make_sensor_frame
+from typed_loader import compact_dtypes, model_columns, read_sensor_csv
+
+
+def write_csv(df, tmp_path, name="data"):
+    path = str(tmp_path / f"{name}.csv")
+    df.to_csv(path, index=False)
+    return path
+
+
+def late_text_frame(rows):
+    """Floats until the last row, whose sensor_value is text"""
+    df = make_sensor_frame("temperature", rows, 0)
+    df["sensor_value"] = df["sensor_value"].astype(object)
+    df.loc[rows - 1, "sensor_value"] = "broken"
+    return df
+
+
+def test_compact_dtypes():
+    sample = pd.DataFrame({"wafer_id": ["W1", "W2"], "timestamp(ms)": [1000.0, 2000.0],
+                           "time_frac": [1.5, 2.0], "sensor_1": [0.5, 1.5], "count": [1, 2]})
+    assert compact_dtypes(sample) == {"wafer_id": "category", "timestamp(ms)": "Int64",
+                                      "sensor_1": np.float32}
+
+
+@pytest.mark.parametrize("sensor", SENSORS)
+def test_compact_read_keeps_values(tmp_path, sensor):
+    path = write_csv(make_sensor_frame(sensor, 3000, 0), tmp_path)
+    expected = pd.read_csv(path)
+
+    whole = read_sensor_csv(path)
+    chunked = pd.concat(read_sensor_csv(path, chunksize=700))
+    for df in (whole, chunked):
+        pd.testing.assert_frame_equal(df.astype(expected.dtypes.to_dict()), expected, rtol=1e-6)
+    assert whole.memory_usage(deep=True).sum() <= expected.memory_usage(deep=True).sum()
+
+
+def test_whole_file_falls_back_to_default_types(tmp_path):
+    path = write_csv(late_text_frame(3000), tmp_path)
+    pd.testing.assert_frame_equal(read_sensor_csv(path, sample_rows=100), pd.read_csv(path))
+
+
+def test_chunks_fall_back_from_the_failing_chunk(tmp_path):
+    rows, chunksize = 2 * 700 + 10, 700
+    path = write_csv(late_text_frame(rows), tmp_path)
+    expected = pd.read_csv(path)
+
+    chunks = list(read_sensor_csv(path, chunksize=chunksize, sample_rows=100))
+    assert [len(c) for c in chunks] == [700, 700, 10]
+    # Chunks before the mismatch keep compact types, the rest use pandas' defaults
+    assert chunks[0]["sensor_value"].dtype == np.float32
+    assert chunks[-1]["sensor_value"].dtype == expected["sensor_value"].dtype
+    assert pd.concat(chunks).index.equals(pd.RangeIndex(rows))
+    pd.testing.assert_frame_equal(chunks[-1], expected.iloc[1400:])
+
+
+def test_model_columns_only(tmp_path):
+    df = make_sensor_frame("wafer", 200, 0).assign(aux_1=1.0, aux_2="x")
+    path = write_csv(df, tmp_path)
+
+    got = read_sensor_csv(path, "wafer", model_columns_only=True)
+    assert list(got.columns) == model_columns(list(df.columns), "wafer")
+    assert "aux_1" not in got.columns and "aux_2" not in got.columns
+
+
+def test_unseekable_source_uses_default_types(tmp_path):
+    path = write_csv(make_sensor_frame("soil", 100, 0), tmp_path)
+
+    class Stream(io.RawIOBase):
+        def __init__(self, data):
+            self.data = io.BytesIO(data)
+
+        def readable(self):
+            return True
+
+        def readinto(self, b):
+            return self.data.readinto(b)
+
+    with open(path, "rb") as f:
+        got = read_sensor_csv(io.BufferedReader(Stream(f.read())))
+    pd.testing.assert_frame_equal(got, pd.read_csv(path))
+
+
+@pytest.mark.parametrize("sensor", ["wafer", "temperature", "soil", "light"])
+def test_compact_predictions_match(registry, tmp_path, sensor):
+    require_model(registry, sensor)
+    router = AllInOneRouter(model_dir=MODEL_DIR, registry=registry)
+    path = write_csv(make_sensor_frame(sensor, 2000, 0), tmp_path)
+
+    expected = pd.concat(router.iter_predict_csv(path, 500, sensor_key=sensor))
+    for options in (dict(compact=True), dict(compact=True, model_columns_only=True)):
+        got = pd.concat(router.iter_predict_csv(path, 500, sensor_key=sensor, **options))
+        assert got["prediction"].tolist() == expected["prediction"].tolist()
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from custom_transformers import WaferAggregator, group_segments
+from reference import legacy_transform, make_wafer_frame
+from wafer_stream import IncrementalWaferAggregator
+
+
+def _base(seed=1):
+    return make_wafer_frame(5000, 6, 50, seed=seed, shuffle=False)
+
+
+def _with_nan_ids(df, rows):
+    df = df.copy()
+    df.loc[rows(df), "wafer_id"] = None
+    return df
+
+
+def _ints(df):
+    rng = np.random.default_rng(1)
+    df = df.copy()
+    df["sensor_1"] = rng.integers(-2**62, 2**62, len(df))
+    df["sensor_2"] = rng.integers(0, 10, len(df)).astype("int32")
+    return df
+
+
+def _unsorted_runs(df):
+    return df.assign(wafer_id=df["wafer_id"].map(lambda w: w[::-1]))
+
+
+def _all_nan_group(df):
+    df = df.copy()
+    df.loc[df["wafer_id"] == "W3", "sensor_1"] = np.nan
+    return df
+
+
+CASES = {
+    # name: (frame builder, path the frame should take)
+    "sorted ids": (lambda: _base(), "numpy"),
+    "shuffled ids": (lambda: make_wafer_frame(5000, 6, 50, seed=2), "pandas"),
+    "grouped, unsorted ids": (lambda: _unsorted_runs(_base(3)), "numpy"),
+    "one row per wafer": (lambda: _base().assign(wafer_id=np.arange(5000)), "numpy"),
+    "one row per wafer, reversed": (lambda: _base().assign(wafer_id=np.arange(5000)[::-1]), "numpy"),
+    "float32": (lambda: _base().astype({f"sensor_{i}": "float32" for i in range(1, 7)}), "numpy"),
+    "integer columns": (lambda: _ints(_base()), "numpy"),
+    "missing wafer ids": (lambda: _with_nan_ids(_base(), lambda d: d["wafer_id"] == "W7"), "numpy"),
+    "scattered missing wafer ids": (lambda: _with_nan_ids(_base(), lambda d: d.index[::17]), "pandas"),
+    "all-NaN group": (lambda: _all_nan_group(_base()), "numpy"),
+    "with target": (lambda: _base().assign(faulty=np.arange(5000) % 2), "numpy"),
+    "empty target": (lambda: _base().assign(faulty=""), "numpy"),
+    "bool feature": (lambda: _base().assign(sensor_1=_base()["sensor_1"] > 0), "pandas"),
+    "categorical ids": (lambda: _base().assign(wafer_id=_base()["wafer_id"].astype("category")), "pandas"),
+}
+
+
+@pytest.mark.parametrize("name", CASES)
+def test_matches_groupby(name):
+    build, path = CASES[name]
+    df = build()
+    agg = WaferAggregator().fit(df)
+    features = [c for c in df.columns if c.startswith("sensor")]
+
+    taken = "numpy" if agg._aggregate_numpy(df, features) is not None else "pandas"
+    assert taken == path
+    # pandas accumulates float32 statistics in float32; ours are rounded from float64
+    tol = 1e-5 if name == "float32" else 1e-12
+    pd.testing.assert_frame_equal(agg.transform(df), legacy_transform(agg, df),
+                                  check_exact=False, rtol=tol, atol=tol)
+
+
+def test_group_segments_rejects_scattered_keys():
+    assert group_segments(pd.Series(["a", "b", "a"])) is None
+    starts, run_groups, n_groups = group_segments(pd.Series(["b", "b", "a", None]))
+    assert list(starts) == [0, 2, 3]
+    assert list(run_groups) == [1, 0, -1]
+    assert n_groups == 2
+
+
+def test_incremental_batches_match_full_recompute():
+    df = make_wafer_frame(20000, 30, 300, seed=5, nan_rate=0.05)
+    df["sensor_3"] += 1e6
+    inc = IncrementalWaferAggregator()
+    for lo in range(0, len(df), 777):
+        inc.update(df.iloc[lo:lo + 777])
+
+    expected = legacy_transform(WaferAggregator().fit(df), df)
+    pd.testing.assert_frame_equal(inc.features(), expected, check_exact=False, rtol=1e-9, atol=1e-9)
@@ -0,0 +1,116 @@
+# typed_loader.py
+# CSV reading with compact types chosen from a sample: float32 readings,
+# Int64 epochs, categorical wafer ids. Data that does not fit them makes the
+# rest of the file be read with pandas' default types.
+
+import numpy as np
+import pandas as pd
+
+from alias_utils import EXPECTED_FEATURES, map_columns_with_aliases, normalize_col
+
+# Rows read up front to choose the column types
+SAMPLE_ROWS = 1000
+
+
+def _rewind(source):
+    """Seek a file-like source back to the start; False when it cannot be re-read"""
+    if isinstance(source, (str, bytes)) or hasattr(source, "__fspath__"):
+        return True
+    if not hasattr(source, "seek") or not getattr(source, "seekable", lambda: True)():
+        return False
+    source.seek(0)
+    return True
+
+
+def _name(source):
+    return getattr(source, "name", source)
+
+
+def model_columns(columns, sensor, fuzzy_cutoff=0.78):
+    """Columns of a header that the sensor's prepared features are read from"""
+    expected = EXPECTED_FEATURES.get(sensor, [])
+    rename_map, _ = map_columns_with_aliases(columns, expected, fuzzy_cutoff=fuzzy_cutoff)
+    return [c for c in columns if rename_map.get(c) in expected]
+
+
+def compact_dtypes(sample, fuzzy_cutoff=0.78):
+    """read_csv dtype= mapping for the columns of a sample read with default types"""
+    rename_map, _ = map_columns_with_aliases(sample.columns, EXPECTED_FEATURES["wafer"],
+                                             fuzzy_cutoff=fuzzy_cutoff)
+    dtypes = {}
+    for c in sample.columns:
+        dtype = sample[c].dtype
+        if rename_map.get(c) == "wafer_id":
+            dtypes[c] = "category"
+        elif "time" in normalize_col(c) and dtype.kind in "iuf":
+            values = sample[c].dropna().to_numpy()
+            if np.all(values == np.floor(values)):
+                dtypes[c] = "Int64"
+        elif dtype == np.float64:
+            dtypes[c] = np.float32
+    return dtypes
+
+
+def read_sensor_csv(source, sensor=None, chunksize=None, compact=True, model_columns_only=False,
+                    sample_rows=SAMPLE_ROWS, fuzzy_cutoff=0.78):
+    """
+    pd.read_csv with compact types chosen from a sample of the file.
+
+    Args:
+        sensor: Sensor key the file is scored with, if known
+        compact: Read with compact_dtypes (False keeps pandas' defaults)
+        model_columns_only: With sensor, read only the columns its model uses
+    """
+    if not _rewind(source):
+        return pd.read_csv(source, chunksize=chunksize)
+
+    usecols = None
+    if model_columns_only and sensor:
+        header = list(pd.read_csv(source, nrows=0).columns)
+        _rewind(source)
+        usecols = model_columns(header, sensor, fuzzy_cutoff) or None
+
+    dtypes = None
+    if compact:
+        sample = pd.read_csv(source, nrows=sample_rows, usecols=usecols)
+        _rewind(source)
+        dtypes = compact_dtypes(sample, fuzzy_cutoff) or None
+
+    if chunksize is not None:
+        return _iter_chunks(source, chunksize, usecols, dtypes)
+    try:
+        return pd.read_csv(source, usecols=usecols, dtype=dtypes)
+    except ValueError as e:
+        if dtypes is None:
+            raise
+        print(f"[WARN] Compact types do not fit {_name(source)}: {e}; using default types")
+        _rewind(source)
+        return pd.read_csv(source, usecols=usecols)
+
+
+def _iter_chunks(source, chunksize, usecols, dtypes):
+    rows = 0
+    reader = pd.read_csv(source, chunksize=chunksize, usecols=usecols, dtype=dtypes)
+    try:
+        while True:
+            try:
+                chunk = next(reader)
+            except StopIteration:
+                return
+            except ValueError as e:
+                if dtypes is None:
+                    raise
+                print(f"[WARN] Compact types do not fit {_name(source)} after row {rows}: {e}; "
+                      "using default types")
+                reader.close()
+                _rewind(source)
+                dtypes = None
+                reader = pd.read_csv(source, chunksize=chunksize, usecols=usecols,
+                                     skiprows=range(1, rows + 1))
+                continue
+            # Row labels keep counting across chunks, as with a single reader
+            chunk.index = pd.RangeIndex(rows, rows + len(chunk))
+            rows += len(chunk)
+            yield chunk
+    finally:
+        reader.close()
@@ -0,0 +1,230 @@
+# wafer_stream.py
+# Incremental per-wafer aggregation for streaming wafer telemetry.
+#
+#   python wafer_stream.py readings.csv --state wafer_state.npz
+#
+# Each run folds new readings into the saved per-wafer state and prints the
+# current prediction for every wafer it touched.
+
+import argparse
+import os
+import sys
+import uuid
+
+import numpy as np
+import pandas as pd
+
+# These imports are required so joblib can unpickle the custom classes
+from custom_transformers import WaferAggregator, FeatureEngineer, SoilSensorPipeline
+from custom_transformers import segment_moments, moments_to_std
+from alias_utils import map_columns_with_aliases, EXPECTED_FEATURES
+from model_registry import get_registry
+
+STATS = ("mean", "std", "min", "max")
+
+
+class IncrementalWaferAggregator:
+    """
+    Running count/mean/M2/min/max per wafer and sensor column.
+
+    update() folds a batch of readings into the state in O(batch) time
+    (batches are merged with Chan's parallel variance formula), features()
+    returns the same columns WaferAggregator would compute over the full
+    history, and save()/load() checkpoint the state with np.savez.
+    """
+
+    def __init__(self, sensor_cols=None, fuzzy_cutoff=0.78):
+        self.sensor_cols = list(sensor_cols or EXPECTED_FEATURES["wafer"][1:])
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.wafer_ids = []
+        self._index = {}
+        self._set_state(*self._empty_state(0))
+
+    def __len__(self):
+        return len(self.wafer_ids)
+
+    # ----------------------------------------------------------
+    # Updates
+    # ----------------------------------------------------------
+    def _prepare(self, df):
+        """Rename aliased columns (Wafer ID, Sensor-1, ...) like the router does"""
+        rename_map, _ = map_columns_with_aliases(
+            df.columns, ["wafer_id"] + self.sensor_cols, fuzzy_cutoff=self.fuzzy_cutoff
+        )
+        df = df.rename(columns=rename_map)
+        if "wafer_id" not in df.columns:
+            raise ValueError("Wafer readings need a wafer_id column")
+        return df
+
+    def _empty_state(self, rows):
+        k = len(self.sensor_cols)
+        return (np.zeros((rows, k), dtype=np.int64), np.zeros((rows, k)), np.zeros((rows, k)),
+                np.full((rows, k), np.nan), np.full((rows, k), np.nan))
+
+    def _set_state(self, count, mean, m2, vmin, vmax):
+        self.count, self.mean, self.m2, self.vmin, self.vmax = count, mean, m2, vmin, vmax
+
+    def _state(self):
+        """State arrays trimmed to the known wafers"""
+        n = len(self.wafer_ids)
+        return self.count[:n], self.mean[:n], self.m2[:n], self.vmin[:n], self.vmax[:n]
+
+    def _rows_for(self, ids):
+        """State rows for ids, adding new wafers as needed"""
+        for w in ids:
+            if w not in self._index:
+                self._index[w] = len(self.wafer_ids)
+                self.wafer_ids.append(w)
+
+        if len(self.wafer_ids) > len(self.count):
+            # Grow capacity geometrically so adding wafers stays amortized O(1)
+            capacity = max(len(self.wafer_ids), 2 * len(self.count), 64)
+            grown = self._empty_state(capacity)
+            for new, old in zip(grown, self._state()):
+                new[:len(old)] = old
+            self._set_state(*grown)
+        return np.array([self._index[w] for w in ids], dtype=np.intp)
+
+    def update(self, df):
+        """Fold a batch of readings into the state; returns the wafer IDs it touched"""
+        df = self._prepare(df)
+        keys = df["wafer_id"]
+        codes, uniques = pd.factorize(keys, sort=True)
+        if len(uniques) == 0:
+            return []
+
+        # Group the batch once; every wafer becomes one contiguous segment,
+        # in the same (sorted) order as uniques
+        order = np.argsort(codes, kind="stable")
+        order = order[codes[order] >= 0]
+        sorted_codes = codes[order]
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(sorted_codes)) + 1])
+        ids = uniques.tolist()
+        rows = self._rows_for(ids)
+
+        for j, c in enumerate(self.sensor_cols):
+            if c not in df.columns:
+                continue
+            values = pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=np.float64)[order]
+            nb, mb, m2b, minb, maxb = segment_moments(values, starts)
+            self._merge(rows, j, nb, mb, m2b, minb, maxb)
+
+        return ids
+
+    def _merge(self, rows, j, nb, mb, m2b, minb, maxb):
+        na = self.count[rows, j]
+        ma = self.mean[rows, j]
+        n = na + nb
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = mb - ma
+            mean = np.where(nb == 0, ma, np.where(na == 0, mb, ma + delta * (nb / n)))
+            m2 = np.where(
+                nb == 0, self.m2[rows, j],
+                np.where(na == 0, m2b, self.m2[rows, j] + m2b + delta * delta * (na * nb / n))
+            )
+
+        self.count[rows, j] = n
+        self.mean[rows, j] = mean
+        self.m2[rows, j] = m2
+        self.vmin[rows, j] = np.fmin(self.vmin[rows, j], minb)
+        self.vmax[rows, j] = np.fmax(self.vmax[rows, j], maxb)
+
+    # ----------------------------------------------------------
+    # Features
+    # ----------------------------------------------------------
+    def features(self, wafer_ids=None):
+        """
+        Current feature rows (sensor_N_mean/std/min/max, WaferAggregator's
+        column order) for wafer_ids, or for every wafer in sorted order.
+        """
+        if wafer_ids is None:
+            wafer_ids = sorted(self.wafer_ids)
+        missing = [w for w in wafer_ids if w not in self._index]
+        if missing:
+            raise KeyError(f"Unknown wafer IDs: {missing[:5]}")
+        rows = np.array([self._index[w] for w in wafer_ids], dtype=np.intp)
+
+        count = self.count[rows]
+        with np.errstate(invalid="ignore"):
+            stats = {
+                "mean": np.where(count > 0, self.mean[rows], np.nan),
+                "std": moments_to_std(count, self.m2[rows]),
+                "min": self.vmin[rows],
+                "max": self.vmax[rows],
+            }
+
+        out = {}
+        for j, c in enumerate(self.sensor_cols):
+            for stat in STATS:
+                out[f"{c}_{stat}"] = stats[stat][:, j]
+        return pd.DataFrame(out)
+
+    def predict(self, model, wafer_ids=None):
+        """Score wafers with a wafer pipeline, skipping its WaferAggregator step"""
+        if wafer_ids is None:
+            wafer_ids = sorted(self.wafer_ids)
+        if not wafer_ids:
+            return pd.DataFrame({"wafer_id": [], "prediction": []})
+        steps = model[1:] if isinstance(model.steps[0][1], WaferAggregator) else model
+        pred = steps.predict(self.features(wafer_ids))
+        return pd.DataFrame({"wafer_id": list(wafer_ids), "prediction": list(pred)})
+
+    # ----------------------------------------------------------
+    # Checkpoints
+    # ----------------------------------------------------------
+    def save(self, path):
+        """Write the state to path atomically (np.savez format)"""
+        ids = np.asarray(self.wafer_ids)
+        if ids.dtype == object:
+            ids = ids.astype(str)
+        count, mean, m2, vmin, vmax = self._state()
+        tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(
+                f, wafer_ids=ids, sensor_cols=np.asarray(self.sensor_cols, dtype=str),
+                count=count, mean=mean, m2=m2, vmin=vmin, vmax=vmax,
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, fuzzy_cutoff=0.78):
+        with np.load(path) as data:
+            agg = cls(sensor_cols=data["sensor_cols"].tolist(), fuzzy_cutoff=fuzzy_cutoff)
+            agg.wafer_ids = data["wafer_ids"].tolist()
+            agg._index = {w: i for i, w in enumerate(agg.wafer_ids)}
+            agg._set_state(data["count"], data["mean"], data["m2"], data["vmin"], data["vmax"])
+        return agg
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fold new wafer readings into saved per-wafer state and score them")
+    parser.add_argument("inputs", nargs="+", help="CSV files of wafer readings, in arrival order")
+    parser.add_argument("--state", default="wafer_state.npz", help="Checkpoint file (created if missing)")
+    parser.add_argument("--chunksize", type=int, default=100000)
+    parser.add_argument("--model-dir", default="models")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.state):
+        agg = IncrementalWaferAggregator.load(args.state)
+        print(f"[OK] Resumed {len(agg)} wafers from {args.state}")
+    else:
+        agg = IncrementalWaferAggregator()
+
+    touched = set()
+    for path in args.inputs:
+        for chunk in pd.read_csv(path, chunksize=args.chunksize):
+            touched.update(agg.update(chunk))
+    agg.save(args.state)
+    print(f"[OK] Saved state for {len(agg)} wafers to {args.state}")
+
+    model = get_registry(args.model_dir).get("wafer")
+    if model is None:
+        print("[ERROR] Wafer model not found")
+        return 1
+    print(agg.predict(model, sorted(touched)).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())